@@ -1,4 +1,7 @@
+import datetime
+
 from peewee import *
+from playhouse.sqlite_ext import ISODateTimeField
 
 
 db = SqliteDatabase(':memory:')
@@ -23,6 +26,10 @@ class Item(Base):
     collection = ForeignKeyField(Collection, backref='items')
     name = TextField()
 
+class Event(Base):
+    timestamp = DateTimeField()
+    iso_timestamp = ISODateTimeField()
+
 import functools
 import time
 
@@ -129,9 +136,60 @@ def select_prefetch_join(i):
         for i in c.items:
             pass
 
+@timed
+def insert_datetimes(i):
+    start = datetime.datetime(2020, 1, 1, 0, 0, 0, 123456)
+    with db.atomic():
+        for j in range(i * 1000, (i + 1) * 1000):
+            ts = start + datetime.timedelta(minutes=j)
+            Event.create(timestamp=ts, iso_timestamp=ts)
+
+@timed
+def select_datetimes(i):
+    query = Event.select(Event.timestamp)
+    for event in query:
+        pass
+
+@timed
+def select_isodatetimes(i):
+    query = Event.select(Event.iso_timestamp)
+    for event in query:
+        pass
+
+from playhouse.pool import PooledSqliteDatabase
+
+pool = PooledSqliteDatabase(':memory:')
+pool_affinity = PooledSqliteDatabase(':memory:', affinity=True)
+
+def connect_close(pool_db, n=10000):
+    for i in range(n):
+        pool_db.connect()
+        pool_db.close()
+
+def checkout_checkin(pool_db, n=10000):
+    # The pool's own check-out and check-in, without Database.connect().
+    for i in range(n):
+        pool_db._close(pool_db._connect())
+
+@timed
+def pool_checkout(i):
+    connect_close(pool)
+
+@timed
+def pool_checkout_affinity(i):
+    connect_close(pool_affinity)
+
+@timed
+def pool_checkout_raw(i):
+    checkout_checkin(pool)
+
+@timed
+def pool_checkout_raw_affinity(i):
+    checkout_checkin(pool_affinity)
+
 
 if __name__ == '__main__':
-    db.create_tables([Register, Collection, Item])
+    db.create_tables([Register, Collection, Item, Event])
     insert()
     insert_related()
     Register.delete().execute()
@@ -151,4 +209,11 @@ if __name__ == '__main__':
     select_related_dbapi_raw()
     select_prefetch()
     select_prefetch_join()
-    db.drop_tables([Register, Collection, Item])
+    insert_datetimes()
+    select_datetimes()
+    select_isodatetimes()
+    pool_checkout()
+    pool_checkout_affinity()
+    pool_checkout_raw()
+    pool_checkout_raw_affinity()
+    db.drop_tables([Register, Collection, Item, Event])
@@ -1,7 +1,8 @@
 import re
 import threading
 from _typeshed import Incomplete, SupportsKeysAndGetItem
-from collections.abc import Callable, Generator, Iterable, Iterator
+from collections import deque
+from collections.abc import Callable, Generator, Iterable, Iterator, Sequence
 from datetime import date, datetime, time
 from decimal import Decimal
 from types import TracebackType
@@ -38,6 +39,7 @@ class _FieldKwargs(TypedDict, total=False):
     verbose_name: str | None
     index_type: str | None
     db_column: str | None
+    lazy: bool
 
 @type_check_only
 class _FKKwargs(_FieldKwargs, total=False):
@@ -575,8 +577,10 @@ class BaseQuery(Node):
     def tuples(self, as_tuple: bool = True) -> Self: ...
     def namedtuples(self, as_namedtuple: bool = True) -> Self: ...
     def objects(self, constructor=None) -> Self: ...
+    def row_cache(self, policy: str = 'all', size: int | None = None) -> Self: ...
     def __sql__(self, ctx) -> None: ...
     def sql(self) -> tuple[str, list[Any]]: ...  # Returns (sql, params), params are bound query values
+    def explain(self, database: _DatabaseType | None = None, analyze: bool = False) -> QueryPlan: ...
     def execute(self, database: _DatabaseType | None = None): ...
     async def aexecute(self, database: _DatabaseType | None = None): ...
     def iterator(self, database: _DatabaseType | None = None): ...
@@ -620,7 +624,13 @@ class SelectBase(_HashableSource, Source, SelectQuery):  # type: ignore[misc]
     def first(self, database: _DatabaseType | None = None, n: int = 1): ...
     def scalar(self, database: _DatabaseType | None = None, as_tuple: bool = False, as_dict: bool = False): ...
     def scalars(self, database: _DatabaseType | None = None) -> Generator[Incomplete]: ...
-    def count(self, database: _DatabaseType | None = None, clear_limit: bool = False) -> int: ...
+    def count(
+        self,
+        database: _DatabaseType | None = None,
+        clear_limit: bool = False,
+        approximate: bool = False,
+        cache: float | None = None,
+    ) -> int: ...
     def exists(self, database: _DatabaseType | None = None) -> bool: ...
     def get(self, database: _DatabaseType | None = None): ...
 
@@ -667,6 +677,12 @@ class Select(SelectBase):
         self, for_update: bool = True, of=None, nowait: bool | None = None, skip_locked: bool | None = None
     ) -> Self: ...
     def lateral(self, lateral: bool = True) -> Self: ...
+    def use_index(self, *indexes: str | Index, source: Incomplete | None = None) -> Self: ...
+    def force_index(self, *indexes: str | Index, source: Incomplete | None = None) -> Self: ...
+    def ignore_index(self, *indexes: str | Index, source: Incomplete | None = None) -> Self: ...
+    def paginate_with_total(
+        self, page: int, paginate_by: int = 20, database: _DatabaseType | None = None
+    ) -> tuple[list[Any], int]: ...
     def __sql_selection__(self, ctx, is_subquery: bool = False): ...
     def __sql__(self, ctx): ...
 
@@ -773,6 +789,44 @@ class ViewMetadata(NamedTuple):
     name: Incomplete
     sql: Incomplete
 
+class PlanNode:
+    detail: str
+    table: str | None
+    index: str | None
+    rows: int | float | None
+    full_scan: bool
+    filesort: bool
+    temporary: bool
+    data: Any
+    children: list[PlanNode]
+    def __init__(
+        self,
+        detail: str,
+        table: str | None = None,
+        index: str | None = None,
+        rows: int | float | None = None,
+        full_scan: bool = False,
+        filesort: bool = False,
+        temporary: bool = False,
+        data: Any = None,
+    ) -> None: ...
+    @property
+    def warnings(self) -> list[str]: ...
+
+class QueryPlan:
+    nodes: list[PlanNode]
+    raw: Any
+    def __init__(self, nodes: list[PlanNode], raw: Any) -> None: ...
+    def __iter__(self) -> Iterator[PlanNode]: ...
+    @property
+    def full_scans(self) -> list[str | None]: ...
+    @property
+    def filesort(self) -> bool: ...
+    @property
+    def temporary(self) -> bool: ...
+    @property
+    def warnings(self) -> list[str]: ...
+
 class _ConnectionState:
     def __init__(self, **kwargs) -> None: ...
     closed: bool
@@ -803,6 +857,7 @@ class ConnectionContext(_callable_context_manager):
 class Database(_callable_context_manager):
     context_class: Incomplete
     json_methods: Incomplete
+    count_cache_size: int
     field_types: Incomplete
     operations: Incomplete
     param: str
@@ -816,11 +871,14 @@ class Database(_callable_context_manager):
     limit_max: Incomplete
     nulls_ordering: bool
     returning_clause: bool
+    row_values: bool
     safe_create_index: bool
     safe_drop_index: bool
     sequences: bool
     truncate_table: bool
+    window_functions: bool
     autoconnect: Incomplete
+    json_codec: JSONCodec | None
     thread_safe: Incomplete
     connect_params: Incomplete
     def __deepcopy__(self, memo: Any) -> Self: ...
@@ -833,6 +891,7 @@ class Database(_callable_context_manager):
         operations=None,
         autocommit=None,
         autoconnect: bool = True,
+        json_codec: str | JSONCodec | None = None,
         **kwargs,
     ) -> None: ...
     database: Incomplete
@@ -855,6 +914,18 @@ class Database(_callable_context_manager):
     def get_sql_context(self, **context_options) -> context_class: ...
     def conflict_statement(self, on_conflict, query): ...
     def conflict_update(self, on_conflict, query): ...
+    def index_hint(self, kind: str, indexes: list[str]) -> Node | None: ...
+    def index_hint_comment(self, ctx: Context, hints: dict[Incomplete, tuple[str, list[str]]]) -> str | None: ...
+    def explain(self, query, params=None, analyze: bool = False) -> QueryPlan: ...
+    def slow_query_log(
+        self,
+        threshold_ms: float | None = 50,
+        logger: str | None = None,
+        level: int = ...,
+        explain: bool = True,
+        interval: float = 60,
+        callback: Callable[[str, Any, float, QueryPlan | None], object] | None = None,
+    ) -> None: ...
     def last_insert_id(self, cursor, query_type=None): ...
     def rows_affected(self, cursor): ...
     def default_values_insert(self, ctx): ...
@@ -881,6 +952,9 @@ class Database(_callable_context_manager):
     def get_primary_keys(self, table, schema: str | None = None): ...
     def get_foreign_keys(self, table, schema: str | None = None) -> list[ForeignKeyMetadata]: ...
     def sequence_exists(self, seq) -> bool: ...
+    def estimate_row_count(self, table: str, schema: str | None = None) -> int | None: ...
+    def approximate_count(self, query) -> int | None: ...
+    def clear_count_cache(self) -> None: ...
     def create_tables(self, models: Iterable[type[Model]], **options) -> None: ...
     def drop_tables(self, models: Iterable[type[Model]], **kwargs) -> None: ...
     def extract_date(self, date_part, date_field): ...
@@ -945,9 +1019,11 @@ class SqliteDatabase(Database):
     def unload_extension(self, extension) -> None: ...
     def attach(self, filename, name) -> bool: ...
     def detach(self, name) -> bool: ...
+    def blob_open(self, table: str, column: str, rowid: int, read_only: bool = False, dbname: str | None = None): ...
     def begin(self, lock_type=None) -> None: ...
     def get_tables(self, schema: str | None = None) -> list[str]: ...
     def get_views(self, schema: str | None = None) -> list[ViewMetadata]: ...
+    def estimate_row_count(self, table: str, schema: str | None = None) -> int | None: ...
     def get_indexes(self, table, schema: str | None = None) -> list[IndexMetadata]: ...
     def get_columns(self, table, schema: str | None = None) -> list[ColumnMetadata]: ...
     def get_primary_keys(self, table, schema: str | None = None) -> list[Incomplete]: ...
@@ -955,6 +1031,7 @@ class SqliteDatabase(Database):
     def get_binary_type(self): ...
     def conflict_statement(self, on_conflict, query) -> SQL | None: ...
     def conflict_update(self, oc, query) -> SQL | NodeList | None: ...
+    def index_hint(self, kind: str, indexes: list[str]) -> SQL | NodeList | None: ...
     def extract_date(self, date_part, date_field) -> Function: ...
     def truncate_date(self, date_part, date_field) -> Function: ...
     def to_timestamp(self, date_field) -> Cast: ...
@@ -1030,6 +1107,8 @@ class PostgresqlDatabase(Database):
     def begin(self, isolation_level: str | None = None) -> None: ...
     def get_tables(self, schema: str | None = None) -> list[str]: ...
     def get_views(self, schema: str | None = None) -> list[ViewMetadata]: ...
+    def estimate_row_count(self, table: str, schema: str | None = None) -> int | None: ...
+    def approximate_count(self, query) -> int | None: ...
     def get_indexes(self, table, schema: str | None = None) -> list[IndexMetadata]: ...
     def get_columns(self, table, schema: str | None = None) -> list[ColumnMetadata]: ...
     def get_primary_keys(self, table, schema: str | None = None) -> list[Incomplete]: ...
@@ -1038,6 +1117,7 @@ class PostgresqlDatabase(Database):
     def get_binary_type(self) -> type[Incomplete]: ...
     def conflict_statement(self, on_conflict, query) -> None: ...
     def conflict_update(self, oc, query) -> NodeList: ...
+    def index_hint_comment(self, ctx: Context, hints: dict[Incomplete, tuple[str, list[str]]]) -> str | None: ...
     def extract_date(self, date_part, date_field) -> Function: ...
     def truncate_date(self, date_part, date_field) -> Function: ...
     def interval(self, val) -> NodeList: ...
@@ -1066,6 +1146,7 @@ class MySQLDatabase(Database):
     def begin(self, isolation_level: str | None = None) -> None: ...
     def get_tables(self, schema: str | None = None) -> list[str]: ...
     def get_views(self, schema: str | None = None) -> list[ViewMetadata]: ...
+    def estimate_row_count(self, table: str, schema: str | None = None) -> int | None: ...
     def get_indexes(self, table, schema: str | None = None) -> list[IndexMetadata]: ...
     def get_columns(self, table, schema: str | None = None) -> list[ColumnMetadata]: ...
     def get_primary_keys(self, table, schema: str | None = None) -> list[Incomplete]: ...
@@ -1073,6 +1154,7 @@ class MySQLDatabase(Database):
     def get_binary_type(self): ...
     def conflict_statement(self, on_conflict, query) -> SQL | None: ...
     def conflict_update(self, on_conflict, query) -> NodeList | None: ...
+    def index_hint(self, kind: str, indexes: list[str]) -> NodeList | None: ...
     def extract_date(self, date_part, date_field) -> Function: ...
     def truncate_date(self, date_part, date_field) -> Function: ...
     def to_timestamp(self, date_field) -> Function: ...
@@ -1118,13 +1200,33 @@ class _savepoint(_callable_context_manager):
         self, exc_type: type[BaseException] | None, exc_val: BaseException | None, exc_tb: TracebackType | None
     ) -> None: ...
 
+class _BaseRowCache:
+    def __len__(self) -> int: ...
+    def get_row(self, idx: int): ...
+    def __getitem__(self, item): ...
+    def __iter__(self) -> Iterator[Incomplete]: ...
+
+class WindowRowCache(_BaseRowCache):
+    rows: deque[Incomplete]
+    count: int
+    def __init__(self, size: int) -> None: ...
+    def append(self, row) -> None: ...
+
+class SpillRowCache(_BaseRowCache):
+    size: int
+    rows: list[Incomplete]
+    offsets: list[int]
+    file: Incomplete
+    def __init__(self, size: int) -> None: ...
+    def append(self, row) -> None: ...
+
 class CursorWrapper:
     cursor: Incomplete
     count: int
     index: int
     initialized: bool
     populated: bool
-    row_cache: list[Incomplete]
+    row_cache: list[Incomplete] | _BaseRowCache
     def __init__(self, cursor) -> None: ...
     def __iter__(self): ...
     def __getitem__(self, item): ...
@@ -1216,6 +1318,7 @@ class Field(ColumnBase, Generic[_V]):
     help_text: Incomplete
     verbose_name: Incomplete
     index_type: Incomplete
+    lazy: bool
     # Field constructor args are typed per-field in the __new__ overloads.
     def __init__(self, *args: Any, **kwargs: Any) -> None: ...
     def __hash__(self) -> int: ...
@@ -1356,11 +1459,24 @@ class FieldDatabaseHook:
     def bind(self, model, name, set_attribute: bool = True): ...
 
 class BlobField(FieldDatabaseHook, Field[_V]):
+    as_memoryview: bool
     @overload
-    def __new__(cls, *args: Any, null: Literal[True], **kwargs: Unpack[_FieldKwargs]) -> BlobField[bytes | None]: ...
+    def __new__(
+        cls, *args: Any, as_memoryview: Literal[True], null: Literal[True], **kwargs: Unpack[_FieldKwargs]
+    ) -> BlobField[memoryview | None]: ...
     @overload
-    def __new__(cls, *args: Any, null: Literal[False] = ..., **kwargs: Unpack[_FieldKwargs]) -> BlobField[bytes]: ...
-
+    def __new__(
+        cls, *args: Any, as_memoryview: Literal[True], null: Literal[False] = ..., **kwargs: Unpack[_FieldKwargs]
+    ) -> BlobField[memoryview]: ...
+    @overload
+    def __new__(
+        cls, *args: Any, as_memoryview: Literal[False] = ..., null: Literal[True], **kwargs: Unpack[_FieldKwargs]
+    ) -> BlobField[bytes | None]: ...
+    @overload
+    def __new__(
+        cls, *args: Any, as_memoryview: Literal[False] = ..., null: Literal[False] = ..., **kwargs: Unpack[_FieldKwargs]
+    ) -> BlobField[bytes]: ...
+    def __init__(self, *args, as_memoryview: bool = False, **kwargs) -> None: ...
     def db_value(self, value): ...
 
 class JSONPath(ColumnBase):
@@ -1381,8 +1497,22 @@ class JSONPath(ColumnBase):
     def has_keys(self, key_list) -> Expression: ...
     def has_any_keys(self, key_list) -> Expression: ...
 
+class JSONCodec:
+    __slots__ = ("name", "dumps", "encode", "loads")
+    name: str
+    dumps: Callable[[Any], str]
+    encode: Callable[[Any], bytes]
+    loads: Callable[[str | bytes], Any]
+    def __init__(self, name: str, dumps: Callable[[Any], str | bytes], loads: Callable[[str | bytes], Any], binary: bool = False) -> None: ...
+
+def register_json_codec(
+    name: str, dumps: Callable[[Any], str | bytes], loads: Callable[[str | bytes], Any], binary: bool = False
+) -> JSONCodec: ...
+def get_json_codec(codec: str | JSONCodec | None = None) -> JSONCodec: ...
+def set_json_codec(codec: str | JSONCodec) -> JSONCodec: ...
+
 class JSONField(FieldDatabaseHook, Field):
-    def __init__(self, dumps=None, loads=None, **kwargs) -> None: ...
+    def __init__(self, dumps=None, loads=None, codec: str | JSONCodec | None = None, **kwargs) -> None: ...
     def path(self, *keys): ...
     def length(self) -> Expression: ...
     def append(self, value) -> Expression: ...
@@ -1888,6 +2018,8 @@ class Model(metaclass=ModelBase):
     @classmethod
     def get(cls, *query, **filters) -> Self: ...
     @classmethod
+    def approximate_count(cls) -> int: ...
+    @classmethod
     def get_or_none(cls, *query, **filters) -> Self | None: ...
     @classmethod
     def get_by_id(cls, pk) -> Self: ...
@@ -1896,6 +2028,8 @@ class Model(metaclass=ModelBase):
     @classmethod
     def delete_by_id(cls, pk): ...
     @classmethod
+    def open_blob(cls, field: Field | str, pk, mode: Literal["r", "w"] = "r"): ...
+    @classmethod
     def get_or_create(cls, **kwargs): ...
     @classmethod
     def filter(cls, *dq_nodes, **filters): ...
@@ -1957,6 +2091,7 @@ class _ModelQueryHelper:
     def __init__(self, *args, **kwargs) -> None: ...
     def objects(self, constructor=None) -> Self: ...
     def models(self) -> Self: ...
+    def identity_map(self, identity_map: bool | dict[Any, Any] = True) -> Self: ...
 
 class ModelRaw(_ModelQueryHelper, RawQuery):  # type: ignore[misc]
     model: Incomplete
@@ -1977,6 +2112,7 @@ class BaseModelSelect(_ModelQueryHelper):
     def with_related(
         self, *loads: Load | ForeignKeyField[Any] | BackrefAccessor
     ) -> Self: ...
+    def lazy_decode(self, *fields: Field[Any]) -> Self: ...
     def iterator(self, database: _DatabaseType | None = ...) -> Iterator[Any]: ...
     def get(self, database: _DatabaseType | None = None): ...
     def get_or_none(self, database: _DatabaseType | None = None): ...
@@ -1986,6 +2122,22 @@ class ModelCompoundSelectQuery(BaseModelSelect, CompoundSelectQuery):  # type: i
     model: Incomplete
     def __init__(self, model, *args, **kwargs) -> None: ...
 
+def encode_seek_cursor(values: Iterable[Any]) -> str: ...
+def decode_seek_cursor(token: str) -> list[Any]: ...
+
+class SeekPage(Generic[_M]):
+    items: list[_M]
+    next_cursor: str | None
+    prev_cursor: str | None
+    def __init__(self, items: list[_M], next_cursor: str | None = None, prev_cursor: str | None = None) -> None: ...
+    @property
+    def has_next(self) -> bool: ...
+    @property
+    def has_prev(self) -> bool: ...
+    def __iter__(self) -> Iterator[_M]: ...
+    def __len__(self) -> int: ...
+    def __getitem__(self, idx: int) -> _M: ...
+
 class ModelSelect(BaseModelSelect, Select, Generic[_M]):  # type: ignore[misc]
     model: type[_M]
     def __init__(self, model, fields_or_models, is_default: bool = False) -> None: ...
@@ -2002,6 +2154,26 @@ class ModelSelect(BaseModelSelect, Select, Generic[_M]):  # type: ignore[misc]
     def ensure_join(self, lm, rm, on=None, **join_kwargs): ...
     def convert_dict_to_node(self, qdict) -> tuple[list[Incomplete], list[Incomplete]]: ...
     def filter(self, *args, **kwargs) -> Self: ...
+    def paginate_with_total(
+        self, page: int, paginate_by: int = 20, database: _DatabaseType | None = None
+    ) -> tuple[list[_M], int]: ...
+    def seek(
+        self,
+        after: str | None = None,
+        before: str | None = None,
+        order_by: Sequence[ColumnBase] | None = None,
+        limit: int = 20,
+        database: _DatabaseType | None = None,
+    ) -> SeekPage[_M]: ...
+    def chunks(
+        self,
+        size: int = 1000,
+        by: ColumnBase | Sequence[ColumnBase] | None = None,
+        after: str | None = None,
+        atomic: bool = False,
+        sleep: float | None = None,
+        database: _DatabaseType | None = None,
+    ) -> Generator[SeekPage[_M]]: ...
     def create_table(self, name, safe: bool = True, **meta): ...
     def __sql_selection__(self, ctx, is_subquery: bool = False): ...
 
@@ -2039,7 +2211,9 @@ class BaseModelCursorWrapper(DictCursorWrapper):
     fields: list[Incomplete]
     no_convert: list[int]
     convert: list[int]
-    def __init__(self, cursor, model, columns) -> None: ...
+    lazy: Incomplete
+    identity_map: dict[Any, Any] | None
+    def __init__(self, cursor, model, columns, lazy=None, identity_map=None) -> None: ...
     def initialize(self) -> None: ...
     def process_row(self, row): ...
 
@@ -2061,14 +2235,14 @@ class ModelObjectCursorWrapper(ModelDictCursorWrapper):
     constructor: Incomplete
     is_model: Incomplete
     identifiers: list[str]
-    def __init__(self, cursor, model, select, constructor) -> None: ...
+    def __init__(self, cursor, model, select, constructor, lazy=(), identity_map=None) -> None: ...
     def initialize(self) -> None: ...
     def process_row(self, row): ...
 
 class ModelCursorWrapper(BaseModelCursorWrapper):
     from_list: Incomplete
     joins: Incomplete
-    def __init__(self, cursor, model, select, from_list, joins) -> None: ...
+    def __init__(self, cursor, model, select, from_list, joins, lazy=(), identity_map=None) -> None: ...
     key_to_constructor: Incomplete
     src_to_dest: list[tuple[Incomplete, Incomplete, Incomplete, bool, Incomplete, bool]]
     column_keys: list[Incomplete]
@@ -2105,6 +2279,15 @@ class Load(Node):
         self, *children: Load | ForeignKeyField[Any] | BackrefAccessor
     ) -> Self: ...
 
+def compile_predicate(node: object) -> Callable[[Any], Any]: ...
+
+class ObjectList(list[_T]):
+    def filter(self, *expressions: ColumnBase) -> ObjectList[_T]: ...
+    def where(self, *expressions: ColumnBase) -> ObjectList[_T]: ...
+    def order_by(self, *ordering: ColumnBase) -> ObjectList[_T]: ...
+
+def filter_objects(objects: Iterable[_T], *expressions: ColumnBase) -> ObjectList[_T]: ...
+
 __all__ = [
     "AnyField",
     "AsIs",
@@ -2142,6 +2325,7 @@ __all__ = [
     "Entity",
     "EXCLUDED",
     "Field",
+    "filter_objects",
     "FixedCharField",
     "FloatField",
     "fn",
@@ -2171,9 +2355,11 @@ __all__ = [
     "ProgrammingError",
     "Proxy",
     "QualifiedNames",
+    "register_json_codec",
     "SchemaManager",
     "SmallIntegerField",
     "Select",
+    "set_json_codec",
     "SQL",
     "SqliteDatabase",
     "Table",
@@ -8,6 +8,7 @@ from functools import partial
 from functools import reduce
 from functools import wraps
 from inspect import isclass
+import base64
 import calendar
 import collections
 import datetime
@@ -16,16 +17,21 @@ import hashlib
 import itertools
 import json
 import logging
+import math
 import operator
+import os
+import pickle
 import re
 import socket
 import struct
 import sys
+import tempfile
 import threading
 import time
 import types
 import uuid
 import warnings
+import weakref
 
 try:
     from pysqlite3 import dbapi2 as pysq3
@@ -49,6 +55,8 @@ try:
     from psycopg2 import extensions as pg_extensions
     from psycopg2.extras import register_uuid as pg_register_uuid
     from psycopg2.extras import Json as Json_pg2
+    from psycopg2.extras import register_default_json as pg_register_json
+    from psycopg2.extras import register_default_jsonb as pg_register_jsonb
     pg_register_uuid()
 except ImportError:
     psycopg2 = Json_pg2 = None
@@ -57,6 +65,8 @@ try:
     from psycopg.pq import TransactionStatus
     from psycopg.types.json import Json as Json_pg3
     from psycopg.types.json import Jsonb as Jsonb_pg3
+    from psycopg.types.json import set_json_dumps as pg3_set_json_dumps
+    from psycopg.types.json import set_json_loads as pg3_set_json_loads
 except ImportError:
     psycopg = Json_pg3 = Jsonb_pg3 = None
 
@@ -68,6 +78,15 @@ except ImportError:
     except ImportError:
         mysql = None
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
 
 __version__ = '4.3.0'
 __all__ = [
@@ -107,6 +126,7 @@ __all__ = [
     'Entity',
     'EXCLUDED',
     'Field',
+    'filter_objects',
     'FixedCharField',
     'FloatField',
     'fn',
@@ -136,9 +156,11 @@ __all__ = [
     'ProgrammingError',
     'Proxy',
     'QualifiedNames',
+    'register_json_codec',
     'SchemaManager',
     'SmallIntegerField',
     'Select',
+    'set_json_codec',
     'SQL',
     'SqliteDatabase',
     'Table',
@@ -1091,12 +1113,24 @@ class Table(_HashableSource, BaseTable):
 
         if ctx.scope == SCOPE_SOURCE:
             # Define the table and its alias.
-            return self.apply_alias(ctx.sql(Entity(*self._path)))
+            self.apply_alias(ctx.sql(Entity(*self._path)))
+            return _apply_index_hint(ctx, self)
         else:
             # Refer to the table using the alias.
             return self.apply_column(ctx)
 
 
+def _apply_index_hint(ctx, source):
+    # Index hints are collected by the enclosing query's FROM clause. Hints
+    # the database does not support are silently dropped.
+    hints = ctx.state.index_hints
+    if hints and source in hints and ctx.state.index_hint is not None:
+        node = ctx.state.index_hint(*hints[source])
+        if node is not None:
+            ctx.literal(' ').sql(node)
+    return ctx
+
+
 class Join(BaseTable):
     def __init__(self, lhs, rhs, join_type=JOIN.INNER, on=None, alias=None):
         super(Join, self).__init__(alias=alias)
@@ -2116,6 +2150,8 @@ def database_required(method):
 
 class BaseQuery(Node):
     default_row_type = ROW.DICT
+    _row_cache = None
+    _with_total = None
 
     def __init__(self, _database=None, **kwargs):
         self._database = _database
@@ -2150,6 +2186,26 @@ class BaseQuery(Node):
         self._row_type = ROW.CONSTRUCTOR if constructor else None
         self._constructor = constructor
 
+    @Node.copy
+    def row_cache(self, policy='all', size=None):
+        # Policy may also be given as "window:N" or "spill:N".
+        if ':' in policy:
+            policy, size = policy.split(':', 1)
+            size = int(size)
+        if policy not in ('all', 'none', 'window', 'spill'):
+            raise ValueError('Unrecognized row cache policy: "%s".' % policy)
+        if policy == 'window' and not size:
+            raise ValueError('"window" row cache requires a size.')
+        self._row_cache = None if policy == 'all' else (policy, size)
+
+    def _make_row_cache(self, cursor_wrapper):
+        policy, size = self._row_cache
+        if policy == 'none':
+            return WindowRowCache(1)
+        elif policy == 'window':
+            return WindowRowCache(size)
+        return SpillRowCache(size or 10000, cursor_wrapper.process_row)
+
     def _get_cursor_wrapper(self, cursor):
         row_type = self._row_type or self.default_row_type
 
@@ -2174,6 +2230,10 @@ class BaseQuery(Node):
             context = Context()
         return context.parse(self)
 
+    @database_required
+    def explain(self, database, analyze=False):
+        return database.explain(self, analyze=analyze)
+
     @database_required
     def execute(self, database):
         return self._execute(database)
@@ -2187,8 +2247,16 @@ class BaseQuery(Node):
 
     def _execute(self, database):
         if self._cursor_wrapper is None:
-            cursor = database.execute(self)
+            if self._with_total is not None:
+                # Execute the variant of this query that has a trailing
+                # total-count column, which is stripped from the rows.
+                cursor = _TotalCursor(database.execute(self._with_total))
+            else:
+                cursor = database.execute(self)
             self._cursor_wrapper = self._get_cursor_wrapper(cursor)
+            if self._row_cache is not None:
+                self._cursor_wrapper.row_cache = self._make_row_cache(
+                    self._cursor_wrapper)
         return self._cursor_wrapper
 
     def iterator(self, database=None):
@@ -2375,8 +2443,7 @@ class SelectBase(_HashableSource, Source, SelectQuery):
         for row in self.tuples().execute(database):
             yield row[0]
 
-    @database_required
-    def count(self, database, clear_limit=False):
+    def _count_query(self, clear_limit=False):
         clone = self.order_by().alias('_wrapped')
         if clear_limit:
             clone._limit = clone._offset = None
@@ -2387,7 +2454,23 @@ class SelectBase(_HashableSource, Source, SelectQuery):
                 clone = clone.select(SQL('1'))
         except AttributeError:
             pass
-        return Select([clone], [fn.COUNT(SQL('1'))]).scalar(database)
+        return Select([clone], [fn.COUNT(SQL('1'))])
+
+    @database_required
+    def count(self, database, clear_limit=False, approximate=False,
+              cache=None):
+        if approximate:
+            query = self
+            if clear_limit:
+                query = self.clone()
+                query._limit = query._offset = None
+            estimate = database.approximate_count(query)
+            if estimate is not None:
+                return estimate
+        count_query = self._count_query(clear_limit)
+        if cache:
+            return database._cached_count(count_query, cache)
+        return count_query.scalar(database)
 
     @database_required
     def exists(self, database):
@@ -2566,6 +2649,7 @@ class Select(SelectBase):
         self._windows = tuple(windows) if windows else None
         self._for_update = for_update
         self._lateral = lateral
+        self._index_hints = None
 
         self._distinct = self._simple_distinct = None
         if distinct:
@@ -2676,6 +2760,67 @@ class Select(SelectBase):
     def lateral(self, lateral=True):
         self._lateral = lateral
 
+    def _add_index_hint(self, kind, indexes, source):
+        if source is None:
+            # Default to the first table in the FROM clause.
+            source = self._from_list[0] if self._from_list else None
+            while isinstance(source, Join):
+                source = source.lhs
+            if source is None:
+                raise ValueError('No source to apply index hint to.')
+        if is_model(source):
+            source = source._meta.table
+        hints = dict(self._index_hints or ())
+        hints[source] = (kind, [getattr(index, '_name', index)
+                                for index in indexes])
+        self._index_hints = hints
+
+    @Node.copy
+    def use_index(self, *indexes, source=None):
+        self._add_index_hint('USE', indexes, source)
+
+    @Node.copy
+    def force_index(self, *indexes, source=None):
+        self._add_index_hint('FORCE', indexes, source)
+
+    @Node.copy
+    def ignore_index(self, *indexes, source=None):
+        self._add_index_hint('IGNORE', indexes, source)
+
+    def paginate_with_total(self, page, paginate_by=20, database=None):
+        query = self.paginate(page, paginate_by)
+        total = query._execute_with_total(database)
+        return list(query), total
+
+    def _execute_with_total(self, database=None):
+        database = self._database if database is None else database
+        # Execute a LIMIT/OFFSET query and return the total number of rows
+        # the query would return without them, using a single round-trip.
+        if getattr(database, 'server_version', 0) is None and \
+           database.autoconnect:
+            # Feature flags such as window_functions are set from the server
+            # version when the first connection is opened.
+            database.connect(reuse_if_open=True)
+        if getattr(database, 'window_functions', False) and \
+           self._distinct is None and not self._simple_distinct:
+            total = fn.COUNT(SQL('*')).over()
+        else:
+            total = self._count_query(clear_limit=True)
+        self._cursor_wrapper = None
+        self._with_total = self.select_extend(total.alias('_pw_total'))
+        try:
+            cursor_wrapper = self.execute(database)
+            cursor_wrapper.fill_cache()
+        finally:
+            self._with_total = None
+
+        total = cursor_wrapper.cursor.total
+        if total is None:
+            # No rows were returned, which may be a page past the end.
+            total = self.count(database, clear_limit=True) if self._offset \
+                    else 0
+        return total
+
     def __sql_selection__(self, ctx, is_subquery=False):
         return ctx.sql(CommaNodeList(self._returning))
 
@@ -2697,8 +2842,10 @@ class Select(SelectBase):
             'in_projection': False,
             'parentheses': self._subquery_parens(ctx),
             'subquery': True,
+            'index_hints': None,
         }
 
+        start = len(ctx._sql)
         with ctx.scope_normal(**state):
             # Defer calling parent SQL until here. This ensures that any CTEs
             # for this query will be properly nested if this query is a
@@ -2719,7 +2866,8 @@ class Select(SelectBase):
                                              not is_source)
 
             if self._from_list:
-                with ctx.scope_source(parentheses=False):
+                with ctx.scope_source(parentheses=False,
+                                      index_hints=self._index_hints):
                     ctx.literal(' FROM ').sql(CommaNodeList(self._from_list))
 
             if self._where is not None:
@@ -2745,6 +2893,14 @@ class Select(SelectBase):
                 ctx.literal(' ')
                 ctx.sql(self._for_update)
 
+        if self._index_hints and not is_subquery and \
+           ctx.state.index_hint_comment is not None:
+            # Hints that must lead the statement, e.g. pg_hint_plan. These are
+            # added last, once the sources have been assigned their aliases.
+            comment = ctx.state.index_hint_comment(ctx, self._index_hints)
+            if comment:
+                ctx._sql.insert(start, comment + ' ')
+
         return self._apply_subquery_alias(ctx)
 
 
@@ -3673,6 +3829,78 @@ ForeignKeyMetadata = collections.namedtuple(
 ViewMetadata = collections.namedtuple('ViewMetadata', ('name', 'sql'))
 
 
+class PlanNode(object):
+    def __init__(self, detail, table=None, index=None, rows=None,
+                 full_scan=False, filesort=False, temporary=False,
+                 data=None):
+        self.detail = detail
+        self.table = table
+        self.index = index
+        self.rows = rows
+        self.full_scan = full_scan
+        self.filesort = filesort
+        self.temporary = temporary
+        self.data = data
+        self.children = []
+
+    def __repr__(self):
+        return '<PlanNode: %s>' % self.detail
+
+    @property
+    def warnings(self):
+        accum = []
+        if self.full_scan:
+            accum.append('full scan of %s' % self.table)
+        if self.filesort:
+            accum.append('sort')
+        if self.temporary:
+            accum.append('temporary b-tree/table')
+        return accum
+
+
+class QueryPlan(object):
+    def __init__(self, nodes, raw):
+        self.nodes = nodes
+        self.raw = raw
+
+    def __iter__(self):
+        # Depth-first traversal of every node in the plan.
+        stack = list(reversed(self.nodes))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    @property
+    def full_scans(self):
+        return [node.table for node in self if node.full_scan]
+
+    @property
+    def filesort(self):
+        return any(node.filesort for node in self)
+
+    @property
+    def temporary(self):
+        return any(node.temporary for node in self)
+
+    @property
+    def warnings(self):
+        return [warning for node in self for warning in node.warnings]
+
+    def __str__(self):
+        accum = []
+        def render(node, depth):
+            line = '  ' * depth + node.detail
+            if node.warnings:
+                line += '  [%s]' % ', '.join(node.warnings)
+            accum.append(line)
+            for child in node.children:
+                render(child, depth + 1)
+        for node in self.nodes:
+            render(node, 0)
+        return '\n'.join(accum)
+
+
 class _ConnectionState(object):
     def __init__(self, **kwargs):
         super(_ConnectionState, self).__init__(**kwargs)
@@ -3698,6 +3926,21 @@ class _NoopLock(object):
     def __exit__(self, exc_type, exc_val, exc_tb): pass
 
 
+# Databases are reset in a child process after fork(). Connections inherited
+# from the parent share its sockets / file-handles, so they are never closed
+# (which could terminate the parent's session or release its locks), just
+# kept referenced here so they are not closed when garbage-collected.
+_databases = weakref.WeakSet()
+_fork_orphans = []
+
+def _after_fork_in_child():
+    for database in list(_databases):
+        database._reset_after_fork()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
 class ConnectionContext(object):
     __slots__ = ('db',)
     def __init__(self, db):
@@ -3718,6 +3961,11 @@ class ConnectionContext(object):
         return inner
 
 
+_explainable_re = re.compile(r'^[\s(]*(?:SELECT|INSERT|UPDATE|DELETE|REPLACE|'
+                             r'WITH)\b', re.I)
+_sql_literal_re = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
 class Database(_callable_context_manager):
     context_class = Context
     field_types = {}
@@ -3726,6 +3974,7 @@ class Database(_callable_context_manager):
     quote = '""'
     server_version = None
     json_methods = BaseJSONMethods
+    count_cache_size = 1024
 
     # Feature toggles.
     compound_select_parentheses = CSQ_PARENTHESES_NEVER
@@ -3736,14 +3985,16 @@ class Database(_callable_context_manager):
     limit_max = None
     nulls_ordering = False
     returning_clause = False
+    row_values = True
     safe_create_index = True
     safe_drop_index = True
     sequences = False
     truncate_table = True
+    window_functions = True
 
     def __init__(self, database, thread_safe=True, autorollback=False,
                  field_types=None, operations=None, autocommit=None,
-                 autoconnect=True, **kwargs):
+                 autoconnect=True, json_codec=None, **kwargs):
         self._field_types = merge_dict(FIELD, self.field_types)
         self._operations = merge_dict(OP, self.operations)
         if field_types:
@@ -3752,6 +4003,8 @@ class Database(_callable_context_manager):
             self._operations.update(operations)
 
         self.autoconnect = autoconnect
+        self.json_codec = (get_json_codec(json_codec)
+                           if json_codec is not None else None)
         self.thread_safe = thread_safe
         if thread_safe:
             self._state = _ConnectionLocal()
@@ -3759,6 +4012,9 @@ class Database(_callable_context_manager):
         else:
             self._state = _ConnectionState()
             self._lock = _NoopLock()
+        self._count_cache = {}
+        self._slow_query = None
+        self._slow_query_logged = {}
 
         if autorollback:
             __deprecated__('Peewee no longer uses the "autorollback" option, '
@@ -3778,6 +4034,7 @@ class Database(_callable_context_manager):
 
         self.connect_params = {}
         self.init(database, **kwargs)
+        _databases.add(self)
 
     def init(self, database, **kwargs):
         if not self.is_closed():
@@ -3834,6 +4091,18 @@ class Database(_callable_context_manager):
     def _initialize_connection(self, conn):
         pass
 
+    def _reset_after_fork(self):
+        # Discard the connection inherited by a forked child, without closing
+        # it, and replace the locks, which may have been held by a thread
+        # that does not exist in the child.
+        if self._state.conn is not None:
+            _fork_orphans.append(self._state.conn)
+        if self.thread_safe:
+            self._state = _ConnectionLocal()
+            self._lock = threading.Lock()
+        else:
+            self._state = _ConnectionState()
+
     def _set_server_version(self, conn):
         self.server_version = 0
 
@@ -3879,9 +4148,13 @@ class Database(_callable_context_manager):
     def execute_sql(self, sql, params=None):
         if logger.isEnabledFor(logging.DEBUG):
             logger.debug((sql, params))
+        if self._slow_query is not None:
+            start = time.perf_counter()
         with __exception_wrapper__:
             cursor = self.cursor()
             cursor.execute(sql, params or ())
+        if self._slow_query is not None:
+            self._check_slow_query(sql, params, time.perf_counter() - start)
         return cursor
 
     def execute(self, query, **context_options):
@@ -3899,6 +4172,8 @@ class Database(_callable_context_manager):
             'conflict_statement': self.conflict_statement,
             'conflict_update': self.conflict_update,
             'for_update': self.for_update,
+            'index_hint': self.index_hint,
+            'index_hint_comment': self.index_hint_comment,
             'index_schema_prefix': self.index_schema_prefix,
             'index_using_precedes_table': self.index_using_precedes_table,
             'limit_max': self.limit_max,
@@ -3974,6 +4249,76 @@ class Database(_callable_context_manager):
     def _last_insert_rowid(self, cursor):
         return cursor.lastrowid
 
+    def index_hint(self, kind, indexes):
+        return None
+
+    def index_hint_comment(self, ctx, hints):
+        return None
+
+    def explain(self, query, params=None, analyze=False):
+        if isinstance(query, Node):
+            query, params = self.get_sql_context().sql(query).query()
+        nodes, raw = self._explain(query, params or (), analyze)
+        return QueryPlan(nodes, raw)
+
+    def _explain(self, sql, params, analyze):
+        raise NotImplementedError
+
+    def slow_query_log(self, threshold_ms=50, logger=None,
+                       level=logging.WARNING, explain=True, interval=60,
+                       callback=None):
+        if threshold_ms is None:
+            self._slow_query = None
+            return
+        log = logging.getLogger(logger or 'peewee.slow_query')
+        self._slow_query = (threshold_ms, log, level, explain, interval,
+                            callback)
+        with self._lock:
+            self._slow_query_logged.clear()
+
+    def _check_slow_query(self, sql, params, elapsed):
+        threshold_ms, log, level, explain, interval, callback = \
+                self._slow_query
+        ms = elapsed * 1000
+        if ms < threshold_ms or getattr(self._state, 'explaining', False):
+            return
+
+        # Report each statement at most once per interval. Literal values
+        # are removed so that un-parameterized queries are grouped together.
+        fingerprint = _sql_literal_re.sub('?', sql)
+        now = time.monotonic()
+        with self._lock:
+            logged = self._slow_query_logged.pop(fingerprint, None)
+            if logged is not None and now - logged < interval:
+                self._slow_query_logged[fingerprint] = logged
+                return
+            self._slow_query_logged[fingerprint] = now
+            while len(self._slow_query_logged) > 1024:
+                del self._slow_query_logged[
+                    next(iter(self._slow_query_logged))]
+
+        plan = None
+        if explain and _explainable_re.match(sql):
+            self._state.explaining = True
+            try:
+                # Use a savepoint so a failure does not abort a transaction.
+                if self.in_transaction():
+                    with self.savepoint():
+                        plan = self.explain(sql, params)
+                else:
+                    plan = self.explain(sql, params)
+            except (DatabaseError, NotImplementedError, ValueError):
+                logger.debug('Unable to explain slow query.', exc_info=True)
+            finally:
+                self._state.explaining = False
+
+        if callback is not None:
+            callback(sql, params, ms, plan)
+        elif plan is not None:
+            log.log(level, 'Slow query %0.1fms: %s\n%s', ms, sql, plan)
+        else:
+            log.log(level, 'Slow query %0.1fms: %s', ms, sql)
+
     def last_insert_id(self, cursor, query_type=None):
         if not self.returning_clause:
             return self._last_insert_rowid(cursor)
@@ -4094,6 +4439,57 @@ class Database(_callable_context_manager):
     def sequence_exists(self, seq):
         raise NotImplementedError
 
+    def estimate_row_count(self, table, schema=None):
+        return None
+
+    def _estimate_source(self, query):
+        # Catalog statistics can only answer a bare "SELECT ... FROM table".
+        if not isinstance(query, Select) or len(query._from_list) != 1:
+            return
+        if query._where is not None or query._group_by or \
+           query._having is not None or query._windows or \
+           query._distinct or query._simple_distinct or \
+           query._limit is not None or query._offset or query._cte_list:
+            return
+        source = query._from_list[0]
+        if is_model(source):
+            return source._meta.table_name, source._meta.schema
+        elif isinstance(source, Table):
+            return source.__name__, source._schema
+
+    def approximate_count(self, query):
+        if is_model(query):
+            query = query.select()
+        source = self._estimate_source(query)
+        if source is not None:
+            return self.estimate_row_count(*source)
+
+    def _cached_count(self, query, ttl):
+        sql, params = self.get_sql_context().sql(query).query()
+        key = (sql, tuple(params))
+        try:
+            hash(key)
+        except TypeError:
+            return query.scalar(self)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._count_cache.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        count = query.scalar(self)
+        with self._lock:
+            self._count_cache.pop(key, None)
+            self._count_cache[key] = (now + ttl, count)
+            while len(self._count_cache) > self.count_cache_size:
+                del self._count_cache[next(iter(self._count_cache))]
+        return count
+
+    def clear_count_cache(self):
+        with self._lock:
+            self._count_cache.clear()
+
     def create_tables(self, models, **options):
         for model in sort_models(models):
             model.create_table(**options)
@@ -4143,6 +4539,10 @@ def __pragma__(name):
     return property(__get__, __set__)
 
 
+_sqlite_plan_re = re.compile(r'^(SCAN|SEARCH)(?: TABLE)? (\S+)(.*)$')
+_sqlite_index_re = re.compile(r'USING (?:COVERING )?INDEX (\S+)')
+
+
 class SqliteDatabase(Database):
     field_types = {
         'BIGAUTO': FIELD.AUTO,
@@ -4178,6 +4578,8 @@ class SqliteDatabase(Database):
         self._extensions = set()
         self._attached = {}
         self.nulls_ordering = self.server_version >= (3, 30, 0)
+        self.row_values = self.server_version >= (3, 15, 0)
+        self.window_functions = self.server_version >= (3, 25, 0)
         self.register_function(_sqlite_date_part, 'date_part', 2)
         self.register_function(_sqlite_date_trunc, 'date_trunc', 2)
         self.register_function(_sqlite_json_contains, '_pw_json_contains', 2)
@@ -4396,6 +4798,15 @@ class SqliteDatabase(Database):
             self.execute_sql('DETACH DATABASE ?', (name,))
         return True
 
+    def blob_open(self, table, column, rowid, read_only=False, dbname=None):
+        conn = self.connection()
+        if not hasattr(conn, 'blobopen'):
+            raise NotSupportedError('Incremental blob I/O requires the '
+                                    'sqlite3 module from Python 3.11+.')
+        with __exception_wrapper__:
+            return conn.blobopen(table, column, rowid, readonly=read_only,
+                                 name=dbname or 'main')
+
     def begin(self, lock_type=None):
         statement = 'BEGIN %s' % lock_type if lock_type else 'BEGIN'
         self.execute_sql(statement)
@@ -4420,6 +4831,56 @@ class SqliteDatabase(Database):
                                   'type=? ORDER BY name' % schema, ('table',))
         return [row for row, in cursor.fetchall()]
 
+    def estimate_row_count(self, table, schema=None):
+        # sqlite_stat1 is only created by ANALYZE. The first integer of each
+        # "stat" entry is the number of rows in the index, which is less than
+        # the table's for a partial index, so the largest is used.
+        schema = qesc(schema or 'main')
+        cursor = self.execute_sql('SELECT 1 FROM "%s".sqlite_master WHERE '
+                                  'type=? AND name=?' % schema,
+                                  ('table', 'sqlite_stat1'))
+        if cursor.fetchone() is None:
+            return
+        cursor = self.execute_sql('SELECT MAX(CAST(stat AS INTEGER)) FROM '
+                                  '"%s".sqlite_stat1 WHERE tbl=?' % schema,
+                                  (table,))
+        row = cursor.fetchone()
+        if row and row[0] is not None:
+            return int(row[0])
+
+    def _explain(self, sql, params, analyze):
+        # SQLite does not support EXPLAIN ANALYZE, so only the plan is
+        # returned. Rows are (id, parent, notused, detail).
+        rows = self.execute_sql('EXPLAIN QUERY PLAN %s' % sql,
+                                params).fetchall()
+        nodes, roots = {}, []
+        for row in rows:
+            node = self._plan_node(row[3])
+            nodes[row[0]] = node
+            if row[1] in nodes:
+                nodes[row[1]].children.append(node)
+            else:
+                roots.append(node)
+        return roots, rows
+
+    def _plan_node(self, detail):
+        if detail.startswith('USE TEMP B-TREE'):
+            return PlanNode(detail, filesort='ORDER BY' in detail,
+                            temporary=True)
+        match = _sqlite_plan_re.match(detail)
+        if match is None:
+            return PlanNode(detail)
+        operation, table, rest = match.groups()
+        index = _sqlite_index_re.search(rest)
+        # A SCAN that does not use an index or a subquery visits every row.
+        full_scan = (operation == 'SCAN' and 'USING' not in rest and
+                     'VIRTUAL TABLE' not in rest and
+                     table not in ('CONSTANT', 'SUBQUERY') and
+                     not table.startswith('('))
+        return PlanNode(detail, table=table,
+                        index=index.group(1) if index else None,
+                        full_scan=full_scan)
+
     def get_views(self, schema=None):
         schema = qesc(schema or 'main')
         sql = ('SELECT name, sql FROM "%s".sqlite_master WHERE type=? '
@@ -4523,6 +4984,14 @@ class SqliteDatabase(Database):
 
         return self._build_on_conflict_update(oc, query)
 
+    def index_hint(self, kind, indexes):
+        # SQLite can require a single index, or that no index is used.
+        if kind == 'IGNORE':
+            if not indexes:
+                return SQL('NOT INDEXED')
+        elif len(indexes) == 1:
+            return NodeList((SQL('INDEXED BY'), Entity(indexes[0])))
+
     def extract_date(self, date_part, date_field):
         return fn.date_part(date_part, date_field, python_value=int)
 
@@ -4587,6 +5056,10 @@ class Psycopg2Adapter(_BasePsycopgAdapter):
             pg_extensions.register_type(pg_extensions.UNICODEARRAY, conn)
         if db._encoding:
             conn.set_client_encoding(db._encoding)
+        codec = get_json_codec(db.json_codec)
+        if codec.loads is not json.loads:
+            pg_register_json(conn, loads=codec.loads)
+            pg_register_jsonb(conn, loads=codec.loads)
         return conn
 
     def get_server_version(self, conn):
@@ -4661,7 +5134,12 @@ class Psycopg3Adapter(_BasePsycopgAdapter):
             params.setdefault('conninfo', db.database)
         else:
             params.setdefault('dbname', db.database)
-        return psycopg.connect(**params)
+        conn = psycopg.connect(**params)
+        codec = get_json_codec(db.json_codec)
+        if codec.loads is not json.loads:
+            pg3_set_json_dumps(codec.dumps, conn)
+            pg3_set_json_loads(codec.loads, conn)
+        return conn
 
     def get_server_version(self, conn):
         return conn.pgconn.server_version
@@ -4798,6 +5276,55 @@ class PostgresqlDatabase(Database):
         cursor = self.execute_sql(query, (schema or 'public',))
         return [table for table, in cursor.fetchall()]
 
+    def estimate_row_count(self, table, schema=None):
+        # reltuples is -1 (or 0 on older servers) until the table has been
+        # vacuumed or analyzed.
+        name = '"%s"' % table.replace('"', '""')
+        if schema:
+            name = '"%s".%s' % (schema.replace('"', '""'), name)
+        cursor = self.execute_sql('SELECT reltuples::bigint FROM pg_class '
+                                  'WHERE oid = to_regclass(%s)', (name,))
+        row = cursor.fetchone()
+        if row and row[0] is not None and row[0] >= 0:
+            return int(row[0])
+
+    def approximate_count(self, query):
+        if is_model(query):
+            query = query.select()
+        count = super(PostgresqlDatabase, self).approximate_count(query)
+        if count is None and isinstance(query, SelectBase):
+            # Fall back to the planner's estimate of the rows returned.
+            count = int(self.explain(query).nodes[0].rows)
+        return count
+
+    def _explain(self, sql, params, analyze):
+        options = 'ANALYZE, FORMAT JSON' if analyze else 'FORMAT JSON'
+        cursor = self.execute_sql('EXPLAIN (%s) %s' % (options, sql), params)
+        raw = cursor.fetchone()[0]
+        if isinstance(raw, str):
+            raw = json.loads(raw)
+
+        def convert(plan):
+            node_type = plan['Node Type']
+            detail = node_type
+            if plan.get('Relation Name'):
+                detail += ' on %s' % plan['Relation Name']
+            if plan.get('Index Name'):
+                detail += ' using %s' % plan['Index Name']
+            node = PlanNode(
+                detail,
+                table=plan.get('Relation Name'),
+                index=plan.get('Index Name'),
+                rows=plan.get('Actual Rows', plan.get('Plan Rows')),
+                full_scan=node_type == 'Seq Scan',
+                filesort=node_type in ('Sort', 'Incremental Sort'),
+                data=plan)
+            node.children = [convert(child) for child in
+                             plan.get('Plans', ())]
+            return node
+
+        return [convert(item['Plan']) for item in raw], raw
+
     def get_views(self, schema=None):
         query = ('SELECT viewname, definition FROM pg_catalog.pg_views '
                  'WHERE schemaname = %s ORDER BY viewname')
@@ -4932,6 +5459,23 @@ class PostgresqlDatabase(Database):
 
         return self._build_on_conflict_update(oc, query)
 
+    def index_hint_comment(self, ctx, hints):
+        # Hints are read by the pg_hint_plan extension, and are otherwise
+        # ignored by the server.
+        def quote(name):
+            return '"%s"' % name.replace('"', '""')
+
+        accum = []
+        for source, (kind, indexes) in hints.items():
+            alias = quote(ctx.alias_manager[source])
+            if kind != 'IGNORE':
+                accum.append('IndexScan(%s)' % ' '.join(
+                    [alias] + [quote(index) for index in indexes]))
+            elif not indexes:
+                accum.append('NoIndexScan(%s)' % alias)
+        if accum:
+            return '/*+ %s */' % ' '.join(accum)
+
     def extract_date(self, date_part, date_field):
         return fn.EXTRACT(NodeList((SQL(date_part), SQL('FROM'), date_field)))
 
@@ -4959,6 +5503,45 @@ class PostgresqlDatabase(Database):
             isolation_level)
 
 
+def _mysql_plan_nodes(key, value):
+    # Convert the nested MySQL/MariaDB JSON plan into PlanNodes. Keys that do
+    # not describe a step of the plan (cost_info, etc) are passed through.
+    if isinstance(value, list):
+        return [node for item in value if isinstance(item, dict)
+                for k, v in item.items() for node in _mysql_plan_nodes(k, v)]
+    elif not isinstance(value, dict):
+        return []
+
+    children = [node for k, v in value.items()
+                for node in _mysql_plan_nodes(k, v)]
+    if key == 'table':
+        access_type = value.get('access_type')
+        node = PlanNode(
+            '%s on %s' % (access_type, value.get('table_name')),
+            table=value.get('table_name'),
+            index=value.get('key'),
+            rows=value.get('rows_examined_per_scan', value.get('rows')),
+            full_scan=access_type == 'ALL',
+            filesort=bool(value.get('using_filesort')),
+            temporary=bool(value.get('using_temporary_table')),
+            data=value)
+    elif key in _MYSQL_PLAN_STEPS or key.endswith('_operation'):
+        node = PlanNode(
+            key,
+            filesort=key == 'filesort' or bool(value.get('using_filesort')),
+            temporary=(key == 'temporary_table' or
+                       bool(value.get('using_temporary_table'))),
+            data=value)
+    else:
+        return children
+    node.children = children
+    return [node]
+
+_MYSQL_PLAN_STEPS = frozenset((
+    'duplicates_removal', 'filesort', 'materialized_from_subquery',
+    'query_block', 'temporary_table', 'union_result', 'windowing'))
+
+
 class MySQLDatabase(Database):
     field_types = {
         'AUTO': 'INTEGER AUTO_INCREMENT',
@@ -5013,9 +5596,12 @@ class MySQLDatabase(Database):
             version_raw = conn.get_server_info()
         self.server_version = self._extract_server_version(version_raw)
         # Oracle MySQL has no 10.x, a 10.x server is MariaDB.
-        self._set_csq_grouped(self.mariadb
-                              or 'maria' in str(version_raw).lower()
-                              or self.server_version >= (10,))
+        is_mariadb = (self.mariadb
+                      or 'maria' in str(version_raw).lower()
+                      or self.server_version >= (10,))
+        self._set_csq_grouped(is_mariadb)
+        self.window_functions = (self.server_version >= (10, 2) if is_mariadb
+                                 else self.server_version >= (8, 0))
 
     def _set_csq_grouped(self, is_mariadb):
         supported = (self.server_version >= (10, 4) if is_mariadb
@@ -5076,6 +5662,30 @@ class MySQLDatabase(Database):
                  'AND table_type != %s ORDER BY table_name')
         return [table for table, in self.execute_sql(query, (schema, 'VIEW'))]
 
+    def estimate_row_count(self, table, schema=None):
+        # TABLE_ROWS is an estimate for InnoDB and is cached by MySQL 8.0
+        # according to "information_schema_stats_expiry".
+        cursor = self.execute_sql('SELECT TABLE_ROWS FROM '
+                                  'information_schema.TABLES WHERE '
+                                  'TABLE_SCHEMA = COALESCE(%s, DATABASE()) '
+                                  'AND TABLE_NAME = %s', (schema, table))
+        row = cursor.fetchone()
+        if row and row[0] is not None:
+            return int(row[0])
+
+    def _explain(self, sql, params, analyze):
+        if analyze:
+            self.connection()  # Ensure the server version is known.
+            if self.mariadb or self.server_version >= (10,):
+                prefix = 'ANALYZE FORMAT=JSON'
+            else:
+                prefix = 'EXPLAIN ANALYZE FORMAT=JSON'
+        else:
+            prefix = 'EXPLAIN FORMAT=JSON'
+        cursor = self.execute_sql('%s %s' % (prefix, sql), params)
+        raw = json.loads(cursor.fetchone()[0])
+        return _mysql_plan_nodes('query_block', raw['query_block']), raw
+
     def get_views(self, schema=None):
         query = ('SELECT table_name, view_definition '
                  'FROM information_schema.views '
@@ -5198,6 +5808,12 @@ class MySQLDatabase(Database):
             return NodeList((SQL('ON DUPLICATE KEY UPDATE'),
                              CommaNodeList(updates)))
 
+    def index_hint(self, kind, indexes):
+        if indexes or kind == 'USE':
+            return NodeList((SQL('%s INDEX' % kind),
+                             EnclosedNodeList([Entity(index)
+                                               for index in indexes])))
+
     def extract_date(self, date_part, date_field):
         return fn.EXTRACT(NodeList((SQL(date_part), SQL('FROM'), date_field)))
 
@@ -5361,6 +5977,118 @@ class _savepoint(object):
 # CURSOR REPRESENTATIONS.
 
 
+class _BaseRowCache(object):
+    # List-like row storage for CursorWrapper, indexed by absolute row number.
+    def __len__(self):
+        raise NotImplementedError
+
+    def get_row(self, idx):
+        raise NotImplementedError
+
+    def __getitem__(self, item):
+        n = len(self)
+        if isinstance(item, slice):
+            return [self.get_row(i) for i in range(*item.indices(n))]
+        if item < 0:
+            item += n
+        if item < 0 or item >= n:
+            raise IndexError('row index out of range')
+        return self.get_row(item)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.get_row(i)
+
+    def add(self, row, result):
+        # Called with the raw cursor row and the row built from it.
+        self.append(result)
+
+
+class WindowRowCache(_BaseRowCache):
+    # Retain only the most recently fetched rows.
+    def __init__(self, size):
+        self.rows = collections.deque(maxlen=size)
+        self.count = 0
+
+    def append(self, row):
+        self.rows.append(row)
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+    def get_row(self, idx):
+        offset = idx - (self.count - len(self.rows))
+        if offset < 0:
+            raise ValueError('Row %s has been evicted from the row cache.' %
+                             idx)
+        return self.rows[offset]
+
+
+class SpillRowCache(_BaseRowCache):
+    # Keep the first "size" rows in memory, pickle the rest to a temp file.
+    # The raw cursor rows are spilled, and the row type (e.g. model instance
+    # or namedtuple) is built again by process_row when they are read back.
+    def __init__(self, size, process_row):
+        self.size = size
+        self.process_row = process_row
+        self.rows = []
+        self.offsets = []
+        self.file = None
+
+    def add(self, row, result):
+        if len(self.rows) < self.size:
+            self.rows.append(result)
+            return
+        if self.file is None:
+            self.file = tempfile.TemporaryFile()
+        self.file.seek(0, 2)
+        self.offsets.append(self.file.tell())
+        # Drivers may return memoryviews (e.g. for BYTEA), which cannot be
+        # pickled.
+        row = tuple([bytes(value) if isinstance(value, memoryview) else value
+                     for value in row])
+        pickle.dump(row, self.file, pickle.HIGHEST_PROTOCOL)
+
+    def __len__(self):
+        return len(self.rows) + len(self.offsets)
+
+    def get_row(self, idx):
+        if idx < len(self.rows):
+            return self.rows[idx]
+        self.file.seek(self.offsets[idx - len(self.rows)])
+        return self.process_row(pickle.load(self.file))
+
+
+class _TotalCursor(object):
+    # Cursor proxy that strips the trailing total-count column from each row,
+    # see Select.paginate_with_total().
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.description = cursor.description[:-1]
+        self.total = None
+
+    def _strip(self, row):
+        self.total = row[-1]
+        return row[:-1]
+
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        return row if row is None else self._strip(row)
+
+    def fetchmany(self, *args):
+        return [self._strip(row) for row in self.cursor.fetchmany(*args)]
+
+    def fetchall(self):
+        return [self._strip(row) for row in self.cursor.fetchall()]
+
+    def __iter__(self):
+        return (self._strip(row) for row in self.cursor)
+
+    def __getattr__(self, attr):
+        return getattr(self.cursor, attr)
+
+
 class CursorWrapper(object):
     def __init__(self, cursor):
         self.cursor = cursor
@@ -5409,7 +6137,10 @@ class CursorWrapper(object):
         self.count += 1
         result = self.process_row(row)
         if cache:
-            self.row_cache.append(result)
+            if isinstance(self.row_cache, _BaseRowCache):
+                self.row_cache.add(row, result)
+            else:
+                self.row_cache.append(result)
         return result
 
     def process_row(self, row):
@@ -5509,8 +6240,7 @@ class ResultIterator(object):
         if self.index < self.cursor_wrapper.count:
             obj = self.cursor_wrapper.row_cache[self.index]
         elif not self.cursor_wrapper.populated:
-            self.cursor_wrapper.iterate()
-            obj = self.cursor_wrapper.row_cache[self.index]
+            obj = self.cursor_wrapper.iterate()
         else:
             raise StopIteration
         self.index += 1
@@ -5520,6 +6250,40 @@ class ResultIterator(object):
 
 # FIELDS
 
+class _LazyValue(object):
+    # Raw cursor value for a lazily-decoded field. The accessor converts it on
+    # first access and stores the result back in __data__.
+    __slots__ = ('decode', 'raw')
+
+    def __init__(self, decode, raw):
+        self.decode = decode
+        self.raw = raw
+
+    def resolve(self):
+        return self.decode(self.raw)
+
+    def __reduce__(self):
+        # Pickle the decoded value, e.g. when a row is spilled to disk.
+        return (_unpickle_lazy, (self.resolve(),))
+
+
+def _unpickle_lazy(value):
+    return value
+
+
+def _lazy_converter(decode):
+    def converter(value):
+        return value if value is None else _LazyValue(decode, value)
+    return converter
+
+
+def _resolve_lazy(data, name):
+    value = data.get(name)
+    if value.__class__ is _LazyValue:
+        value = data[name] = value.resolve()
+    return value
+
+
 class FieldAccessor(object):
     def __init__(self, model, field, name):
         self.model = model
@@ -5529,9 +6293,12 @@ class FieldAccessor(object):
     def __get__(self, instance, instance_type=None):
         if instance is not None:
             try:
-                return instance.__data__[self.name]
+                value = instance.__data__[self.name]
             except KeyError:
                 return
+            if value.__class__ is _LazyValue:
+                value = instance.__data__[self.name] = value.resolve()
+            return value
         return self.field
 
     def __set__(self, instance, value):
@@ -5622,7 +6389,7 @@ class Field(ColumnBase):
                  default=None, primary_key=False, constraints=None,
                  sequence=None, collation=None, unindexed=False, choices=None,
                  help_text=None, verbose_name=None, index_type=None,
-                 db_column=None, _hidden=False):
+                 db_column=None, lazy=False, _hidden=False):
         if db_column is not None:
             __deprecated__('"db_column" has been deprecated in favor of '
                            '"column_name" for Field objects.')
@@ -5642,6 +6409,9 @@ class Field(ColumnBase):
         self.help_text = help_text
         self.verbose_name = verbose_name
         self.index_type = index_type or self.default_index_type
+        if lazy and primary_key:
+            raise ValueError('Primary-key fields cannot be lazy.')
+        self.lazy = lazy  # Defer python_value() until first attribute access.
         self._hidden = _hidden
 
         # Used internally for recovering the order in which Fields were defined
@@ -5888,6 +6658,10 @@ class FieldDatabaseHook(object):
 class BlobField(FieldDatabaseHook, Field):
     field_type = 'BLOB'
 
+    def __init__(self, *args, **kwargs):
+        self.as_memoryview = kwargs.pop('as_memoryview', False)
+        super(BlobField, self).__init__(*args, **kwargs)
+
     def _db_hook(self, database):
         if database is None:
             self._constructor = bytearray
@@ -5903,6 +6677,12 @@ class BlobField(FieldDatabaseHook, Field):
             return self._constructor(value)
         return value
 
+    def python_value(self, value):
+        # Wrap without copying; psycopg2 already returns a memoryview.
+        if self.as_memoryview and isinstance(value, (bytes, bytearray)):
+            return memoryview(value)
+        return super(BlobField, self).python_value(value)
+
 
 class BitField(BitwiseMixin, BigIntegerField):
     def __init__(self, *args, **kwargs):
@@ -5949,7 +6729,7 @@ class BigBitFieldData(object):
     def __init__(self, instance, name):
         self.instance = instance
         self.name = name
-        value = self.instance.__data__.get(self.name)
+        value = _resolve_lazy(self.instance.__data__, self.name)
         if not value:
             value = bytearray()
         elif not isinstance(value, bytearray):
@@ -6118,16 +6898,28 @@ def _date_part(date_part):
 _fromisoformat = datetime.datetime.fromisoformat
 
 
+def _parse_iso_datetime(s):
+    if len(s) > 10 and s[10] == ' ':
+        s = s[:10] + 'T' + s[11:]
+    if s[-1:] == 'Z':
+        s = s[:-1] + '+00:00'
+    return _fromisoformat(s)
+
+def _parse_iso_time(s):
+    if len(s) > 10:
+        return _parse_iso_datetime(s)
+    elif s[2:3] != ':':
+        raise ValueError('not an ISO time: %r' % s)
+    # Same base date strptime() uses for time-only formats.
+    return datetime.datetime.combine(datetime.date(1900, 1, 1),
+                                     datetime.time.fromisoformat(s))
+
+
 def format_date_time(value, formats, post_process=None):
     post_process = post_process or (lambda x: x)
     if value:
-        s = value
-        if len(s) > 10 and s[10] == ' ':
-            s = s[:10] + 'T' + s[11:]
-        if s[-1:] == 'Z':
-            s = s[:-1] + '+00:00'
         try:
-            return post_process(_fromisoformat(s))
+            return post_process(_parse_iso_datetime(value))
         except (TypeError, ValueError):
             pass
     for fmt in formats:
@@ -6146,12 +6938,44 @@ def simple_date_time(value):
 
 class _BaseFormattedField(Field):
     formats = None
+    _parse_iso = staticmethod(_parse_iso_datetime)
+
+    # Format from self.formats that last parsed a non-ISO value. It is tried
+    # after the ISO fast-path and before the rest of the formats, since a
+    # column is usually stored in a single format.
+    _last_format = None
 
     def __init__(self, formats=None, *args, **kwargs):
         if formats is not None:
             self.formats = formats
         super(_BaseFormattedField, self).__init__(*args, **kwargs)
 
+    def _format_value(self, value, post_process=None):
+        try:
+            dt = self._parse_iso(value)
+        except (TypeError, ValueError):
+            dt = self._parse_formats(value)
+            if dt is None:
+                return value
+        return post_process(dt) if post_process else dt
+
+    def _parse_formats(self, value):
+        last = self._last_format
+        if last is not None:
+            try:
+                return datetime.datetime.strptime(value, last)
+            except ValueError:
+                pass
+        for fmt in self.formats:
+            if fmt == last:
+                continue
+            try:
+                dt = datetime.datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+            self._last_format = fmt
+            return dt
+
 
 class DateTimeField(_BaseFormattedField):
     field_type = 'DATETIME'
@@ -6165,7 +6989,7 @@ class DateTimeField(_BaseFormattedField):
 
     def adapt(self, value):
         if value and isinstance(value, str):
-            return format_date_time(value, self.formats)
+            return self._format_value(value)
         return value
 
     def to_timestamp(self):
@@ -6192,8 +7016,7 @@ class DateField(_BaseFormattedField):
 
     def adapt(self, value):
         if value and isinstance(value, str):
-            pp = lambda x: x.date()
-            return format_date_time(value, self.formats, pp)
+            return self._format_value(value, datetime.datetime.date)
         elif value and isinstance(value, datetime.datetime):
             return value.date()
         return value
@@ -6218,12 +7041,12 @@ class TimeField(_BaseFormattedField):
         '%Y-%m-%d %H:%M:%S.%f',
         '%Y-%m-%d %H:%M:%S',
     ]
+    _parse_iso = staticmethod(_parse_iso_time)
 
     def adapt(self, value):
         if value:
             if isinstance(value, str):
-                pp = lambda x: x.time()
-                return format_date_time(value, self.formats, pp)
+                return self._format_value(value, datetime.datetime.time)
             elif isinstance(value, datetime.datetime):
                 return value.time()
         if value is not None and isinstance(value, datetime.timedelta):
@@ -6482,18 +7305,81 @@ class JSONPath(ColumnBase):
                                                 key_list)
 
 
+class JSONCodec(object):
+    __slots__ = ('name', 'dumps', 'encode', 'loads')
+
+    def __init__(self, name, dumps, loads, binary=False):
+        # Backends want text, so dumps() always returns str and encode()
+        # returns bytes, regardless of what the library produces. loads()
+        # should accept either.
+        self.name = name
+        if binary:
+            self.encode = dumps
+            self.dumps = lambda obj: dumps(obj).decode('utf8')
+        else:
+            self.dumps = dumps
+            self.encode = lambda obj: dumps(obj).encode('utf8')
+        self.loads = loads
+
+    def __repr__(self):
+        return '<JSONCodec: %s>' % self.name
+
+
+_json_codecs = {}
+
+def register_json_codec(name, dumps, loads, binary=False):
+    codec = _json_codecs[name] = JSONCodec(name, dumps, loads, binary)
+    return codec
+
+def get_json_codec(codec=None):
+    if codec is None:
+        return _json_codec
+    elif isinstance(codec, JSONCodec):
+        return codec
+    try:
+        return _json_codecs[codec]
+    except KeyError:
+        raise ValueError('Unrecognized JSON codec "%s", registered codecs '
+                         'are: %s' % (codec, ', '.join(sorted(_json_codecs))))
+
+def set_json_codec(codec):
+    # Fields resolve the default when bound to a database, so this should be
+    # called before models are declared.
+    global _json_codec
+    _json_codec = get_json_codec(codec)
+    return _json_codec
+
+_json_codec = register_json_codec('json', json.dumps, json.loads)
+if orjson is not None:
+    register_json_codec('orjson', orjson.dumps, orjson.loads, True)
+if msgspec is not None:
+    register_json_codec('msgspec', msgspec.json.encode, msgspec.json.decode,
+                        True)
+
+
 class JSONField(FieldDatabaseHook, Field):
     field_type = 'JSON'
 
-    def __init__(self, dumps=None, loads=None, **kwargs):
-        self._dumps = dumps or json.dumps
-        self._loads = loads or json.loads
+    def __init__(self, dumps=None, loads=None, codec=None, **kwargs):
+        self._custom_dumps = dumps
+        self._custom_loads = loads
+        self._codec = get_json_codec(codec) if codec is not None else None
+        self._set_codec(None)
         self._helper = None
         self._wrap = None
         self._read = None
         super(JSONField, self).__init__(**kwargs)
 
+    def _set_codec(self, database):
+        # Explicit dumps/loads, then the field codec, then the database codec,
+        # then the module default.
+        codec = self._codec or get_json_codec(
+            getattr(database, 'json_codec', None))
+        self._dumps = self._custom_dumps or codec.dumps
+        self._loads = self._custom_loads or codec.loads
+
     def _db_hook(self, database):
+        self._set_codec(database)
         if database is None:
             # Clear implementation-specific stuff.
             self._helper = self._wrap = self._read = None
@@ -6607,6 +7493,8 @@ class ForeignKeyField(Field):
         kwargs.setdefault('index', True)
 
         super(ForeignKeyField, self).__init__(*args, **kwargs)
+        if self.lazy:
+            raise ValueError('ForeignKeyField cannot be lazy.')
 
         if rel_model is not None:
             __deprecated__('"rel_model" has been deprecated in favor of '
@@ -7930,6 +8818,10 @@ class Model(Node, metaclass=ModelBase):
             sq = sq.filter(**filters)
         return sq.get()
 
+    @classmethod
+    def approximate_count(cls):
+        return cls.select().count(approximate=True)
+
     @classmethod
     def get_or_none(cls, *query, **filters):
         try:
@@ -7953,6 +8845,31 @@ class Model(Node, metaclass=ModelBase):
     def delete_by_id(cls, pk):
         return cls.delete().where(cls._meta.primary_key == pk).execute()
 
+    @classmethod
+    def open_blob(cls, field, pk, mode='r'):
+        if mode not in ('r', 'w'):
+            raise ValueError('open_blob() mode must be "r" or "w".')
+        if isinstance(field, str):
+            field = cls._meta.fields[field]
+        blob_open = getattr(cls._meta.database, 'blob_open', None)
+        if blob_open is None:
+            raise NotSupportedError('open_blob() requires a SQLite database.')
+
+        pk_field = cls._meta.primary_key
+        if pk_field is False or isinstance(pk_field, AutoField):
+            rowid = pk  # Alias for the rowid.
+        else:
+            rowid = (cls
+                     .select(SQL('rowid'))
+                     .where(pk_field == pk)
+                     .tuples()
+                     .scalar())
+            if rowid is None:
+                raise cls.DoesNotExist('%s instance matching primary key %s '
+                                       'does not exist.' % (cls.__name__, pk))
+        return blob_open(cls._meta.table_name, field.column_name, rowid,
+                         read_only=mode == 'r', dbname=cls._meta.schema)
+
     @classmethod
     def get_or_create(cls, **kwargs):
         defaults = kwargs.pop('defaults', {})
@@ -8017,6 +8934,9 @@ class Model(Node, metaclass=ModelBase):
 
     def save(self, force_insert=False, only=None):
         field_dict = self.__data__.copy()
+        for key, value in field_dict.items():
+            if value.__class__ is _LazyValue:
+                field_dict[key] = _resolve_lazy(self.__data__, key)
         if self._meta.primary_key is not False:
             pk_field = self._meta.primary_key
             pk_value = self._pk
@@ -8250,10 +9170,11 @@ class ModelAlias(Node):
 
         if ctx.scope == SCOPE_SOURCE:
             # Define the table and its alias.
-            return (ctx
-                    .sql(self.model._meta.entity)
-                    .literal(' AS ')
-                    .sql(Entity(ctx.alias_manager[self])))
+            (ctx
+             .sql(self.model._meta.entity)
+             .literal(' AS ')
+             .sql(Entity(ctx.alias_manager[self])))
+            return _apply_index_hint(ctx, self)
         else:
             # Refer to the table using the alias.
             return ctx.sql(Entity(ctx.alias_manager[self]))
@@ -8309,6 +9230,8 @@ def sort_models(models):
 
 class _ModelQueryHelper(object):
     default_row_type = ROW.MODEL
+    _lazy_fields = ()
+    _identity_map = None
 
     def __init__(self, *args, **kwargs):
         super(_ModelQueryHelper, self).__init__(*args, **kwargs)
@@ -8324,6 +9247,15 @@ class _ModelQueryHelper(object):
     def models(self):
         self._row_type = ROW.MODEL
 
+    @Node.copy
+    def identity_map(self, identity_map=True):
+        # True uses a new map each time the query is executed, a dict can be
+        # passed to share instances across queries.
+        self._identity_map = None if identity_map is False else identity_map
+
+    def _get_identity_map(self):
+        return {} if self._identity_map is True else self._identity_map
+
     def _get_cursor_wrapper(self, cursor):
         row_type = self._row_type or self.default_row_type
         if row_type == ROW.MODEL:
@@ -8337,12 +9269,16 @@ class _ModelQueryHelper(object):
                                                 self._returning)
         elif row_type == ROW.CONSTRUCTOR:
             return ModelObjectCursorWrapper(cursor, self.model,
-                                            self._returning, self._constructor)
+                                            self._returning, self._constructor,
+                                            self._lazy_fields,
+                                            self._get_identity_map())
         else:
             raise ValueError('Unrecognized row type: "%s".' % row_type)
 
     def _get_model_cursor_wrapper(self, cursor):
-        return ModelObjectCursorWrapper(cursor, self.model, [], self.model)
+        return ModelObjectCursorWrapper(cursor, self.model, [], self.model,
+                                        self._lazy_fields,
+                                        self._get_identity_map())
 
 
 class ModelRaw(_ModelQueryHelper, RawQuery):
@@ -8381,7 +9317,8 @@ class BaseModelSelect(_ModelQueryHelper):
     __sub__ = except_
 
     def __iter__(self):
-        if not self._cursor_wrapper:
+        # Not a truth test, as len() would read every row into the cache.
+        if self._cursor_wrapper is None:
             self.execute()
         return iter(self._cursor_wrapper)
 
@@ -8398,7 +9335,9 @@ class BaseModelSelect(_ModelQueryHelper):
         cursor_wrapper = super(BaseModelSelect, self)._execute(database)
         if first_run and self._load_tree and self._model_rows():
             _load_related(list(cursor_wrapper), self, self._load_tree,
-                          database=database)
+                          database=database,
+                          identity_map=getattr(cursor_wrapper, 'identity_map',
+                                               None))
         return cursor_wrapper
 
     def iterator(self, database=None):
@@ -8416,6 +9355,15 @@ class BaseModelSelect(_ModelQueryHelper):
         self._load_tree = tuple(l if isinstance(l, Load) else Load(l)
                                 for l in loads)
 
+    @Node.copy
+    def lazy_decode(self, *fields):
+        # Defer python_value() for the given fields until attribute access.
+        for field in fields:
+            if field.primary_key or isinstance(field, ForeignKeyField):
+                raise ValueError('lazy_decode() does not support primary-key '
+                                 'or foreign-key fields, got %s.' % field)
+        self._lazy_fields = frozenset(fields)
+
     def get(self, database=None):
         clone = self.paginate(1, 1)
         clone._cursor_wrapper = None
@@ -8474,6 +9422,143 @@ def _normalize_model_select(fields_or_models):
     return fields
 
 
+def _seek_default(obj):
+    if isinstance(obj, datetime.datetime):
+        return {'$t': 'datetime', 'v': obj.isoformat()}
+    elif isinstance(obj, datetime.date):
+        return {'$t': 'date', 'v': obj.isoformat()}
+    elif isinstance(obj, datetime.time):
+        return {'$t': 'time', 'v': obj.isoformat()}
+    elif isinstance(obj, decimal.Decimal):
+        return {'$t': 'decimal', 'v': str(obj)}
+    elif isinstance(obj, uuid.UUID):
+        return {'$t': 'uuid', 'v': obj.hex}
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        return {'$t': 'bytes', 'v': base64.b64encode(obj).decode('ascii')}
+    raise TypeError('Unable to encode %r in a seek cursor.' % obj)
+
+_seek_decoders = {
+    'datetime': datetime.datetime.fromisoformat,
+    'date': datetime.date.fromisoformat,
+    'time': datetime.time.fromisoformat,
+    'decimal': decimal.Decimal,
+    'uuid': uuid.UUID,
+    'bytes': base64.b64decode,
+}
+
+def _seek_object_hook(obj):
+    if '$t' in obj:
+        return _seek_decoders[obj['$t']](obj['v'])
+    return obj
+
+def encode_seek_cursor(values):
+    data = json.dumps(list(values), default=_seek_default,
+                      separators=(',', ':'))
+    token = base64.urlsafe_b64encode(data.encode('utf8'))
+    return token.decode('ascii').rstrip('=')
+
+def decode_seek_cursor(token):
+    try:
+        data = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(data, object_hook=_seek_object_hook)
+    except (TypeError, KeyError, ValueError):
+        raise ValueError('Invalid seek cursor: %r' % token)
+    if not isinstance(values, list):
+        raise ValueError('Invalid seek cursor: %r' % token)
+    return values
+
+
+class _SeekTerm(object):
+    __slots__ = ('node', 'key', 'desc', 'nulls_last', 'nullable')
+
+    def __init__(self, node, key, desc, nulls_last, nullable):
+        self.node = node
+        self.key = key
+        self.desc = desc
+        self.nulls_last = nulls_last
+        self.nullable = nullable
+
+    def reverse(self):
+        return _SeekTerm(self.node, self.key, not self.desc,
+                         not self.nulls_last, self.nullable)
+
+    def ordering(self):
+        # NULL placement is made explicit so that it matches the predicate.
+        nulls = None
+        if self.nullable:
+            nulls = 'last' if self.nulls_last else 'first'
+        return Ordering(self.node, 'DESC' if self.desc else 'ASC',
+                        nulls=nulls)
+
+    def after(self, value):
+        # Rows that sort strictly after the given value in this column.
+        if value is None:
+            return None if self.nulls_last else self.node.is_null(False)
+        expr = Expression(self.node, OP.LT if self.desc else OP.GT, value)
+        if self.nullable and self.nulls_last:
+            expr = expr | self.node.is_null()
+        return expr
+
+    def equal(self, value):
+        return self.node.is_null() if value is None else self.node == value
+
+
+def _seek_predicate(terms, values, row_values):
+    directions = set(term.desc for term in terms)
+    if (row_values and len(terms) > 1 and len(directions) == 1 and
+            not any(term.nullable for term in terms)):
+        op = OP.LT if terms[0].desc else OP.GT
+        # Fields are not on the left-hand side of the expression, so apply
+        # their converters to the values explicitly.
+        rhs = [Value(value, getattr(term.node, 'db_value', None))
+               for term, value in zip(terms, values)]
+        return Expression(Tuple(*[term.node for term in terms]), op,
+                          Tuple(*rhs))
+
+    # Expand to: (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND ...).
+    clauses = []
+    prefix = []
+    for term, value in zip(terms, values):
+        after = term.after(value)
+        if after is not None:
+            clauses.append(reduce(operator.and_, prefix + [after]))
+        prefix.append(term.equal(value))
+    if not clauses:
+        return SQL('1 = 0')
+    return reduce(operator.or_, clauses)
+
+
+class SeekPage(object):
+    """
+    A page of results returned by :meth:`ModelSelect.seek`, along with the
+    cursors for requesting the adjacent pages.
+    """
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, idx):
+        return self.items[idx]
+
+    def __repr__(self):
+        return '<SeekPage: %s items>' % len(self.items)
+
+
 class ModelSelect(BaseModelSelect, Select):
     def __init__(self, model, fields_or_models, is_default=False):
         self.model = self._join_ctx = model
@@ -8692,9 +9777,12 @@ class ModelSelect(BaseModelSelect, Select):
     def _get_model_cursor_wrapper(self, cursor):
         if len(self._from_list) == 1 and not self._joins:
             return ModelObjectCursorWrapper(cursor, self.model,
-                                            self._returning, self.model)
+                                            self._returning, self.model,
+                                            self._lazy_fields,
+                                            self._get_identity_map())
         return ModelCursorWrapper(cursor, self.model, self._returning,
-                                  self._from_list, self._joins)
+                                  self._from_list, self._joins,
+                                  self._lazy_fields, self._get_identity_map())
 
     def ensure_join(self, lm, rm, on=None, **join_kwargs):
         join_ctx = self._join_ctx
@@ -8788,6 +9876,119 @@ class ModelSelect(BaseModelSelect, Select):
             query = query.ensure_join(lm, rm, field_obj)
         return query.where(dq_node)
 
+    def _seek_terms(self, order_by):
+        terms = []
+        seen = set()
+        for item in order_by:
+            if isinstance(item, Ordering):
+                node, desc = item.node, item.direction == 'DESC'
+                nulls = item.nulls
+            else:
+                node, desc, nulls = item, False, None
+            if isinstance(node, Field) and node.model is not self.model:
+                raise ValueError('seek() ordering must use fields of %s, got '
+                                 '%s.' % (self.model.__name__, node))
+            key = compile_predicate(node)
+            node = node.unalias()
+            # By default NULLs sort first ascending and last descending.
+            nulls_last = nulls.lower() == 'last' if nulls else desc
+            nullable = not isinstance(node, Field) or node.null
+            terms.append(_SeekTerm(node, key, desc, nulls_last, nullable))
+            if isinstance(node, Field):
+                seen.add(node.name)
+
+        # Ensure the ordering is unique by finishing with the primary key.
+        pk = self.model._meta.primary_key
+        if pk is not False:
+            pk_fields = (self.model._meta.get_primary_keys()
+                         if isinstance(pk, CompositeKey) else (pk,))
+            desc = terms[-1].desc if terms else False
+            for field in pk_fields:
+                if field.name not in seen:
+                    terms.append(_SeekTerm(field, compile_predicate(field),
+                                           desc, desc, False))
+        return terms
+
+    def seek(self, after=None, before=None, order_by=None, limit=20,
+             database=None):
+        if after is not None and before is not None:
+            raise ValueError('seek() accepts one of "after" or "before".')
+        if not self._model_rows():
+            raise ValueError('seek() requires model instance rows.')
+        terms = self._seek_terms(order_by or self._order_by or ())
+        if not terms:
+            raise ValueError('seek() requires an ordering or a primary key.')
+
+        token = before if before is not None else after
+        query = self.clone()
+        query._cursor_wrapper = None
+        if before is not None:
+            # Read backwards from the cursor, then restore the order.
+            query_terms = [term.reverse() for term in terms]
+        else:
+            query_terms = terms
+
+        if token is not None:
+            values = decode_seek_cursor(token)
+            if len(values) != len(terms):
+                raise ValueError('Seek cursor does not match the ordering.')
+            database = self._database if database is None else database
+            row_values = getattr(database, 'row_values', False)
+            query = query.where(_seek_predicate(query_terms, values,
+                                                row_values))
+
+        query = (query
+                 .order_by(*[term.ordering() for term in query_terms])
+                 .limit(limit + 1)
+                 .offset(None))
+        items = list(query.execute(database))
+        has_more = len(items) > limit
+        items = items[:limit]
+        if before is not None:
+            items.reverse()
+
+        def cursor(obj):
+            return encode_seek_cursor([term.key(obj) for term in terms])
+
+        if before is not None:
+            has_next, has_prev = True, has_more
+        else:
+            has_next, has_prev = has_more, after is not None
+
+        next_cursor = prev_cursor = None
+        if items and has_next:
+            next_cursor = cursor(items[-1])
+        if items and has_prev:
+            prev_cursor = cursor(items[0])
+        return SeekPage(items, next_cursor, prev_cursor)
+
+    def chunks(self, size=1000, by=None, after=None, atomic=False,
+               sleep=None, database=None):
+        if by is not None and not isinstance(by, (list, tuple)):
+            by = (by,)
+        database = self._database if database is None else database
+        token = after
+        while True:
+            if atomic:
+                # Work done on the chunk is committed when the next chunk is
+                # requested, and rolled back if iteration stops early.
+                with database.atomic():
+                    page = self.seek(after=token, order_by=by, limit=size,
+                                     database=database)
+                    if page.items:
+                        yield page
+            else:
+                page = self.seek(after=token, order_by=by, limit=size,
+                                 database=database)
+                if page.items:
+                    yield page
+
+            if not page.has_next:
+                break
+            token = page.next_cursor
+            if sleep:
+                time.sleep(sleep)
+
     def create_table(self, name, safe=True, **meta):
         return self.model._schema.create_table_as(name, self, safe, **meta)
 
@@ -8939,12 +10140,14 @@ def safe_python_value(conv_func):
     return validate
 
 
-def _resolve_model_columns(cursor, model, select):
+def _resolve_model_columns(cursor, model, select, lazy=None):
     # Resolve cursor columns against a model's selected nodes. Returns a tuple
     # of ``(columns, fields, converters, no_convert, convert)``:
     # ``columns`` and ``fields`` are aligned per-column lists,
     # ``converters`` is a per-column ``python_value`` callable or ``None``,
     # ``no_convert``/``convert`` are the index partitions of ``converters``.
+    # ``lazy`` is None when rows are not model instances, otherwise the fields
+    # to defer in addition to those declared with ``lazy=True``.
     combined = model._meta.combined
     table = model._meta.table
     description = cursor.description
@@ -8990,7 +10193,10 @@ def _resolve_model_columns(cursor, model, select):
         # returned by the database-cursor into a Python object.
         if isinstance(node, Field):
             if raw_node._coerce:
-                converters[idx] = node.python_value
+                if lazy is not None and (node.lazy or node in lazy):
+                    converters[idx] = _lazy_converter(node.python_value)
+                else:
+                    converters[idx] = node.python_value
             fields[idx] = node
             if not is_alias:
                 columns[idx] = node.name
@@ -9030,16 +10236,35 @@ def _resolve_model_columns(cursor, model, select):
     return columns, fields, converters, no_convert, convert
 
 
+def _identity_key(instance):
+    # Identity-map key for a model instance, None if it has no pk value.
+    if instance._meta.primary_key is False:
+        return
+    pk = instance.get_id()
+    if pk is None or (isinstance(pk, tuple) and None in pk):
+        return
+    return (type(instance), pk)
+
+
 class BaseModelCursorWrapper(DictCursorWrapper):
-    def __init__(self, cursor, model, columns):
+    def __init__(self, cursor, model, columns, lazy=None, identity_map=None):
         super(BaseModelCursorWrapper, self).__init__(cursor)
         self.model = model
         self.select = columns or []
+        self.lazy = lazy
+        self.identity_map = identity_map
+
+    def _identity(self, instance):
+        # Return the instance already seen for this (model, pk), if any.
+        key = _identity_key(instance)
+        if key is None:
+            return instance
+        return self.identity_map.setdefault(key, instance)
 
     def initialize(self):
         (self.columns, self.fields, self.converters,
          self.no_convert, self.convert) = _resolve_model_columns(
-            self.cursor, self.model, self.select)
+            self.cursor, self.model, self.select, self.lazy)
         self.ncols = len(self.columns)
 
     def process_row(self, row):
@@ -9082,10 +10307,15 @@ class ModelNamedTupleCursorWrapper(ModelTupleCursorWrapper):
 
 
 class ModelObjectCursorWrapper(ModelDictCursorWrapper):
-    def __init__(self, cursor, model, select, constructor):
+    def __init__(self, cursor, model, select, constructor, lazy=(),
+                 identity_map=None):
         self.constructor = constructor
         self.is_model = is_model(constructor)
-        super(ModelObjectCursorWrapper, self).__init__(cursor, model, select)
+        # Lazy decoding and identity-mapping only apply to model instances.
+        if not self.is_model:
+            lazy = identity_map = None
+        super(ModelObjectCursorWrapper, self).__init__(
+            cursor, model, select, lazy, identity_map)
 
     def initialize(self):
         super(ModelObjectCursorWrapper, self).initialize()
@@ -9103,14 +10333,18 @@ class ModelObjectCursorWrapper(ModelDictCursorWrapper):
             # Clear out any dirty fields before returning to the user.
             obj = self.constructor(__no_default__=1, **result)
             obj._dirty.clear()
+            if self.identity_map is not None:
+                return self._identity(obj)
             return obj
         else:
             return self.constructor(**result)
 
 
 class ModelCursorWrapper(BaseModelCursorWrapper):
-    def __init__(self, cursor, model, select, from_list, joins):
-        super(ModelCursorWrapper, self).__init__(cursor, model, select)
+    def __init__(self, cursor, model, select, from_list, joins, lazy=(),
+                 identity_map=None):
+        super(ModelCursorWrapper, self).__init__(cursor, model, select, lazy,
+                                                 identity_map)
         self.from_list = from_list
         self.joins = joins
 
@@ -9241,6 +10475,17 @@ class ModelCursorWrapper(BaseModelCursorWrapper):
             else:
                 setattr(instance, column, value)
 
+        # Swap in instances already seen for the same (model, pk). Their dirty
+        # state is preserved, since relationship assignment marks fks dirty.
+        reused = []
+        if self.identity_map is not None:
+            for key, instance in objects.items():
+                if isinstance(instance, Model):
+                    existing = self._identity(instance)
+                    if existing is not instance:
+                        objects[key] = existing
+                        reused.append((existing, set(existing._dirty)))
+
         # Need to do some analysis on the joins before this.
         for (src, attr, dest, is_dict, is_outer, is_fk) in self.src_to_dest:
             instance = objects.get(src)
@@ -9277,6 +10522,8 @@ class ModelCursorWrapper(BaseModelCursorWrapper):
         # When instantiating models from a cursor, we clear the dirty fields.
         for instance in model_list:
             instance._dirty.clear()
+        for instance, dirty in reused:
+            instance._dirty.intersection_update(dirty)
 
         return objects[self.model]
 
@@ -9442,6 +10689,11 @@ def prefetch(sq, *subqueries, **kwargs):
         raise ValueError('prefetch_type must be a PREFETCH_TYPE value.')
 
     fixed_queries = prefetch_add_subquery(sq, subqueries, prefetch_type)
+    if getattr(sq, '_identity_map', None) is not None:
+        # Related queries share the root query's identity map.
+        id_map = sq._get_identity_map()
+        fixed_queries = [pq._replace(query=pq.query.identity_map(id_map))
+                         for pq in fixed_queries]
     deps = {}
     rel_map = {}
     for pq in reversed(fixed_queries):
@@ -9563,7 +10815,8 @@ class Load(Node):
         return _relate_parent(query, parent_query, [(field.rel_field, fk)],
                               self._strategy)
 
-    def _run(self, parents, parent_query, depth=0, database=None):
+    def _run(self, parents, parent_query, depth=0, database=None,
+             identity_map=None):
         field = self._field
         if self._is_backref:
             if self._per_parent is not None:
@@ -9574,6 +10827,8 @@ class Load(Node):
         else:
             child_query = self._link_parent(self._base(field.rel_model),
                                             parent_query, parents)
+        if identity_map is not None:
+            child_query = child_query.identity_map(identity_map)
         # The whole tree runs on the database the parent ran against.
         children = list(child_query.execute(database))
         _bucket(field, self._is_backref, children, parents)
@@ -9628,13 +10883,329 @@ class Load(Node):
                 .order_by(cte.c._rn))
 
 
-def _load_related(parents, parent_query, loads, depth=0, database=None):
+def _load_related(parents, parent_query, loads, depth=0, database=None,
+                  identity_map=None):
     # Walk the tree top-down: one query per relation, bucketed onto parents.
     if not parents:
         return
     for node in loads:
         children, child_query = node._run(parents, parent_query, depth,
-                                          database)
+                                          database, identity_map)
         if node._children:
             _load_related(children, child_query, node._children, depth + 1,
-                          database)
+                          database, identity_map)
+
+
+# IN-MEMORY EVALUATION.
+
+def _null_safe(op):
+    # Comparisons follow SQL semantics, any NULL operand yields NULL.
+    def inner(lhs, rhs):
+        if lhs is None or rhs is None:
+            return None
+        return op(lhs, rhs)
+    return inner
+
+def _is(lhs, rhs):
+    return lhs is None if rhs is None else lhs == rhs
+
+def _in(lhs, rhs):
+    return None if lhs is None else lhs in rhs
+
+def _not_in(lhs, rhs):
+    return None if lhs is None else lhs not in rhs
+
+def _int_div(lhs, rhs):
+    # Integer division truncates towards zero, as in SQLite and Postgres.
+    quotient = abs(lhs) // abs(rhs)
+    return quotient if (lhs < 0) == (rhs < 0) else -quotient
+
+def _div(lhs, rhs):
+    if isinstance(lhs, int) and isinstance(rhs, int):
+        return _int_div(lhs, rhs)
+    return lhs / rhs
+
+def _mod(lhs, rhs):
+    if isinstance(lhs, int) and isinstance(rhs, int):
+        return lhs - rhs * _int_div(lhs, rhs)
+    return math.fmod(lhs, rhs)
+
+def _concat(lhs, rhs):
+    if lhs is None or rhs is None:
+        return None
+    return '%s%s' % (lhs, rhs)
+
+def _like_regex(pattern, escape=None, flags=0):
+    accum = []
+    chars = iter(pattern)
+    for char in chars:
+        if char == escape:
+            accum.append(re.escape(next(chars, '')))
+        elif char == '%':
+            accum.append('.*')
+        elif char == '_':
+            accum.append('.')
+        else:
+            accum.append(re.escape(char))
+    return re.compile('^%s$' % ''.join(accum), flags | re.S)
+
+_OBJECT_OPS = {
+    OP.EQ: _null_safe(operator.eq),
+    OP.NE: _null_safe(operator.ne),
+    OP.LT: _null_safe(operator.lt),
+    OP.LTE: _null_safe(operator.le),
+    OP.GT: _null_safe(operator.gt),
+    OP.GTE: _null_safe(operator.ge),
+    OP.ADD: _null_safe(operator.add),
+    OP.SUB: _null_safe(operator.sub),
+    OP.MUL: _null_safe(operator.mul),
+    OP.DIV: _null_safe(_div),
+    OP.MOD: _null_safe(_mod),
+    OP.BIN_AND: _null_safe(operator.and_),
+    OP.BIN_OR: _null_safe(operator.or_),
+    OP.XOR: _null_safe(operator.xor),
+    OP.IS: _is,
+    OP.IS_NOT: lambda lhs, rhs: not _is(lhs, rhs),
+    OP.IN: _in,
+    OP.NOT_IN: _not_in,
+    OP.CONCAT: _concat,
+}
+
+def _coalesce(*args):
+    for arg in args:
+        if arg is not None:
+            return arg
+
+def _substr(s, start, length=None):
+    if s is None:
+        return None
+    start = start - 1 if start > 0 else start
+    return s[start:] if length is None else s[start:start + length]
+
+def _null_safe_unary(func):
+    def inner(value):
+        return None if value is None else func(value)
+    return inner
+
+_OBJECT_FUNCTIONS = {
+    'abs': _null_safe_unary(abs),
+    'coalesce': _coalesce,
+    'ifnull': _coalesce,
+    'length': _null_safe_unary(len),
+    'lower': _null_safe_unary(str.lower),
+    'ltrim': _null_safe_unary(str.lstrip),
+    'max': lambda *args: None if None in args else max(args),
+    'min': lambda *args: None if None in args else min(args),
+    'round': lambda v, n=0: None if v is None else round(v, n),
+    'rtrim': _null_safe_unary(str.rstrip),
+    'substr': _substr,
+    'trim': _null_safe_unary(str.strip),
+    'upper': _null_safe_unary(str.upper),
+}
+
+
+def compile_predicate(node):
+    """
+    Compile an expression into a function that evaluates it against a model
+    instance, e.g. ``compile_predicate(User.age > 30)(user)``.
+    """
+    if isinstance(node, ForeignKeyField):
+        return operator.attrgetter(node.object_id_name)
+    elif isinstance(node, Field):
+        return operator.attrgetter(node.name)
+    elif isinstance(node, (Alias, BindTo, Ordering)):
+        return compile_predicate(node.node)
+    elif isinstance(node, Negated):
+        inner = compile_predicate(node.node)
+        def negated(obj):
+            value = inner(obj)
+            return None if value is None else not value
+        return negated
+    elif isinstance(node, Value):
+        if node.multi:
+            return compile_predicate(node.value)
+        return lambda obj, value=node.value: value
+    elif isinstance(node, Expression):
+        return _compile_expression(node)
+    elif isinstance(node, Function):
+        return _compile_function(node)
+    elif isinstance(node, Case):
+        return _compile_case(node)
+    elif isinstance(node, multi_types):
+        node = tuple(node)
+        if any(isinstance(item, Node) for item in node):
+            items = [compile_predicate(item) for item in node]
+            return lambda obj: tuple([item(obj) for item in items])
+        try:
+            value = frozenset(node)
+        except TypeError:
+            value = node
+        return lambda obj: value
+    elif isinstance(node, Node):
+        raise ValueError('%s cannot be evaluated in Python.' %
+                         type(node).__name__)
+    return lambda obj: node
+
+
+def _compile_expression(node):
+    lhs = compile_predicate(node.lhs)
+    op = node.op
+    field = node.lhs.unwrap() if isinstance(node.lhs, Node) else None
+    if isinstance(field, ForeignKeyField):
+        # Compare related instances by the value of the referenced field.
+        to_value = lambda v: (getattr(v, field.rel_field.name)
+                              if isinstance(v, Model) else v)
+        if isinstance(node.rhs, multi_types):
+            node = Expression(node.lhs, op, [to_value(v) for v in node.rhs])
+        else:
+            node = Expression(node.lhs, op, to_value(node.rhs))
+    if op == OP.AND:
+        # Three-valued logic: false if either side is false, otherwise NULL
+        # if either side is NULL.
+        rhs = compile_predicate(node.rhs)
+        def and_(obj):
+            lvalue = lhs(obj)
+            if lvalue is not None and not lvalue:
+                return False
+            rvalue = rhs(obj)
+            if rvalue is not None and not rvalue:
+                return False
+            return None if lvalue is None or rvalue is None else True
+        return and_
+    elif op == OP.OR:
+        # True if either side is true, otherwise NULL if either is NULL.
+        rhs = compile_predicate(node.rhs)
+        def or_(obj):
+            lvalue = lhs(obj)
+            if lvalue:
+                return True
+            rvalue = rhs(obj)
+            if rvalue:
+                return True
+            return None if lvalue is None or rvalue is None else False
+        return or_
+    elif op == OP.BETWEEN:
+        lo, hi = [compile_predicate(n) for n in node.rhs.nodes[::2]]
+        def between(obj):
+            value, low, high = lhs(obj), lo(obj), hi(obj)
+            if value is None or low is None or high is None:
+                return None
+            return low <= value <= high
+        return between
+    elif op in (OP.LIKE, OP.ILIKE, OP.REGEXP, OP.IREGEXP):
+        return _compile_match(lhs, op, node.rhs)
+    elif op in _OBJECT_OPS:
+        operation = _OBJECT_OPS[op]
+        rhs = compile_predicate(node.rhs)
+        return lambda obj: operation(lhs(obj), rhs(obj))
+    raise ValueError('Operation "%s" cannot be evaluated in Python.' % op)
+
+
+def _compile_match(lhs, op, rhs):
+    flags = re.I if op in (OP.ILIKE, OP.IREGEXP) else 0
+    if op in (OP.LIKE, OP.ILIKE):
+        escape = None
+        if isinstance(rhs, NodeList) and len(rhs.nodes) == 3:
+            # Escaped pattern generated by contains(), startswith(), etc.
+            rhs, escape = rhs.nodes[0].value, rhs.nodes[2].value
+        make = lambda pattern: _like_regex(pattern, escape, flags)
+    else:
+        make = lambda pattern: re.compile(pattern, flags)
+
+    if isinstance(rhs, Node):
+        pattern = compile_predicate(rhs)
+        def match(obj):
+            value, p = lhs(obj), pattern(obj)
+            if value is None or p is None:
+                return None
+            return make(p).search(value) is not None
+    else:
+        regex = make(rhs)
+        def match(obj):
+            value = lhs(obj)
+            return None if value is None else regex.search(value) is not None
+    return match
+
+
+def _compile_function(node):
+    name = (node.name or '').lower()
+    if name not in _OBJECT_FUNCTIONS or node._filter or node._order_by:
+        raise ValueError('Function "%s" cannot be evaluated in Python.' %
+                         node.name)
+    func = _OBJECT_FUNCTIONS[name]
+    args = [compile_predicate(arg) for arg in node.arguments]
+    return lambda obj: func(*[arg(obj) for arg in args])
+
+
+def _compile_case(node):
+    predicate = (compile_predicate(node.predicate)
+                 if node.predicate is not None else None)
+    whens = [(compile_predicate(expr), compile_predicate(value))
+             for expr, value in node.expression_tuples]
+    default = compile_predicate(node.default)
+    def case(obj):
+        if predicate is not None:
+            value = predicate(obj)
+            for expr, result in whens:
+                if value == expr(obj):
+                    return result(obj)
+        else:
+            for expr, result in whens:
+                if expr(obj):
+                    return result(obj)
+        return default(obj)
+    return case
+
+
+def _ordering_key(node):
+    if isinstance(node, Ordering):
+        desc = node.direction == 'DESC'
+        nulls = node.nulls
+    else:
+        desc, nulls = False, None
+    # By default NULLs sort as the smallest value, as in SQLite and MySQL.
+    nulls_last = nulls.lower() == 'last' if nulls else desc
+    key = compile_predicate(node)
+    if nulls_last != desc:
+        def sort_key(obj):
+            value = key(obj)
+            return (value is None, value)
+    else:
+        def sort_key(obj):
+            value = key(obj)
+            return (value is not None, value)
+    return sort_key, desc
+
+
+class ObjectList(list):
+    """
+    List of model instances that can be filtered and ordered in Python using
+    the same expressions used to build queries. See :func:`filter_objects`.
+    """
+    def filter(self, *expressions):
+        if not expressions:
+            return ObjectList(self)
+        predicate = compile_predicate(reduce(operator.and_, expressions))
+        return ObjectList([obj for obj in self if predicate(obj)])
+    where = filter
+
+    def order_by(self, *ordering):
+        accum = ObjectList(self)
+        # Python's sort is stable, so apply the least-significant key first.
+        for node in reversed(ordering):
+            key, desc = _ordering_key(node)
+            accum.sort(key=key, reverse=desc)
+        return accum
+
+
+def filter_objects(objects, *expressions):
+    """
+    Filter a list of model instances in Python, using query expressions:
+
+    .. code-block:: python
+
+        users = list(User.select())
+        active = filter_objects(users, (User.age > 30) & User.active)
+        by_name = active.order_by(User.name)
+    """
+    return ObjectList(objects).filter(*expressions)
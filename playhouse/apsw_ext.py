@@ -41,6 +41,10 @@ class APSWDatabase(SqliteDatabase):
     def unregister_module(self, mod_name):
         del(self._modules[mod_name])
 
+    def blob_open(self, table, column, rowid, read_only=False, dbname=None):
+        return self.connection().blobopen(dbname or 'main', table, column,
+                                          rowid, not read_only)
+
     def _connect(self):
         conn = apsw.Connection(self.database, **self.connect_params)
         if self._timeout is not None:
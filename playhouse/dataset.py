@@ -1,6 +1,8 @@
 import base64
 import csv
 import datetime
+import gzip
+import io
 import json
 import operator
 import uuid
@@ -10,6 +12,7 @@ from urllib.parse import urlparse
 
 from peewee import *
 from peewee import _StringField
+from peewee import ROW
 from playhouse.db_url import connect
 from playhouse.migrate import migrate
 from playhouse.migrate import SchemaMigrator
@@ -53,15 +56,13 @@ class DataSet(object):
         return '<DataSet: %s>' % self._database_path
 
     def get_export_formats(self):
-        return {
-            'csv': CSVExporter,
-            'json': JSONExporter,
-            'tsv': TSVExporter}
+        return dict(EXPORT_FORMATS)
 
     def get_import_formats(self):
         return {
             'csv': CSVImporter,
             'json': JSONImporter,
+            'jsonl': JSONLinesImporter,
             'tsv': TSVImporter}
 
     def __getitem__(self, table):
@@ -152,20 +153,24 @@ class DataSet(object):
 
     def freeze(self, query, format='csv', filename=None, file_obj=None,
                encoding='utf8', iso8601_datetimes=False, base64_bytes=False,
-               **kwargs):
+               compress=None, **kwargs):
         self._check_arguments(filename, file_obj, format, self._export_formats)
         if filename:
-            file_obj = open(filename, 'w', encoding=encoding)
+            if compress:
+                file_obj = open(filename, 'wb')
+            else:
+                file_obj = open(filename, 'w', encoding=encoding)
 
         exporter = self._export_formats[format](
             query,
             iso8601_datetimes=iso8601_datetimes,
             base64_bytes=base64_bytes)
 
-        exporter.export(file_obj, **kwargs)
-
-        if filename:
-            file_obj.close()
+        try:
+            _export(exporter, file_obj, compress, encoding, **kwargs)
+        finally:
+            if filename:
+                file_obj.close()
 
     def thaw(self, table, format='csv', filename=None, file_obj=None,
              strict=False, encoding='utf8', iso8601_datetimes=False,
@@ -332,10 +337,15 @@ class Table(object):
 
 
 class Exporter(object):
-    def __init__(self, query, iso8601_datetimes=False, base64_bytes=False):
+    # Field types whose python values can be written out as-is.
+    plain_fields = (BooleanField, FloatField, IntegerField, _StringField)
+
+    def __init__(self, query, iso8601_datetimes=False, base64_bytes=False,
+                 batch_size=1000):
         self.query = query
         self.iso8601_datetimes = iso8601_datetimes
         self.base64_bytes = base64_bytes
+        self.batch_size = batch_size
 
     def _export_value(self, value):
         if isinstance(value, _datetime_types):
@@ -348,6 +358,59 @@ class Exporter(object):
             return value.hex()
         return value
 
+    def _is_plain(self, field):
+        # Subclasses that convert values read from the database, such as
+        # TimestampField, may return types that need formatting.
+        for base in self.plain_fields:
+            if isinstance(field, base):
+                cls = type(field)
+                return (cls.python_value is base.python_value and
+                        cls.adapt is base.adapt)
+        return False
+
+    def _get_formatters(self, fields):
+        # Pick the formatter for each column once, up-front, so that columns
+        # of plain types are not inspected on every row.
+        return [(idx, self._export_value) for idx, field in enumerate(fields)
+                if not self._is_plain(field)]
+
+    def iter_batches(self):
+        """
+        Execute the query and return a 2-tuple of the cursor wrapper and a
+        generator yielding lists of rows, read from the cursor in batches of
+        batch_size. Rows are lists of exportable values.
+        """
+        query = self.query.tuples()
+        if not query._database:
+            raise InterfaceError('Query must be bound to a database in order '
+                                 'to be exported.')
+        cursor = query._database.execute(query)
+        wrapper = query._get_cursor_wrapper(cursor)
+        wrapper.initialize()
+        if getattr(wrapper, 'columns', None) is None:
+            wrapper.columns = [col_spec[0] for col_spec in cursor.description]
+        fields = getattr(wrapper, 'fields', None)
+        formatters = self._get_formatters(fields or wrapper.columns)
+
+        def batches():
+            process_row = wrapper.process_row
+            try:
+                while True:
+                    rows = cursor.fetchmany(self.batch_size)
+                    if not rows:
+                        break
+                    accum = []
+                    for row in rows:
+                        row = list(process_row(row))
+                        for idx, formatter in formatters:
+                            row[idx] = formatter(row[idx])
+                        accum.append(row)
+                    yield accum
+            finally:
+                cursor.close()
+
+        return wrapper, batches()
+
     def export(self, file_obj):
         raise NotImplementedError
 
@@ -365,22 +428,65 @@ class JSONExporter(Exporter):
         return default
 
     def export(self, file_obj, **kwargs):
-        json.dump(
-            list(self.query),
-            file_obj,
-            default=self._make_default(),
-            **kwargs)
+        # The array is written one batch at a time, laid out the same way
+        # json.dump() would lay out the full list.
+        kwargs.setdefault('default', self._make_default())
+        indent = kwargs.get('indent')
+        if indent is None:
+            sep = (kwargs.get('separators') or (', ', ': '))[0]
+            start, end = '[', ']'
+            dumps = lambda obj: json.dumps(obj, **kwargs)
+        else:
+            if not isinstance(indent, str):
+                indent = ' ' * indent
+            sep = (kwargs.get('separators') or (',', ': '))[0]
+            sep += '\n' + indent
+            start, end = '[\n' + indent, '\n]'
+            dumps = lambda obj: json.dumps(obj, **kwargs).replace(
+                '\n', '\n' + indent)
+
+        wrapper, batches = self.iter_batches()
+        to_obj = self._row_converter(wrapper)
+        empty = True
+        for rows in batches:
+            file_obj.write((start if empty else sep) +
+                           sep.join([dumps(to_obj(row)) for row in rows]))
+            empty = False
+        file_obj.write('[]' if empty else end)
+
+    def _row_converter(self, wrapper):
+        # Tuple queries are written as arrays, everything else as objects.
+        if self.query._row_type in (ROW.TUPLE, ROW.NAMED_TUPLE):
+            return lambda row: row
+        columns = wrapper.dedupe_columns(wrapper.columns, False)
+        return lambda row: dict(zip(columns, row))
+
+
+class JSONLinesExporter(JSONExporter):
+    def export(self, file_obj, **kwargs):
+        kwargs.setdefault('default', self._make_default())
+        wrapper, batches = self.iter_batches()
+        columns = wrapper.dedupe_columns(wrapper.columns, False)
+        for rows in batches:
+            file_obj.write(''.join([
+                json.dumps(dict(zip(columns, row)), **kwargs) + '\n'
+                for row in rows]))
 
 
 class CSVExporter(Exporter):
     def export(self, file_obj, header=True, **kwargs):
-        writer = csv.writer(file_obj, **kwargs)
-        tuples = self.query.tuples().execute()
-        tuples.initialize()
-        if header and getattr(tuples, 'columns', None):
-            writer.writerow([column for column in tuples.columns])
-        for row in tuples:
-            writer.writerow([self._export_value(value) for value in row])
+        # Rows are written to a buffer and flushed to the file once per batch.
+        buf = io.StringIO()
+        writer = csv.writer(buf, **kwargs)
+        wrapper, batches = self.iter_batches()
+        if header and wrapper.columns:
+            writer.writerow(wrapper.columns)
+        for rows in batches:
+            writer.writerows(rows)
+            file_obj.write(buf.getvalue())
+            buf.seek(0)
+            buf.truncate()
+        file_obj.write(buf.getvalue())
 
 
 class TSVExporter(CSVExporter):
@@ -389,6 +495,53 @@ class TSVExporter(CSVExporter):
         return super(TSVExporter, self).export(file_obj, header, **kwargs)
 
 
+EXPORT_FORMATS = {
+    'csv': CSVExporter,
+    'json': JSONExporter,
+    'jsonl': JSONLinesExporter,
+    'tsv': TSVExporter}
+
+
+def _export(exporter, file_obj, compress=None, encoding='utf8', **kwargs):
+    if not compress:
+        return exporter.export(file_obj, **kwargs)
+    elif compress != 'gzip':
+        raise ValueError('Unsupported compression "%s", only "gzip" is '
+                         'supported.' % compress)
+
+    # Compressed output is written to a binary file-like object.
+    gz = gzip.GzipFile(fileobj=file_obj, mode='wb')
+    text = io.TextIOWrapper(gz, encoding=encoding, newline='')
+    try:
+        exporter.export(text, **kwargs)
+    finally:
+        text.close()  # Closes the gzip stream, but not file_obj.
+
+
+def export(query, file_obj, format='csv', compress=None, encoding='utf8',
+           iso8601_datetimes=False, base64_bytes=False, batch_size=1000,
+           **kwargs):
+    """
+    Stream the results of a query to a file-like object without building
+    the result set in memory.
+
+    :param query: a query, e.g. a ModelSelect.
+    :param file_obj: file-like object, must be binary if compress is used.
+    :param str format: one of csv, json, jsonl or tsv.
+    :param str compress: optionally "gzip".
+    :param int batch_size: number of rows fetched from the cursor at a time.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError('Unsupported format "%s". Use one of %s.' % (
+            format, ', '.join(sorted(EXPORT_FORMATS))))
+    exporter = EXPORT_FORMATS[format](
+        query,
+        iso8601_datetimes=iso8601_datetimes,
+        base64_bytes=base64_bytes,
+        batch_size=batch_size)
+    return _export(exporter, file_obj, compress, encoding, **kwargs)
+
+
 class Importer(object):
     def __init__(self, table, strict=False, iso8601_datetimes=False,
                  base64_bytes=False):
@@ -421,7 +574,9 @@ class Importer(object):
 
 class JSONImporter(Importer):
     def load(self, file_obj, **kwargs):
-        data = json.load(file_obj, **kwargs)
+        return self._load_rows(json.load(file_obj, **kwargs))
+
+    def _load_rows(self, data):
         count = 0
 
         for row in data:
@@ -440,6 +595,12 @@ class JSONImporter(Importer):
         return count
 
 
+class JSONLinesImporter(JSONImporter):
+    def load(self, file_obj, **kwargs):
+        return self._load_rows(json.loads(line, **kwargs)
+                               for line in file_obj if line.strip())
+
+
 class CSVImporter(Importer):
     def load(self, file_obj, header=True, **kwargs):
         count = 0
@@ -8,6 +8,7 @@ from peewee import Database
 from peewee import DoesNotExist
 from peewee import Model
 from peewee import Proxy
+from peewee import Select
 from peewee import SelectQuery
 from playhouse.db_url import connect as db_url_connect
 
@@ -36,16 +37,22 @@ class PaginatedQuery(object):
             return max(1, int(curr_page))
         return 1
 
+    def _set_page_count(self, total):
+        self._page_count = int(math.ceil(float(total) / self.paginate_by))
+
     def get_page_count(self):
         if not hasattr(self, '_page_count'):
-            self._page_count = int(math.ceil(
-                float(self.query.count()) / self.paginate_by))
+            self._set_page_count(self.query.count())
         return self._page_count
 
     def get_object_list(self):
+        query = self.query.paginate(self.get_page(), self.paginate_by)
+        if not hasattr(self, '_page_count') and isinstance(query, Select):
+            # Fetch the page and the total row-count in one query.
+            self._set_page_count(query._execute_with_total())
         if self.check_bounds and self.get_page() > self.get_page_count():
             abort(404)
-        return self.query.paginate(self.get_page(), self.paginate_by)
+        return query
 
     def get_page_range(self, page, total, show=5):
         # Generate page buttons for a subset of pages, e.g. if the current page
@@ -40,9 +40,47 @@ class MySQLConnectorDatabase(MySQLDatabase):
         return mysql_connector.Binary
 
 
+class _PreparedCursor(object):
+    # Results of a prepared statement, fetched eagerly so the statement's
+    # cursor may be executed again while these rows are being consumed.
+    def __init__(self, cursor):
+        self.description = cursor.description
+        self.rowcount = cursor.rowcount
+        self.lastrowid = cursor.lastrowid
+        self._rows = iter(cursor.fetchall() if cursor.description else ())
+
+    def fetchone(self):
+        return next(self._rows, None)
+
+    def fetchmany(self, size=1):
+        return [row for _, row in zip(range(size), self._rows)]
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def __iter__(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
 class PooledMySQLConnectorDatabase(_PooledMySQLDatabase,
                                    MySQLConnectorDatabase):
-    pass
+    def _prepares_statements(self):
+        return True
+
+    def _prepare(self, conn, sql):
+        # A prepared cursor uses the binary protocol, and re-uses its
+        # server-side statement while it executes the same SQL.
+        return conn.cursor(prepared=True)
+
+    def _execute_statement(self, conn, handle, sql, params):
+        handle.execute(sql, params)
+        return _PreparedCursor(handle)
+
+    def _deallocate(self, conn, handle):
+        handle.close()
 
 
 class MariaDBConnectorDatabase(MySQLDatabase):
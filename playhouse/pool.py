@@ -1,13 +1,21 @@
+import bisect
 import functools
 import heapq
 import logging
+import random
 import threading
 import time
+from collections import OrderedDict
+from collections import deque
 from collections import namedtuple
 
 from peewee import MySQLDatabase
+from peewee import OperationalError
 from peewee import PostgresqlDatabase
+from peewee import Psycopg3Adapter
 from peewee import SqliteDatabase
+from peewee import __exception_wrapper__
+from peewee import _fork_orphans
 
 logger = logging.getLogger('peewee.pool')
 
@@ -21,9 +29,116 @@ def make_int(val):
 class MaxConnectionsExceeded(ValueError): pass
 
 
+class ConnectBackoff(OperationalError):
+    """
+    Raised by connect() while the pool is backing off after a failed attempt
+    to open a connection.
+    """
+
+
+class _InBackoff(Exception):
+    # Raised by _connect() inside the database's exception wrapper, which
+    # would otherwise convert an OperationalError subclass.
+    pass
+
+
+def _parse_validate(value):
+    """
+    Convert a ``validate`` policy to the number of seconds a connection may
+    be idle before it is validated on check-out, or None to never validate.
+    """
+    if value is None or value == 'always':
+        return 0
+    elif value == 'never':
+        return None
+    elif isinstance(value, str) and value.startswith('if_idle_longer_than:'):
+        seconds = value.split(':', 1)[1]
+        if seconds.endswith('s'):
+            seconds = seconds[:-1]
+        try:
+            return float(seconds)
+        except ValueError:
+            pass
+    raise ValueError('Unrecognized validate policy "%s", expected "always", '
+                     '"never" or "if_idle_longer_than:<seconds>s".' % value)
+
+
 PoolConnection = namedtuple('PoolConnection', ('timestamp', 'connection',
                                                'checked_out'))
 
+PoolStats = namedtuple('PoolStats', (
+    'idle',  # Connections available in the pool.
+    'in_use',  # Connections checked-out.
+    'waiting',  # Threads blocked in connect().
+    'max_in_use',  # Highest number of connections checked-out at once.
+    'created',
+    'closed',
+    'discarded',  # {reason: count}, see DISCARD_REASONS.
+    'checkouts',
+    'waits',  # Check-outs which had to wait for a connection.
+    'wait_time',  # Total seconds spent waiting.
+    'wait_histogram',  # ((upper bound in seconds, count), ...)
+    'timeouts',  # Times MaxConnectionsExceeded was raised.
+    'avg_age',  # Mean age of open connections, in seconds.
+    'avg_hold_time',  # Mean seconds a connection was held before check-in.
+    'validations',  # Check-outs which validated the connection.
+    'connect_failures'))  # Failed attempts to open a connection.
+
+StatementStats = namedtuple('StatementStats', (
+    'statements',  # Statements currently prepared on the connection.
+    'hits',  # Executions which reused a prepared statement.
+    'misses',  # Executions which prepared the statement.
+    'hit_rate'))
+
+# Upper bounds (in seconds) of the checkout wait-time histogram buckets.
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1., 5., float('inf'))
+
+POOL_EVENTS = ('checkout', 'checkin', 'create', 'discard')
+
+DISCARD_REASONS = ('stale', 'expired', 'idle', 'not_reusable', 'closed',
+                   'invalid')
+
+class _Waiter(object):
+    # A thread blocked in connect(). A returned connection or free slot is
+    # reserved for the waiter before its event is set.
+    __slots__ = ('event', 'conn', 'reserved')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.conn = None  # (timestamp, conn) handed off on check-in.
+        self.reserved = False
+
+
+class _StatementRegistry(object):
+    # Statements prepared on a single connection, keyed by SQL, least-recently
+    # used first. Only used by the thread holding the connection.
+    __slots__ = ('statements', 'hits', 'misses')
+
+    def __init__(self):
+        self.statements = OrderedDict()
+        self.hits = self.misses = 0
+
+
+class _CheckoutState(threading.local):
+    # Per-thread pool state.
+    waiter = None  # _Waiter holding a reservation for this thread.
+    parked = None  # Key of the connection parked for this thread.
+    counts = None  # _ThreadCounts of this thread's lock-free check-outs.
+    closing = False  # Set by close_all() to bypass hand-off and parking.
+    failed = False  # Set when this thread failed to open a connection.
+
+
+class _ThreadCounts(object):
+    # Statistics of one thread's check-outs and check-ins of its parked
+    # connection, which happen without the pool lock. Only written by that
+    # thread, and added to the pool's totals by stats().
+    __slots__ = ('checkouts', 'checkins', 'hold_time', 'validations')
+
+    def __init__(self):
+        self.checkouts = self.checkins = self.validations = 0
+        self.hold_time = 0.
+
+
 def locked(fn):
     @functools.wraps(fn)
     def inner(self, *args, **kwargs):
@@ -33,18 +148,71 @@ def locked(fn):
 
 
 class PooledDatabase(object):
+    # Each connection's max_lifetime is shortened by up to this fraction, so
+    # connections opened together do not all expire together.
+    lifetime_jitter = 0.1
+
+    # Open min_connections immediately in a forked child, rather than on
+    # first use.
+    warm_after_fork = False
+
     def __init__(self, database, max_connections=20, stale_timeout=None,
-                 timeout=None, **kwargs):
+                 timeout=None, min_connections=0, idle_timeout=None,
+                 max_lifetime=None, maintenance_interval=None, affinity=False,
+                 validate='always', validation_query=None, backoff=None,
+                 max_backoff=10, connect_retries=0, prepared_statements=False,
+                 max_prepared_statements=100, **kwargs):
         self._max_connections = make_int(max_connections)
         self._stale_timeout = make_int(stale_timeout)
         self._wait_timeout = make_int(timeout)
         if self._wait_timeout == 0:
             self._wait_timeout = float('inf')
+        self._min_connections = make_int(min_connections) or 0
+        self._idle_timeout = make_int(idle_timeout)
+        self._max_lifetime = make_int(max_lifetime)
+        self._maintenance_interval = make_int(maintenance_interval)
+        self._affinity = affinity
+        self._validate_idle = _parse_validate(validate)
+        self._validation_query = validation_query
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._connect_retries = make_int(connect_retries) or 0
+        self._prepared_statements = prepared_statements
+        self._max_prepared_statements = make_int(max_prepared_statements)
+
+        # After a failed attempt to open a connection, new connections are not
+        # attempted until "_retry_after" (time.monotonic()), see backoff.
+        self._connect_failures = 0
+        self._retry_after = 0.
+
+        # Pool is warmed, and the maintenance thread started, on first use.
+        self._started = False
+        self._maintenance_thread = None
+        self._maintenance_stop = threading.Event()
 
-        # Lock for pool operations and condition for notifying when connection
-        # is released back to pool.
+        # Lock for pool operations.
         self._pool_lock = threading.RLock()
-        self._pool_available = threading.Condition(self._pool_lock)
+
+        # Threads waiting for a connection, oldest first. Connections and
+        # slots are handed to waiters in order, and counted in "_reserved"
+        # until the waiter checks them out.
+        self._waiters = deque()
+        self._reserved = 0
+        self._checkout = _CheckoutState()
+
+        # Wait-time accounting and statistics, see stats().
+        self._wait_count = 0
+        self._wait_time = 0.
+        self._wait_timeouts = 0
+        self._wait_histogram = [0] * len(WAIT_BUCKETS)
+        self._max_in_use = 0
+        self._created = self._closed = self._checkouts = self._checkins = 0
+        self._hold_time = 0.
+        self._discarded = dict.fromkeys(DISCARD_REASONS, 0)
+        self._validations = self._failed_connects = 0
+
+        # Event callbacks, registered with on_checkout(), etc.
+        self._callbacks = dict((event, []) for event in POOL_EVENTS)
 
         # Available / idle connections stored in a heap, sorted oldest first.
         self._connections = []
@@ -53,6 +221,25 @@ class PooledDatabase(object):
         # connection against connection).
         self._heap_counter = 0
 
+        # With affinity, a connection returned to the pool is parked for the
+        # thread that used it, mapping key -> (timestamp, conn). Other threads
+        # only take parked connections once the heap is empty. The owning
+        # thread parks and reclaims its connection without the pool lock, so
+        # entries are only ever claimed with an atomic pop().
+        self._parked = {}
+
+        # Thread ident -> _ThreadCounts, for threads using the affinity fast
+        # path. Counts of threads that have exited are folded into the totals.
+        self._thread_counts = {}
+
+        # Connection key -> _StatementRegistry, see execute_prepared().
+        self._statements = {}
+
+        # Connection key -> time returned to the pool, for idle_timeout, and
+        # connection key -> expiry time, for max_lifetime.
+        self._idle_since = {}
+        self._expires = {}
+
         # Mapping of connection id to PoolConnection. Ordinarily we would want
         # to use something like a WeakKeyDictionary, but Python typically won't
         # allow us to create weak references to connection objects.
@@ -67,7 +254,11 @@ class PooledDatabase(object):
         super(PooledDatabase, self).__init__(database, **kwargs)
 
     def init(self, database, max_connections=None, stale_timeout=None,
-             timeout=None, **connect_kwargs):
+             timeout=None, min_connections=None, idle_timeout=None,
+             max_lifetime=None, maintenance_interval=None, affinity=None,
+             validate=None, validation_query=None, backoff=None,
+             max_backoff=None, connect_retries=None, prepared_statements=None,
+             max_prepared_statements=None, **connect_kwargs):
         super(PooledDatabase, self).init(database, **connect_kwargs)
         if max_connections is not None:
             self._max_connections = make_int(max_connections)
@@ -77,53 +268,434 @@ class PooledDatabase(object):
             self._wait_timeout = make_int(timeout)
             if self._wait_timeout == 0:
                 self._wait_timeout = float('inf')
+        if min_connections is not None:
+            self._min_connections = make_int(min_connections)
+        if idle_timeout is not None:
+            self._idle_timeout = make_int(idle_timeout)
+        if max_lifetime is not None:
+            self._max_lifetime = make_int(max_lifetime)
+        if maintenance_interval is not None:
+            self._maintenance_interval = make_int(maintenance_interval)
+        if affinity is not None:
+            self._affinity = affinity
+        if validate is not None:
+            self._validate_idle = _parse_validate(validate)
+        if validation_query is not None:
+            self._validation_query = validation_query
+        if backoff is not None:
+            self._backoff = backoff
+        if max_backoff is not None:
+            self._max_backoff = max_backoff
+        if connect_retries is not None:
+            self._connect_retries = make_int(connect_retries)
+        if prepared_statements is not None:
+            self._prepared_statements = prepared_statements
+        if max_prepared_statements is not None:
+            self._max_prepared_statements = make_int(max_prepared_statements)
+        self._started = False
 
     def connect(self, reuse_if_open=False):
-        if not self._wait_timeout:
-            return super(PooledDatabase, self).connect(reuse_if_open)
+        if not self._started:
+            self._start()
 
-        deadline = time.monotonic() + self._wait_timeout
+        # Retry failed connection attempts, waiting out the backoff.
+        attempt = 0
         while True:
+            self._checkout.failed = False
+            try:
+                return self._checkout_connection(reuse_if_open)
+            except _InBackoff:
+                if attempt >= self._connect_retries:
+                    delay = self._backoff_remaining()
+                    raise ConnectBackoff('Unable to connect, next attempt in '
+                                         '%.3fs.' % delay) from None
+            except Exception:
+                if not self._checkout.failed or (
+                        attempt >= self._connect_retries):
+                    raise
+            attempt += 1
+            time.sleep(self._backoff_remaining())
+
+    def _backoff_remaining(self):
+        return max(0., self._retry_after - time.monotonic())
+
+    def _checkout_connection(self, reuse_if_open):
+        if not self._wait_timeout:
             try:
                 return super(PooledDatabase, self).connect(reuse_if_open)
             except MaxConnectionsExceeded:
-                remaining = deadline - time.monotonic()
-                if remaining <= 0:
-                    raise MaxConnectionsExceeded(
-                        'Max connections exceeded, timed out attempting to '
-                        'connect.')
-                with self._pool_available:
-                    self._pool_available.wait(timeout=min(remaining, 1.0))
+                with self._pool_lock:
+                    self._wait_timeouts += 1
+                raise
 
-    @locked
-    def _connect(self):
-        while self._connections:
-            # Remove the oldest connection from the heap.
+        try:
+            return super(PooledDatabase, self).connect(reuse_if_open)
+        except MaxConnectionsExceeded:
+            pass
+
+        # Queue behind any other waiters. Once woken we hold a connection or
+        # a free slot, so the second attempt cannot exceed the maximum.
+        waiter = self._wait()
+        self._checkout.waiter = waiter
+        try:
+            return super(PooledDatabase, self).connect(reuse_if_open)
+        finally:
+            self._checkout.waiter = None
+            if waiter.reserved:
+                # Reservation was not used, e.g. connect() failed early.
+                with self._pool_lock:
+                    self._release(waiter)
+
+    def _wait(self):
+        waiter = _Waiter()
+        start = time.monotonic()
+        with self._pool_lock:
+            self._waiters.append(waiter)
+            self._wake_waiters()
+
+        timeout = self._wait_timeout
+        waiter.event.wait(None if timeout == float('inf') else timeout)
+
+        with self._pool_lock:
+            elapsed = time.monotonic() - start
+            self._wait_count += 1
+            self._wait_time += elapsed
+            self._wait_histogram[bisect.bisect_left(WAIT_BUCKETS,
+                                                    elapsed)] += 1
+            if not waiter.reserved:
+                self._waiters.remove(waiter)
+                self._wait_timeouts += 1
+                raise MaxConnectionsExceeded(
+                    'Max connections exceeded, timed out attempting to '
+                    'connect.')
+        return waiter
+
+    def _hand_off(self, entry=None):
+        # Give a returned connection, or a free slot if entry is None, to the
+        # oldest waiting thread. Caller must hold the pool lock.
+        waiter = self._waiters.popleft()
+        waiter.conn = entry
+        waiter.reserved = True
+        self._reserved += 1
+        waiter.event.set()
+
+    def _wake_waiters(self):
+        # Called whenever a connection or slot may have become available.
+        while self._waiters:
+            if self._connections or self._parked:
+                entry = self._pop_idle()
+                if entry is not None:
+                    self._hand_off(entry)
+                    continue
+            if not self._max_connections or (len(self._in_use) +
+                                               self._reserved <
+                                               self._max_connections):
+                self._hand_off()
+            else:
+                break
+
+    def _release(self, waiter):
+        # Return an unused reservation to the pool.
+        waiter.reserved = False
+        self._reserved -= 1
+        if waiter.conn is not None:
+            (ts, conn), waiter.conn = waiter.conn, None
+            self._push(ts, conn)
+        self._wake_waiters()
+
+    def _pop_idle(self):
+        # Remove the oldest idle connection, taking a connection parked for
+        # another thread only when the heap is empty. Returns None if there
+        # is none. Caller must hold the pool lock.
+        if self._connections:
             ts, _counter, conn = heapq.heappop(self._connections)
-            key = self.conn_key(conn)
-            if self._is_closed(conn):
-                # Connection closed either by user or by driver - discard.
-                logger.debug('Connection %s was closed, discarding.', key)
-                continue
+            return (ts, conn)
+        return self._take_parked()
 
-            if self._stale_timeout and self._is_stale(ts):
-                logger.debug('Connection %s was stale, closing.', key)
-                self._close_raw(conn)
-                continue
+    def _take_parked(self):
+        # Claim a parked connection. A connection is parked before it is
+        # removed from "_in_use" on check-in, so one still in "_in_use" is
+        # being checked in and is skipped. Caller must hold the pool lock.
+        for key in list(self._parked):
+            if key not in self._in_use:
+                entry = self._parked.pop(key, None)
+                if entry is not None:
+                    return entry
 
-            # Connection OK to use.
-            self._in_use[key] = PoolConnection(ts, conn, time.time())
-            return conn
+    def _park(self, ts, conn):
+        key = self.conn_key(conn)
+        self._parked[key] = (ts, conn)
+        self._idle_since[key] = time.time()
+        self._checkout.parked = key
 
-        if self._max_connections and (
-                len(self._in_use) >= self._max_connections):
-            raise MaxConnectionsExceeded('Exceeded maximum connections.')
+    def _push(self, ts, conn):
+        # Add a connection to the heap of idle connections.
+        self._heap_counter += 1
+        heapq.heappush(self._connections, (ts, self._heap_counter, conn))
+        self._idle_since[self.conn_key(conn)] = time.time()
+
+    def _check_out(self, ts, conn):
+        # Caller must hold the pool lock.
+        key = self.conn_key(conn)
+        validate = self._needs_validation(self._idle_since.pop(key, None))
+        if validate:
+            self._validations += 1
+        reason = self._unusable(key, ts, conn, validate)
+        if reason is not None:
+            self._drop(key, conn, reason)
+            return False
+
+        # Connection OK to use.
+        self._add_in_use(key, ts, conn)
+        return True
+
+    def _unusable(self, key, ts, conn, validate):
+        # Return the reason an idle connection cannot be checked out, if any.
+        if validate:
+            if self._validation_query is not None:
+                if not self._run_validation_query(conn):
+                    return 'invalid'
+            elif self._is_closed(conn):
+                # Connection closed either by user or by driver.
+                return 'closed'
+        if self._stale_timeout and self._is_stale(ts):
+            return 'stale'
+        elif self._is_expired(key):
+            return 'expired'
+
+    def _drop(self, key, conn, reason):
+        # Discard an idle connection that cannot be checked out. Caller must
+        # hold the pool lock.
+        logger.debug('Discarding %s connection %s.', reason, key)
+        if reason == 'closed':
+            self._expires.pop(key, None)
+            self._statements.pop(key, None)
+        else:
+            self._close_raw(conn)
+        self._discard(conn, reason)
+
+    def _thread_stats(self):
+        # Return the calling thread's _ThreadCounts, registering them with
+        # the pool on first use.
+        counts = self._checkout.counts
+        if counts is None:
+            counts = self._checkout.counts = _ThreadCounts()
+            ident = threading.current_thread().ident
+            with self._pool_lock:
+                old = self._thread_counts.get(ident)
+                if old is not None:
+                    # Ident reused by a new thread.
+                    self._fold_counts(old)
+                self._thread_counts[ident] = counts
+        return counts
+
+    def _fold_counts(self, counts):
+        # Add the counts of a thread that has exited to the totals. Caller
+        # must hold the pool lock.
+        self._checkouts += counts.checkouts
+        self._checkins += counts.checkins
+        self._hold_time += counts.hold_time
+        self._validations += counts.validations
+
+    def _reclaim(self):
+        # Check out the connection parked for the calling thread without the
+        # pool lock. Returns None if another thread took it, or it cannot be
+        # used, in which case the caller falls back to the locked path.
+        state = self._checkout
+        key, state.parked = state.parked, None
+        entry = self._parked.pop(key, None)  # Atomic claim.
+        if entry is None:
+            return
+        ts, conn = entry
+        counts = state.counts or self._thread_stats()
+        validate = self._needs_validation(self._idle_since.pop(key, None))
+        if validate:
+            counts.validations += 1
+        reason = self._unusable(key, ts, conn, validate)
+        if reason is not None:
+            with self._pool_lock:
+                self._drop(key, conn, reason)
+            return
+
+        self._in_use[key] = PoolConnection(ts, conn, time.time())
+        counts.checkouts += 1
+        # Unlocked, so a concurrent check-out may be missed.
+        if len(self._in_use) > self._max_in_use:
+            self._max_in_use = len(self._in_use)
+        if self._callbacks['checkout']:
+            self._fire('checkout', conn)
+        return conn
+
+    def _park_fast(self, conn):
+        # Check in and park a connection without the pool lock. Returns False
+        # if the connection must go through the locked path instead: when it
+        # is stale, expired or not reusable, or threads are waiting.
+        key = self.conn_key(conn)
+        pool_conn = self._in_use.get(key)
+        if pool_conn is None or self._waiters or (
+                self._stale_timeout and self._is_stale(pool_conn.timestamp)) \
+           or (self._expires and self._is_expired(key)):
+            return False
+        elif not self._can_reuse(conn):
+            with self._pool_lock:
+                self._close_locked(conn, reusable=False)
+            return True
+
+        state = self._checkout
+        counts = state.counts or self._thread_stats()
+        now = time.time()
+        counts.checkins += 1
+        counts.hold_time += now - pool_conn.checked_out
+        if self._callbacks['checkin']:
+            self._fire('checkin', conn)
+        self._idle_since[key] = now
+        # Park before leaving "_in_use", so the connection is always counted
+        # towards max_connections.
+        self._parked[key] = (pool_conn.timestamp, conn)
+        state.parked = key
+        if self._in_use.pop(key, None) is None:
+            # Closed by close_all() or close_stale() meanwhile.
+            self._parked.pop(key, None)
+            state.parked = None
+        elif self._waiters:
+            # A thread began waiting after the check above.
+            with self._pool_lock:
+                self._wake_waiters()
+        return True
+
+    def _needs_validation(self, idle_since):
+        # A connection handed directly to a waiting thread was in use moments
+        # ago and has no idle time.
+        threshold = self._validate_idle
+        if threshold is None:
+            return False
+        elif not threshold:
+            return True
+        return idle_since is not None and (
+            time.time() - idle_since > threshold)
+
+    def _run_validation_query(self, conn):
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(self._validation_query)
+                cursor.fetchall()
+            finally:
+                cursor.close()
+        except Exception:
+            return False
+        return True
+
+    def _connect_failed(self):
+        # Caller must hold the pool lock.
+        self._failed_connects += 1
+        self._checkout.failed = True
+        if self._backoff:
+            self._connect_failures += 1
+            delay = min(self._max_backoff,
+                        self._backoff * 2 ** (self._connect_failures - 1))
+            # Jitter spreads out the retries of pools in other processes.
+            delay *= random.uniform(0.5, 1.)
+            self._retry_after = time.monotonic() + delay
 
-        conn = super(PooledDatabase, self)._connect()
+    def _connect_succeeded(self):
+        self._connect_failures = 0
+        self._retry_after = 0.
+
+    def _add_in_use(self, key, ts, conn):
+        self._in_use[key] = PoolConnection(ts, conn, time.time())
+        self._checkouts += 1
+        if len(self._in_use) > self._max_in_use:
+            self._max_in_use = len(self._in_use)
+        self._fire('checkout', conn)
+
+    def _track(self, conn):
+        # Account for a newly-opened connection, returning its timestamp.
         ts = time.time()
+        self._created += 1
+        if self._prepared_statements and self._prepares_statements():
+            self._statements[self.conn_key(conn)] = _StatementRegistry()
+            self._init_statements(conn)
+        if self._max_lifetime:
+            jitter = 1. - self.lifetime_jitter * random.random()
+            self._expires[self.conn_key(conn)] = ts + (self._max_lifetime *
+                                                       jitter)
+        self._fire('create', conn)
+        return ts
+
+    def _is_expired(self, key):
+        expires = self._expires.get(key)
+        return expires is not None and time.time() > expires
+
+    def _discard(self, conn, reason):
+        self._discarded[reason] += 1
+        self._fire('discard', conn, reason)
+
+    def _fire(self, event, *args):
+        for callback in self._callbacks[event]:
+            try:
+                callback(*args)
+            except Exception:
+                logger.exception('Error in pool %s callback.', event)
+
+    def _connect(self):
+        # With affinity, first try to reclaim this thread's parked connection
+        # without taking the pool lock.
+        if self._checkout.parked is not None and (
+                self._checkout.waiter is None):
+            conn = self._reclaim()
+            if conn is not None:
+                return conn
+        with self._pool_lock:
+            return self._connect_locked()
+
+    def _connect_locked(self):
+        waiter = self._checkout.waiter
+        reserved = waiter is not None and waiter.reserved
+        if reserved:
+            waiter.reserved = False
+            self._reserved -= 1
+            if waiter.conn is not None:
+                (ts, conn), waiter.conn = waiter.conn, None
+                if self._check_out(ts, conn):
+                    return conn
+
+        # Reclaim the connection this thread last returned, if it is still
+        # parked.
+        key = self._checkout.parked
+        if key is not None:
+            self._checkout.parked = None
+            entry = self._parked.pop(key, None)
+            if entry is not None and self._check_out(*entry):
+                return entry[1]
+
+        while self._connections or self._parked:
+            # Remove the oldest connection from the heap.
+            entry = self._pop_idle()
+            if entry is None:
+                break
+            if self._check_out(*entry):
+                return entry[1]
+
+        if not reserved and self._max_connections and (
+                len(self._in_use) + self._reserved >= self._max_connections):
+            raise MaxConnectionsExceeded('Exceeded maximum connections.')
+
+        try:
+            if self._retry_after and time.monotonic() < self._retry_after:
+                raise _InBackoff()
+            conn = super(PooledDatabase, self)._connect()
+        except Exception as exc:
+            if not isinstance(exc, _InBackoff):
+                self._connect_failed()
+            if reserved:
+                self._wake_waiters()
+            raise
+        self._connect_succeeded()
+        ts = self._track(conn)
         key = self.conn_key(conn)
         logger.debug('Created new connection %s.', key)
-        self._in_use[key] = PoolConnection(ts, conn, time.time())
+        self._add_in_use(key, ts, conn)
         return conn
 
     def _is_stale(self, timestamp):
@@ -144,11 +716,23 @@ class PooledDatabase(object):
         except Exception:
             logger.debug('Error closing connection %s.', self.conn_key(conn),
                          exc_info=True)
+        with self._pool_lock:
+            self._closed += 1
+            key = self.conn_key(conn)
+            self._expires.pop(key, None)
+            self._idle_since.pop(key, None)
+            self._statements.pop(key, None)
 
-    @locked
     def _close(self, conn, close_conn=False):
         # if close_conn == True, close underlying driver connection and remove
         # from _in_use tracking. Do not return to available conns.
+        if self._affinity and not close_conn and not self._checkout.closing \
+           and self._park_fast(conn):
+            return
+        with self._pool_lock:
+            self._close_locked(conn, close_conn)
+
+    def _close_locked(self, conn, close_conn=False, reusable=True):
         key = self.conn_key(conn)
 
         if close_conn:
@@ -159,20 +743,199 @@ class PooledDatabase(object):
             return
         else:
             pool_conn = self._in_use.pop(key)
+            self._checkins += 1
+            self._hold_time += time.time() - pool_conn.checked_out
+            self._fire('checkin', conn)
             if self._stale_timeout and self._is_stale(pool_conn.timestamp):
                 logger.debug('Closing stale connection %s on check-in.', key)
                 self._close_raw(conn)
-            elif not self._can_reuse(conn):
+                self._discard(conn, 'stale')
+            elif self._is_expired(key):
+                logger.debug('Closing expired connection %s on check-in.',
+                             key)
+                self._close_raw(conn)
+                self._discard(conn, 'expired')
+            elif not reusable or not self._can_reuse(conn):
                 logger.debug('Connection %s not reusable, closing.', key)
                 self._close_raw(conn)
+                self._discard(conn, 'not_reusable')
+            elif self._waiters and not self._checkout.closing:
+                # Pass directly to the oldest waiting thread.
+                logger.debug('Handing %s to waiting thread.', key)
+                self._hand_off((pool_conn.timestamp, conn))
+            elif self._affinity and not self._checkout.closing:
+                logger.debug('Parking %s for current thread.', key)
+                self._park(pool_conn.timestamp, conn)
             else:
                 logger.debug('Returning %s to pool.', key)
-                self._heap_counter += 1
-                heapq.heappush(self._connections,
-                               (pool_conn.timestamp, self._heap_counter, conn))
+                self._push(pool_conn.timestamp, conn)
 
         # Wake up thread that may be waiting on connection.
-        self._pool_available.notify()
+        if not self._checkout.closing:
+            self._wake_waiters()
+
+    def on_checkout(self, fn):
+        """
+        Register a callback invoked with the connection each time it is
+        checked out of the pool. Can be used as a decorator.
+        """
+        return self._add_callback('checkout', fn)
+
+    def on_checkin(self, fn):
+        """
+        Register a callback invoked with the connection each time it is
+        returned to the pool.
+        """
+        return self._add_callback('checkin', fn)
+
+    def on_create(self, fn):
+        """
+        Register a callback invoked with each new connection.
+        """
+        return self._add_callback('create', fn)
+
+    def on_discard(self, fn):
+        """
+        Register a callback invoked with ``(conn, reason)`` when the pool
+        discards a connection that is stale, not reusable or was closed.
+        """
+        return self._add_callback('discard', fn)
+
+    @locked
+    def _add_callback(self, event, fn):
+        self._callbacks[event].append(fn)
+        return fn
+
+    @locked
+    def stats(self):
+        """
+        Return a :class:`PoolStats` snapshot of the pool.
+        """
+        now = time.time()
+        in_use = list(self._in_use.values())
+        # Skip connections parked but not yet out of "_in_use".
+        parked = [ts for key, (ts, _) in list(self._parked.items())
+                  if key not in self._in_use]
+        ages = [now - ts for ts, _, _ in self._connections]
+        ages.extend(now - ts for ts in parked)
+        ages.extend(now - pc.timestamp for pc in in_use)
+
+        # Add the lock-free check-outs of the affinity fast path.
+        alive = set(thread.ident for thread in threading.enumerate())
+        for ident, counts in list(self._thread_counts.items()):
+            if ident not in alive:
+                self._fold_counts(counts)
+                del self._thread_counts[ident]
+        checkouts, checkins = self._checkouts, self._checkins
+        hold_time, validations = self._hold_time, self._validations
+        for counts in self._thread_counts.values():
+            checkouts += counts.checkouts
+            checkins += counts.checkins
+            hold_time += counts.hold_time
+            validations += counts.validations
+
+        return PoolStats(
+            idle=len(self._connections) + len(parked),
+            in_use=len(in_use),
+            waiting=len(self._waiters),
+            max_in_use=self._max_in_use,
+            created=self._created,
+            closed=self._closed,
+            discarded=dict(self._discarded),
+            checkouts=checkouts,
+            waits=self._wait_count,
+            wait_time=self._wait_time,
+            wait_histogram=tuple(zip(WAIT_BUCKETS, self._wait_histogram)),
+            timeouts=self._wait_timeouts,
+            avg_age=sum(ages) / len(ages) if ages else 0.,
+            avg_hold_time=hold_time / checkins if checkins else 0.,
+            validations=validations,
+            connect_failures=self._failed_connects)
+
+    def execute_sql(self, sql, params=None, **kwargs):
+        # Server-side (named) cursors are declared by the driver, not prepared.
+        if self._prepared_statements and self._prepares_statements() and \
+           not kwargs.get('named_cursor'):
+            return self.execute_prepared(sql, params)
+        return super(PooledDatabase, self).execute_sql(sql, params, **kwargs)
+
+    def execute_prepared(self, sql, params=None):
+        """
+        Execute the SQL using a statement prepared on the current connection,
+        preparing it if this connection has not executed it before.
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug((sql, params))
+        if self._slow_query is not None:
+            start = time.perf_counter()
+        with __exception_wrapper__:
+            conn = self.connection()
+            registry = self._statements.get(self.conn_key(conn))
+            if registry is None:
+                # Not opened by the pool, e.g. after manual_close(), or the
+                # driver cannot prepare statements.
+                cursor = self.cursor()
+                cursor.execute(sql, params or ())
+            else:
+                cursor = self._execute_registered(conn, registry, sql,
+                                                  params or ())
+        if self._slow_query is not None:
+            self._check_slow_query(sql, params, time.perf_counter() - start)
+        return cursor
+
+    def _execute_registered(self, conn, registry, sql, params):
+        statements = registry.statements
+        if sql in statements:
+            registry.hits += 1
+            statements.move_to_end(sql)
+            handle = statements[sql]
+        else:
+            registry.misses += 1
+            handle = statements[sql] = self._prepare(conn, sql)
+            if self._max_prepared_statements and (
+                    len(statements) > self._max_prepared_statements):
+                _, evicted = statements.popitem(last=False)
+                self._deallocate(conn, evicted)
+        return self._execute_statement(conn, handle, sql, params)
+
+    def _prepares_statements(self):
+        # Whether the driver prepares statements server-side. Only then are
+        # statements tracked, so the registry mirrors what the server holds.
+        return False
+
+    def _prepare(self, conn, sql):
+        # Return a driver handle for the prepared statement, or None if the
+        # driver prepares and caches statements itself.
+        return None
+
+    def _execute_statement(self, conn, handle, sql, params):
+        cursor = self.cursor()
+        cursor.execute(sql, params)
+        return cursor
+
+    def _init_statements(self, conn):
+        # Configure the driver's own statement cache on a new connection.
+        pass
+
+    def _deallocate(self, conn, handle):
+        # Release a statement evicted from the registry.
+        pass
+
+    @locked
+    def statement_stats(self):
+        """
+        Return a dict of connection key to :class:`StatementStats` for the
+        connections opened by the pool.
+        """
+        accum = {}
+        for key, registry in self._statements.items():
+            total = registry.hits + registry.misses
+            accum[key] = StatementStats(
+                statements=len(registry.statements),
+                hits=registry.hits,
+                misses=registry.misses,
+                hit_rate=registry.hits / total if total else 0.)
+        return accum
 
     def manual_close(self):
         """
@@ -190,17 +953,162 @@ class PooledDatabase(object):
         # self.close(), since close acquires the database lock.
         with self._pool_lock:
             self._in_use.pop(key, None)
+            self._wake_waiters()
 
         self.close()
         self._close_raw(conn)
 
+    def _reset_after_fork(self):
+        # Connections inherited from the parent process are discarded without
+        # being closed (see peewee._after_fork_in_child). Threads blocked in
+        # connect() and the maintenance thread do not exist in the child.
+        super(PooledDatabase, self)._reset_after_fork()
+        _fork_orphans.extend(conn for _, _, conn in self._connections)
+        _fork_orphans.extend(conn for _, conn in self._parked.values())
+        _fork_orphans.extend(pc.connection for pc in self._in_use.values())
+        self._connections = []
+        self._parked = {}
+        for counts in self._thread_counts.values():
+            self._fold_counts(counts)
+        self._thread_counts = {}
+        self._in_use = {}
+        self._idle_since = {}
+        self._expires = {}
+        self._statements = {}
+        self._pool_lock = threading.RLock()
+        self._waiters = deque()
+        self._reserved = 0
+        self._checkout = _CheckoutState()
+        self._connect_failures = 0
+        self._retry_after = 0.
+        self._maintenance_thread = None
+        self._maintenance_stop = threading.Event()
+        self._started = False
+        if self.warm_after_fork:
+            self._start()
+
+    def _start(self):
+        # Warm the pool and start the maintenance thread on first use.
+        with self._pool_lock:
+            if self._started or self.deferred:
+                return
+            self._started = True
+            if self._maintenance_interval and (
+                    self._maintenance_thread is None):
+                self._maintenance_stop.clear()
+                self._maintenance_thread = threading.Thread(
+                    target=self._maintenance_loop,
+                    name='peewee-pool-maintenance')
+                self._maintenance_thread.daemon = True
+                self._maintenance_thread.start()
+        self._replenish()
+
+    def _maintenance_loop(self):
+        stop = self._maintenance_stop
+        while not stop.wait(self._maintenance_interval):
+            try:
+                self.maintain()
+            except Exception:
+                logger.exception('Error running pool maintenance.')
+
+    def stop_maintenance(self):
+        """
+        Stop the background maintenance thread, if running.
+        """
+        thread = self._maintenance_thread
+        if thread is not None:
+            self._maintenance_stop.set()
+            thread.join()
+            self._maintenance_thread = None
+
+    def maintain(self):
+        """
+        Close idle connections which are stale, have exceeded their
+        ``max_lifetime``, or have been idle longer than ``idle_timeout`` while
+        the pool holds more than ``min_connections``. Then open connections
+        until the pool holds ``min_connections``.
+        """
+        now = time.time()
+        with self._pool_lock:
+            # Parked connections are returned to the heap to be checked.
+            entry = self._take_parked()
+            while entry is not None:
+                self._heap_counter += 1
+                self._connections.append((entry[0], self._heap_counter,
+                                          entry[1]))
+                entry = self._take_parked()
+
+            total = (len(self._connections) + len(self._in_use) +
+                     self._reserved)
+            keep = []
+            for entry in sorted(self._connections):
+                ts, _, conn = entry
+                key = self.conn_key(conn)
+                idle = now - self._idle_since.get(key, ts)
+                if self._stale_timeout and self._is_stale(ts):
+                    reason = 'stale'
+                elif self._is_expired(key):
+                    reason = 'expired'
+                elif (self._idle_timeout and idle > self._idle_timeout and
+                      total > self._min_connections):
+                    reason = 'idle'
+                else:
+                    keep.append(entry)
+                    continue
+                logger.debug('Closing %s idle connection %s.', reason, key)
+                self._close_raw(conn)
+                self._discard(conn, reason)
+                total -= 1
+
+            heapq.heapify(keep)
+            self._connections = keep
+
+        self._replenish()
+
+    def _replenish(self):
+        # Open connections, without holding the pool lock, until the pool
+        # holds min_connections.
+        while True:
+            with self._pool_lock:
+                total = (len(self._connections) + len(self._parked) +
+                         len(self._in_use) + self._reserved)
+                if total >= self._min_connections or self.deferred or (
+                        time.monotonic() < self._retry_after):
+                    return
+                self._reserved += 1  # Hold the slot while connecting.
+
+            try:
+                conn = super(PooledDatabase, self)._connect()
+            except Exception:
+                logger.warning('Unable to open pool connection.',
+                               exc_info=True)
+                with self._pool_lock:
+                    self._reserved -= 1
+                    self._connect_failed()
+                    self._wake_waiters()
+                return
+
+            with self._pool_lock:
+                self._reserved -= 1
+                self._connect_succeeded()
+                ts = self._track(conn)
+                logger.debug('Opened connection %s for pool.',
+                             self.conn_key(conn))
+                self._push(ts, conn)
+                self._wake_waiters()
+
     @locked
     def close_idle(self):
         # Close any open connections that are not currently in-use.
-        idle = self._connections
+        idle = [conn for _, _, conn in self._connections]
         self._connections = []
-        for _, _, conn in idle:
+        entry = self._take_parked()
+        while entry is not None:
+            idle.append(entry[1])
+            entry = self._take_parked()
+        for conn in idle:
             self._close_raw(conn)
+        self._idle_since.clear()
 
     @locked
     def close_stale(self, age=600):
@@ -215,7 +1123,7 @@ class PooledDatabase(object):
                 del self._in_use[key]
                 n += 1
 
-        self._pool_available.notify_all()
+        self._wake_waiters()
         return n
 
     def close_all(self):
@@ -224,15 +1132,20 @@ class PooledDatabase(object):
 
         # self.close() acquires the database lock, calling it while holding
         # the pool lock would invert the lock order used by Database.connect()
-        # (db lock, then pool lock via _connect) and deadlock.
-        self.close()
+        # (db lock, then pool lock via _connect) and deadlock. The connection
+        # is closed below rather than handed to a waiting thread.
+        self._checkout.closing = True
+        try:
+            self.close()
+        finally:
+            self._checkout.closing = False
         with self._pool_lock:
             self.close_idle()
             in_use, self._in_use = self._in_use, {}
             for pool_conn in in_use.values():
                 self._close_raw(pool_conn.connection)
 
-            self._pool_available.notify_all()
+            self._wake_waiters()
 
 
 class _PooledMySQLDatabase(PooledDatabase):
@@ -279,6 +1192,22 @@ class _PooledPostgresqlDatabase(PooledDatabase):
     def _can_reuse(self, conn):
         return self._adapter.is_connection_reusable(conn)
 
+    def _prepares_statements(self):
+        # psycopg2 cannot prepare statements.
+        return isinstance(self._adapter, Psycopg3Adapter)
+
+    def _init_statements(self, conn):
+        # psycopg3 keeps its own LRU of prepared statements, deallocating the
+        # oldest on the server. Size it to match the registry.
+        if self._max_prepared_statements:
+            conn.prepared_max = self._max_prepared_statements
+
+    def _execute_statement(self, conn, handle, sql, params):
+        # psycopg3 prepares the statement server-side on first use.
+        cursor = self.cursor()
+        cursor.execute(sql, params, prepare=True)
+        return cursor
+
 class PooledPostgresqlDatabase(_PooledPostgresqlDatabase, PostgresqlDatabase):
     pass
 
@@ -1,5 +1,6 @@
 import json
 import logging
+import time
 
 from peewee import *
 from peewee import ColumnBase
@@ -10,6 +11,7 @@ from peewee import NodeList
 from peewee import Psycopg2Adapter
 from peewee import Psycopg3Adapter
 from peewee import __exception_wrapper__
+from peewee import get_json_codec
 from playhouse.pool import _PooledPostgresqlDatabase
 
 try:
@@ -423,8 +425,9 @@ class JSONField(FieldDatabaseHook, Field):
     _json_datatype = 'json'
     _adapter_json_type = 'json_type'
 
-    def __init__(self, dumps=None, **kwargs):
+    def __init__(self, dumps=None, codec=None, **kwargs):
         self._dumps = dumps
+        self._codec = get_json_codec(codec) if codec is not None else None
         super(JSONField, self).__init__(**kwargs)
 
     def ddl_datatype(self, ctx):
@@ -441,8 +444,15 @@ class JSONField(FieldDatabaseHook, Field):
                                      self._adapter_json_type)
             self.cast_json_case = database._adapter.cast_json_case
 
-        if self._dumps:
-            dumps = self._dumps
+        dumps = self._dumps
+        if dumps is None:
+            # The driver decodes with the connection's codec, see
+            # PostgresqlDatabase(json_codec=...).
+            codec = self._codec or get_json_codec(
+                getattr(database, 'json_codec', None))
+            if codec.dumps is not json.dumps:
+                dumps = codec.dumps
+        if dumps:
             class _Json(self.json_type):
                 def __init__(self, value):
                     super(_Json, self).__init__(value, dumps=dumps)
@@ -715,9 +725,13 @@ class PostgresqlExtDatabase(PostgresqlDatabase):
 
     def execute_sql(self, sql, params=None, named_cursor=None):
         logger.debug((sql, params))
+        if self._slow_query is not None:
+            start = time.perf_counter()
         with __exception_wrapper__:
             cursor = self.cursor(named_cursor=named_cursor)
             cursor.execute(sql, params or ())
+        if self._slow_query is not None:
+            self._check_slow_query(sql, params, time.perf_counter() - start)
         return cursor
 
 
@@ -1,18 +1,23 @@
 import asyncio
+import bisect
 import collections
 import contextvars
 import itertools
-import json
 import logging
 import re
+import time
 
 from greenlet import greenlet, getcurrent
 from peewee import *
 from peewee import _atomic, _savepoint, _transaction
 from peewee import _callable_context_manager
+from peewee import get_json_codec
 from peewee import __exception_wrapper__
 from peewee import logger as peewee_logger
 from peewee import Psycopg3Adapter
+from playhouse.pool import DISCARD_REASONS
+from playhouse.pool import PoolStats
+from playhouse.pool import WAIT_BUCKETS
 from playhouse.postgres_ext import Json
 
 try:
@@ -221,6 +226,8 @@ class AsyncDatabaseMixin(object):
     def __init__(self, database, **kwargs):
         self._pool_size = kwargs.pop('pool_size', 10)
         self._pool_min_size = kwargs.pop('pool_min_size', 1)
+        self._pool_overflow = kwargs.pop('pool_overflow', 0)
+        self._pool_idle_timeout = kwargs.pop('pool_idle_timeout', None)
         self._acquire_timeout = kwargs.pop('acquire_timeout', 10)
         super(AsyncDatabaseMixin, self).__init__(database, **kwargs)
 
@@ -229,6 +236,13 @@ class AsyncDatabaseMixin(object):
         self._pool_lock = asyncio.Lock()
         self._closing = False  # Guard against use during shutdown.
 
+        # Acquire-wait accounting, see stats().
+        self._checked_out = {}  # conn -> time.monotonic() acquired.
+        self._max_in_use = self._checkouts = self._checkins = 0
+        self._wait_count = self._wait_timeouts = 0
+        self._wait_time = self._hold_time = 0.
+        self._wait_histogram = [0] * len(WAIT_BUCKETS)
+
     def execute_sql(self, sql, params=None):
         try:
             return await_(self.aexecute_sql(sql, params or ()))
@@ -277,6 +291,10 @@ class AsyncDatabaseMixin(object):
             await self._release_conn(conn)
 
     async def _release_conn(self, conn):
+        acquired = self._checked_out.pop(conn, None)
+        if acquired is not None:
+            self._checkins += 1
+            self._hold_time += time.monotonic() - acquired
         if getattr(conn, '_pool', None) is not self._pool:
             # The owning pool was closed or replaced, just close the conn.
             await conn.close()
@@ -300,13 +318,25 @@ class AsyncDatabaseMixin(object):
                 'Timed out connecting to database '
                 '(acquire_timeout=%s).' % self._acquire_timeout) from None
 
+        start = time.monotonic()
         try:
             with __exception_wrapper__:
-                conn = await self._pool_acquire(pool)
+                conn, waited = await self._pool_acquire(pool)
         except asyncio.TimeoutError:
+            self._wait_timeouts += 1
             raise OperationalError(
                 'Timed out acquiring connection from pool '
                 '(acquire_timeout=%s).' % self._acquire_timeout) from None
+        now = time.monotonic()
+        if waited:
+            self._wait_count += 1
+            self._wait_time += now - start
+            self._wait_histogram[bisect.bisect_left(WAIT_BUCKETS,
+                                                    now - start)] += 1
+        self._checkouts += 1
+        self._checked_out[conn] = now
+        if len(self._checked_out) > self._max_in_use:
+            self._max_in_use = len(self._checked_out)
         # Tag with the owning pool so a late release can detect a swap.
         conn._pool = pool
         logger.debug('Acquired connection %s from pool.', id(conn))
@@ -316,11 +346,46 @@ class AsyncDatabaseMixin(object):
         raise NotImplementedError('Subclasses must implement.')
 
     async def _pool_acquire(self, pool):
+        # Return a connection and whether the caller queued for it.
         raise NotImplementedError('Subclasses must implement.')
 
+    def _pool_exhausted(self):
+        # Whether every connection the driver's pool may open is checked out,
+        # so the next acquirer has to queue.
+        return len(self._checked_out) >= self._pool_size + self._pool_overflow
+
     async def _pool_release(self, conn):
         raise NotImplementedError('Subclasses must implement.')
 
+    def _pool_info(self, pool):
+        # Counters reported by the pool itself, see AsyncSqlitePool.info().
+        return {}
+
+    def stats(self):
+        """
+        Return a :class:`~playhouse.pool.PoolStats` snapshot of the pool.
+        """
+        info = self._pool_info(self._pool) if self._pool is not None else {}
+        return PoolStats(
+            idle=info.get('idle', 0),
+            in_use=len(self._checked_out),
+            waiting=info.get('waiting', 0),
+            max_in_use=self._max_in_use,
+            created=info.get('created', 0),
+            closed=info.get('closed', 0),
+            discarded=info.get('discarded', dict.fromkeys(DISCARD_REASONS,
+                                                          0)),
+            checkouts=self._checkouts,
+            waits=self._wait_count,
+            wait_time=self._wait_time,
+            wait_histogram=tuple(zip(WAIT_BUCKETS, self._wait_histogram)),
+            timeouts=self._wait_timeouts,
+            avg_age=info.get('avg_age', 0.),
+            avg_hold_time=(self._hold_time / self._checkins
+                           if self._checkins else 0.),
+            validations=info.get('validations', 0),
+            connect_failures=info.get('connect_failures', 0))
+
     async def close_pool(self):
         self._closing = True
         try:
@@ -368,6 +433,7 @@ class AsyncDatabaseMixin(object):
 
                 await self._pool_close()
                 self._pool = None
+                self._checked_out.clear()
         finally:
             self._closing = False
 
@@ -692,44 +758,196 @@ class AsyncConnectionWrapper(object):
 
 
 class AsyncSqlitePool(object):
-    def __init__(self, database, pool_size=5, on_connect=None,
-                 **connect_params):
+    """
+    Pool of aiosqlite connections holding between ``min_size`` and
+    ``pool_size`` connections, plus up to ``overflow`` temporary connections
+    when all are in use. Waiting tasks are served in the order they arrived.
+    """
+    def __init__(self, database, pool_size=5, on_connect=None, min_size=None,
+                 overflow=0, idle_timeout=None, **connect_params):
         self._database = database
         self._pool_size = pool_size
+        self._min_size = pool_size if min_size is None else min(min_size,
+                                                                 pool_size)
+        self._max_size = pool_size + (overflow or 0)
+        self._idle_timeout = idle_timeout
         self._on_connect = on_connect
         self._connect_params = connect_params
-        self._queue = asyncio.Queue(maxsize=pool_size)
+        self._idle = collections.deque()  # (conn, idle since), newest last.
+        self._waiters = collections.deque()  # Futures, oldest first.
+        self._size = 0  # Connections open or being opened.
+        self._created_at = {}  # conn -> time opened.
+        self._tasks = set()  # Background opens and closes.
+        self._maintenance = None
         self._closed = False
 
+        self.created = self.closed = self.validations = 0
+        self.connect_failures = 0
+        self.discarded = dict.fromkeys(DISCARD_REASONS, 0)
+
     async def initialize(self):
-        for _ in range(self._pool_size):
-            conn = await self._create_connection()
-            self._queue.put_nowait(conn)
+        while self._size < self._min_size:
+            self._size += 1
+            try:
+                conn = await self._create_connection()
+            except BaseException:
+                self._size -= 1
+                raise
+            self._idle.append((conn, time.monotonic()))
+        if self._idle_timeout:
+            self._maintenance = asyncio.ensure_future(self._maintain())
         return self
 
     async def _create_connection(self):
-        conn = await aiosqlite.connect(
-            self._database,
-            isolation_level=None,
-            **self._connect_params)
-        if self._on_connect is not None:
-            await self._on_connect(conn)
-        return AsyncSqliteConnection(conn)
+        try:
+            conn = await aiosqlite.connect(
+                self._database,
+                isolation_level=None,
+                **self._connect_params)
+            if self._on_connect is not None:
+                await self._on_connect(conn)
+        except Exception:
+            self.connect_failures += 1
+            raise
+        self.created += 1
+        conn = AsyncSqliteConnection(conn)
+        self._created_at[conn] = time.monotonic()
+        return conn
 
     async def acquire(self, timeout=None):
+        conn, _ = await self._checkout(timeout)
+        return conn
+
+    async def _checkout(self, timeout=None):
+        # Return a connection and whether the caller had to queue for it.
         if self._closed:
             raise InterfaceError('Pool is closed.')
-        return await asyncio.wait_for(self._queue.get(), timeout=timeout)
+        self._expire_idle()
+        while self._idle:
+            conn, _ = self._idle.pop()
+            self.validations += 1
+            if self._conn_is_valid(conn):
+                return conn, False
+            self._discard(conn, 'closed')
+
+        if self._size < self._max_size and not self._waiters:
+            return await self._open(timeout), False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(waiter, timeout=timeout), True
+        except BaseException:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif waiter.done() and not waiter.cancelled() and (
+                    waiter.exception() is None):
+                # Handed a connection as the wait was abandoned.
+                self._put(waiter.result())
+            raise
+
+    async def _open(self, timeout):
+        # The connection is opened by a task the pool owns, so one that
+        # finishes opening after the caller gave up is kept, not leaked.
+        self._size += 1
+        task = self._spawn(self._create_connection())
+        try:
+            return await asyncio.wait_for(asyncio.shield(task),
+                                          timeout=timeout)
+        except BaseException:
+            if task.done():
+                self._opened(task)
+            else:
+                task.add_done_callback(self._opened)
+            raise
+
+    def _opened(self, task):
+        # Connection opened for a caller that gave up.
+        if task.cancelled() or task.exception() is not None:
+            self._size -= 1
+        elif self._closed:
+            self._size -= 1
+            self._spawn(self._close_conn(task.result()))
+        else:
+            self._put(task.result())
 
     def _conn_is_valid(self, conn):
         return not conn.stale()
 
     async def _close_conn(self, conn):
+        self._created_at.pop(conn, None)
+        self.closed += 1
         try:
             await conn.close()
         except Exception:
             logger.warning('Error closing pooled connection', exc_info=True)
 
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _discard(self, conn, reason):
+        # Close the connection in the background, and open a replacement if
+        # the pool is below its minimum size or tasks are waiting.
+        self._size -= 1
+        self.discarded[reason] += 1
+        self._spawn(self._close_conn(conn))
+        if not self._closed and (self._size < self._min_size or
+                                 self._waiters):
+            self._spawn(self._replenish())
+
+    def _put(self, conn):
+        # Hand a connection to the oldest waiting task, or make it idle.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(conn)
+                return
+        if self._size > self._pool_size and not self._idle_timeout:
+            # Overflow connection without an idle expiry.
+            self._discard(conn, 'idle')
+        else:
+            self._idle.append((conn, time.monotonic()))
+
+    async def _replenish(self):
+        while not self._closed and self._size < self._max_size and (
+                self._size < self._min_size or self._waiters):
+            self._size += 1
+            try:
+                conn = await self._create_connection()
+            except Exception as exc:
+                self._size -= 1
+                logger.warning('Unable to open pool connection.',
+                               exc_info=True)
+                if self._waiters:
+                    waiter = self._waiters.popleft()
+                    if not waiter.done():
+                        waiter.set_exception(exc)
+                return
+            if self._closed:
+                self._size -= 1
+                await self._close_conn(conn)
+                return
+            self._put(conn)
+
+    def _expire_idle(self):
+        # Close connections idle longer than idle_timeout, oldest first,
+        # keeping min_size connections open.
+        if not self._idle_timeout:
+            return
+        cutoff = time.monotonic() - self._idle_timeout
+        while self._idle and self._size > self._min_size and (
+                self._idle[0][1] < cutoff):
+            conn, _ = self._idle.popleft()
+            self._discard(conn, 'idle')
+
+    async def _maintain(self):
+        while not self._closed:
+            await asyncio.sleep(self._idle_timeout / 2.)
+            self._expire_idle()
+
     async def release(self, conn):
         if self._closed:
             # Straggler released after close(), finish closing it.
@@ -744,24 +962,45 @@ class AsyncSqlitePool(object):
             except Exception:
                 logger.warning('Error rolling back connection', exc_info=True)
                 valid = False
-        if not valid:
-            await self._close_conn(conn)
-            conn = await self._create_connection()
-        try:
-            self._queue.put_nowait(conn)
-        except asyncio.QueueFull:
-            # More conns extant than pool slots, close the surplus.
-            await self._close_conn(conn)
+        if valid:
+            self._put(conn)
+        else:
+            # Replaced in the background rather than delaying this task.
+            self._discard(conn, 'closed' if conn.stale() else 'not_reusable')
+
+    def info(self):
+        """
+        Return a dict of pool counters, see :meth:`AsyncDatabaseMixin.stats`.
+        """
+        now = time.monotonic()
+        ages = [now - ts for ts in self._created_at.values()]
+        return {
+            'idle': len(self._idle),
+            'waiting': len(self._waiters),
+            'created': self.created,
+            'closed': self.closed,
+            'discarded': dict(self.discarded),
+            'avg_age': sum(ages) / len(ages) if ages else 0.,
+            'validations': self.validations,
+            'connect_failures': self.connect_failures}
 
     async def close(self):
         # Close idle conns now, checked-out ones close on release.
         self._closed = True
-        while True:
-            try:
-                conn = self._queue.get_nowait()
-            except asyncio.QueueEmpty:
-                break
+        if self._maintenance is not None:
+            self._maintenance.cancel()
+            self._maintenance = None
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(InterfaceError('Pool is closed.'))
+        while self._idle:
+            conn, _ = self._idle.popleft()
+            self._size -= 1
             await self._close_conn(conn)
+        while self._tasks:
+            # An open finishing now may spawn a close of its connection.
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
 
 
 class AsyncSqliteConnection(AsyncConnectionWrapper):
@@ -817,11 +1056,16 @@ class AsyncSqliteDatabase(AsyncDatabaseMixin, SqliteDatabase):
         if self.database == ':memory:':
             # Pooled in-memory connections would each be a separate, empty
             # database - use a single shared connection instead.
-            pool_size = 1
+            pool_size, min_size, overflow = 1, 1, 0
         else:
             pool_size = self._pool_size
+            min_size = self._pool_min_size
+            overflow = self._pool_overflow
         pool = AsyncSqlitePool(self.database, pool_size=pool_size,
                                on_connect=self._add_conn_hooks,
+                               min_size=min_size,
+                               overflow=overflow,
+                               idle_timeout=self._pool_idle_timeout,
                                timeout=self._timeout,
                                **self.connect_params)
         return await pool.initialize()
@@ -878,12 +1122,15 @@ class AsyncSqliteDatabase(AsyncDatabaseMixin, SqliteDatabase):
             await conn.load_extension(extension)
 
     async def _pool_acquire(self, pool):
-        return await pool.acquire(timeout=self._acquire_timeout)
+        return await pool._checkout(timeout=self._acquire_timeout)
 
     async def _pool_release(self, conn):
         if conn is not None:
             await self._pool.release(conn)
 
+    def _pool_info(self, pool):
+        return pool.info()
+
     async def _pool_close(self):
         if self._pool:
             await self._pool.close()
@@ -952,14 +1199,21 @@ class AsyncMySQLDatabase(AsyncDatabaseMixin, MySQLDatabase):
         # connects happen under the pool's condition lock, so an unbounded
         # connect can stall every other acquirer.
         params.setdefault('connect_timeout', self._acquire_timeout)
+        if self._pool_idle_timeout is not None:
+            # aiomysql recycles connections unused for pool_recycle seconds.
+            params.setdefault('pool_recycle', self._pool_idle_timeout)
         return await aiomysql.create_pool(
             db=self.database,
             autocommit=True,
             minsize=self._pool_min_size,
-            maxsize=self._pool_size,
+            maxsize=self._pool_size + self._pool_overflow,
             **params)
 
+    def _pool_info(self, pool):
+        return {'idle': pool.freesize}
+
     async def _pool_acquire(self, pool):
+        waited = self._pool_exhausted()
         try:
             conn = await asyncio.wait_for(
                 pool.acquire(),
@@ -971,7 +1225,7 @@ class AsyncMySQLDatabase(AsyncDatabaseMixin, MySQLDatabase):
             # Used for version-dependent SQL, e.g. MariaDB upsert VALUE().
             self.server_version = self._extract_server_version(
                 conn.get_server_info())
-        return AsyncMySQLConnection(conn)
+        return AsyncMySQLConnection(conn), waited
 
     async def _pool_release(self, conn):
         if conn and conn.conn:
@@ -1180,11 +1434,13 @@ class AsyncPostgresqlDatabase(AsyncDatabaseMixin, PostgresqlDatabase):
         super(AsyncPostgresqlDatabase, self).init(database, **kwargs)
 
     async def register_adapters(self, conn):
+        loads = get_json_codec(self.json_codec).loads
+
         def encode_json(val):
             return val if isinstance(val, bytes) else val.encode('utf8')
 
         def decode_json(bval):
-            return json.loads(bval.decode())
+            return loads(bval)
 
         await conn.set_type_codec(
             'json', encoder=encode_json, decoder=decode_json,
@@ -1196,7 +1452,7 @@ class AsyncPostgresqlDatabase(AsyncDatabaseMixin, PostgresqlDatabase):
             return b'\x01' + val.encode('utf8')
 
         def decode_jsonb(bval):
-            return json.loads(bval[1:].decode())
+            return loads(bval[1:])
 
         await conn.set_type_codec(
             'jsonb', encoder=encode_jsonb, decoder=decode_jsonb,
@@ -1218,18 +1474,25 @@ class AsyncPostgresqlDatabase(AsyncDatabaseMixin, PostgresqlDatabase):
         params = dict(self.connect_params)
         # Per-connection establish timeout (asyncpg's default is 60s).
         params.setdefault('timeout', self._acquire_timeout)
+        if self._pool_idle_timeout is not None:
+            params.setdefault('max_inactive_connection_lifetime',
+                              self._pool_idle_timeout)
         return await asyncpg.create_pool(
             min_size=self._pool_min_size,
-            max_size=self._pool_size,
+            max_size=self._pool_size + self._pool_overflow,
             init=self.register_adapters,
             **db_params,
             **params)
 
     async def _pool_acquire(self, pool):
+        waited = self._pool_exhausted()
         conn = await asyncio.wait_for(
             pool.acquire(),
             timeout=self._acquire_timeout)
-        return AsyncPostgresqlConnection(conn)
+        return AsyncPostgresqlConnection(conn), waited
+
+    def _pool_info(self, pool):
+        return {'idle': pool.get_idle_size()}
 
     async def _pool_release(self, conn):
         if conn and conn.conn:
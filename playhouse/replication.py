@@ -0,0 +1,179 @@
+"""
+Route read queries to replica databases and everything else to the primary.
+
+Example::
+
+    primary = PooledPostgresqlDatabase('app', host='db-primary')
+    db = ReplicatedDatabase(primary, [
+        PooledPostgresqlDatabase('app', host='db-replica-1'),
+        PooledPostgresqlDatabase('app', host='db-replica-2')],
+        sticky_window=2)
+
+    class BaseModel(Model):
+        class Meta:
+            database = db
+"""
+import itertools
+import threading
+import time
+
+from peewee import Database
+from peewee import DatabaseProxy
+from peewee import MySQLDatabase
+from peewee import PostgresqlDatabase
+from peewee import SelectBase
+
+
+__all__ = ['ReplicatedDatabase']
+
+
+class _Session(threading.local):
+    replica = None  # Index of the replica used by the current thread.
+    last_write = None  # time.monotonic() of the most-recent write.
+    dirty = False  # Written to since the primary position was read.
+    position = None  # Primary position a replica must reach.
+
+
+class ReplicatedDatabase(DatabaseProxy):
+    """
+    Database which executes SELECT queries on a replica, and all other
+    queries on the primary.
+
+    :param Database primary: database that receives writes.
+    :param list replicas: databases that receive reads.
+    :param str strategy: ``'round_robin'`` or ``'least_loaded'``.
+    :param float sticky_window: seconds to keep reading from the primary after
+        a write.
+    :param bool track_position: after a write, keep reading from the primary
+        until the replica has replayed the primary's WAL LSN (Postgres) or
+        GTID set (MySQL).
+    """
+    __slots__ = ('obj', '_callbacks', '_Model', 'replicas', 'strategy',
+                 'sticky_window', 'track_position', '_session', '_lock',
+                 '_counter', '_open')
+
+    def __init__(self, primary, replicas, strategy='round_robin',
+                 sticky_window=None, track_position=False):
+        super(ReplicatedDatabase, self).__init__()
+        if strategy not in ('round_robin', 'least_loaded'):
+            raise ValueError('Unrecognized strategy "%s", expected '
+                             '"round_robin" or "least_loaded".' % strategy)
+        self.replicas = list(replicas)
+        self.strategy = strategy
+        self.sticky_window = sticky_window
+        self.track_position = track_position
+        self._session = _Session()
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._open = [0] * len(self.replicas)  # Threads using each replica.
+        self.initialize(primary)
+
+    @property
+    def primary(self):
+        return self.obj
+
+    def execute(self, query, **context_options):
+        if self._use_replica(query):
+            return self.replica().execute(query, **context_options)
+
+        cursor = self.obj.execute(query, **context_options)
+        if not isinstance(query, SelectBase):
+            self._written()
+        return cursor
+
+    def _use_replica(self, query):
+        if not self.replicas or not isinstance(query, SelectBase):
+            return False
+        if getattr(query, '_for_update', None) or self.obj.in_transaction():
+            return False
+        return not self._is_sticky()
+
+    def _written(self):
+        if self.sticky_window is not None or self.track_position:
+            self._session.last_write = time.monotonic()
+            self._session.dirty = True
+
+    def _is_sticky(self):
+        session = self._session
+        if session.last_write is None:
+            return False
+
+        if self.sticky_window is not None and (
+                time.monotonic() - session.last_write > self.sticky_window):
+            session.last_write = session.position = None
+            return False
+
+        if self.track_position:
+            # The position is read lazily, outside of the transaction the
+            # write may have occurred in, so it includes the commit.
+            if session.dirty:
+                session.position = self.primary_position()
+                session.dirty = False
+            if self.replica_has_position(self.replica(), session.position):
+                session.last_write = session.position = None
+                return False
+        return True
+
+    def primary_position(self):
+        """
+        Return the primary's current replication position.
+        """
+        if isinstance(self.obj, PostgresqlDatabase):
+            sql = 'SELECT pg_current_wal_lsn()::text'
+        elif isinstance(self.obj, MySQLDatabase):
+            sql = 'SELECT @@GLOBAL.gtid_executed'
+        else:
+            raise NotImplementedError('track_position is supported for '
+                                      'Postgres and MySQL.')
+        return self.obj.execute_sql(sql).fetchone()[0]
+
+    def replica_has_position(self, replica, position):
+        """
+        Return whether the replica has replayed the given primary position.
+        """
+        if isinstance(self.obj, PostgresqlDatabase):
+            sql = 'SELECT pg_last_wal_replay_lsn() >= %s::pg_lsn'
+        elif isinstance(self.obj, MySQLDatabase):
+            sql = 'SELECT GTID_SUBSET(%s, @@GLOBAL.gtid_executed)'
+        else:
+            raise NotImplementedError('track_position is supported for '
+                                      'Postgres and MySQL.')
+        return bool(replica.execute_sql(sql, (position,)).fetchone()[0])
+
+    def replica(self):
+        """
+        Return the replica used by the current thread, choosing one if the
+        thread has not read from a replica since it last called
+        :meth:`close`.
+        """
+        session = self._session
+        if session.replica is None:
+            with self._lock:
+                if self.strategy == 'least_loaded':
+                    idx = min(range(len(self.replicas)),
+                              key=self._open.__getitem__)
+                else:
+                    idx = next(self._counter) % len(self.replicas)
+                self._open[idx] += 1
+            session.replica = idx
+        return self.replicas[session.replica]
+
+    def close(self):
+        # Release the replica connection along with the primary's.
+        session = self._session
+        if session.replica is not None:
+            idx, session.replica = session.replica, None
+            with self._lock:
+                self._open[idx] -= 1
+            replica = self.replicas[idx]
+            if not replica.is_closed():
+                replica.close()
+        return self.obj.close()
+
+    # Database's context-manager, so that exiting also closes the replica.
+    __enter__ = Database.__enter__
+    __exit__ = Database.__exit__
+
+    # Bind models to this database rather than the primary.
+    bind = Database.bind
+    bind_ctx = Database.bind_ctx
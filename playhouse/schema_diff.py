@@ -26,14 +26,34 @@ Each attribute of the result maps directly onto a SchemaMigrator call:
 * ``drop_columns``: list of ``(table, column name)``
 * ``add_indexes``: list of :class:`IndexDiff`
 * ``drop_indexes``: list of :class:`IndexDiff`
+
+An :class:`IndexRecorder` collects the columns used by the WHERE, JOIN and
+ORDER BY clauses of executed queries, and proposes indexes from them::
+
+    with IndexRecorder(db) as recorder:
+        run_test_suite()
+
+    advice = recorder.advise()
+    print(advice)
 """
+import random
 import re
+import threading
+from collections import Counter
 from collections import namedtuple
 
 from peewee import *
+from peewee import Expression
+from peewee import FieldAlias
+from peewee import Join
+from peewee import Negated
+from peewee import NodeList
+from peewee import Ordering
+from peewee import SelectBase
 from peewee import sort_models
 
-__all__ = ['IndexDiff', 'SchemaDiff', 'diff_models']
+__all__ = ['IndexAdvice', 'IndexDiff', 'IndexRecorder', 'SchemaDiff',
+           'diff_models']
 
 
 _IndexDiff = namedtuple('_IndexDiff', (
@@ -172,3 +192,246 @@ def diff_models(database, models):
 
     return SchemaDiff(create_tables, add_columns, drop_columns,
                       add_indexes, drop_indexes)
+
+
+# Operators that can be answered by the leading column(s) of an index.
+_EQ_OPS = frozenset((OP.EQ, OP.IN, OP.IS))
+_RANGE_OPS = frozenset((OP.LT, OP.LTE, OP.GT, OP.GTE, OP.BETWEEN, OP.LIKE,
+                        OP.ILIKE))
+
+# A query's use of a single model: columns compared for equality, columns
+# compared by range, and the ORDER BY columns.
+_Usage = namedtuple('_Usage', ('equality', 'range', 'ordering'))
+
+
+_IndexAdvice = namedtuple('_IndexAdvice', (
+    'add_indexes',
+    'unused_indexes'))
+
+class IndexAdvice(_IndexAdvice):
+    __slots__ = ()
+
+    def __bool__(self):
+        return any(self)
+
+    def __str__(self):
+        accum = [idx.display('add') for idx in self.add_indexes]
+        accum.extend(idx.display('unused') for idx in self.unused_indexes)
+        return '\n'.join(accum)
+
+    def as_diff(self, drop_unused=False):
+        # A SchemaDiff suitable for playhouse.migrations.template().
+        return SchemaDiff([], [], [], list(self.add_indexes),
+                          list(self.unused_indexes) if drop_unused else [])
+
+
+def _field(node):
+    if isinstance(node, FieldAlias):
+        node = node.field
+    if isinstance(node, Field) and node.model is not None:
+        return node
+
+
+class IndexRecorder(object):
+    """
+    Record the columns used in predicates, joins and orderings of queries
+    executed by a database, in order to propose indexes.
+
+    :param database: database whose queries are recorded.
+    :param float sample: fraction of queries to record.
+    """
+    def __init__(self, database, sample=1.0):
+        self.database = database
+        self.sample = sample
+        self.usage = {}  # Model -> Counter of _Usage.
+        self._lock = threading.Lock()
+        self._execute = None
+
+    def install(self):
+        if self._execute is not None:
+            return
+        self._execute = execute = self.database.execute
+        def wrapper(query, **context_options):
+            if self.sample >= 1 or random.random() < self.sample:
+                self.record(query)
+            return execute(query, **context_options)
+        self.database.execute = wrapper
+
+    def uninstall(self):
+        if self._execute is not None:
+            del self.database.execute
+            self._execute = None
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.uninstall()
+
+    def reset(self):
+        with self._lock:
+            self.usage.clear()
+
+    def record(self, query):
+        usages = []
+        self._visit_query(query, usages)
+        with self._lock:
+            for model, usage in usages:
+                self.usage.setdefault(model, Counter())[usage] += 1
+
+    def _visit_query(self, query, usages):
+        where = getattr(query, '_where', None)
+        terms = {}  # Model -> ([equality], [range]).
+        if where is not None:
+            self._visit_predicate(where, terms, usages)
+
+        # Join conditions are recorded separately from the WHERE clause, as
+        # each join is a lookup on the joined table.
+        stack = list(getattr(query, '_from_list', None) or ())
+        while stack:
+            source = stack.pop()
+            if isinstance(source, Join):
+                stack.extend((source.lhs, source.rhs))
+                if isinstance(source._on, Expression):
+                    self._visit_predicate(source._on, None, usages)
+            elif isinstance(source, SelectBase):
+                self._visit_query(source, usages)
+
+        ordering = {}
+        for node in getattr(query, '_order_by', None) or ():
+            field = _field(node.node if isinstance(node, Ordering) else node)
+            if field is not None:
+                ordering.setdefault(field.model, []).append(field.column_name)
+
+        for model in set(terms) | set(ordering):
+            equality, rng = terms.get(model, ((), ()))
+            usages.append((model, _Usage(
+                tuple(sorted(set(equality))),
+                tuple(c for c in dict.fromkeys(rng) if c not in equality),
+                tuple(ordering.get(model, ())))))
+
+    def _visit_predicate(self, node, terms, usages):
+        if isinstance(node, SelectBase):
+            self._visit_query(node, usages)
+        elif isinstance(node, Negated):
+            # Negated terms cannot use an index, but may hold subqueries.
+            self._visit_predicate(node.node, {}, usages)
+        elif isinstance(node, NodeList):
+            for item in node.nodes:
+                self._visit_predicate(item, terms, usages)
+        elif isinstance(node, Expression):
+            if node.op == OP.AND:
+                self._visit_predicate(node.lhs, terms, usages)
+                self._visit_predicate(node.rhs, terms, usages)
+                return
+            elif node.op == OP.OR:
+                # Each side of an OR is looked-up independently.
+                for side in (node.lhs, node.rhs):
+                    branch = {} if terms is not None else None
+                    self._visit_predicate(side, branch, usages)
+                    for model, (eq, rng) in (branch or {}).items():
+                        usages.append((model, _Usage(
+                            tuple(sorted(set(eq))), tuple(rng), ())))
+                return
+
+            lhs, rhs = _field(node.lhs), _field(node.rhs)
+            kind = None
+            if node.op in _EQ_OPS:
+                kind = 0
+            elif node.op in _RANGE_OPS and not (
+                    isinstance(node.rhs, str) and node.rhs.startswith('%')):
+                kind = 1
+            if kind is not None:
+                for field in (lhs, rhs):
+                    if field is None:
+                        continue
+                    elif terms is None:
+                        usage = ((field.column_name,), (), ()) if kind == 0 \
+                                else ((), (field.column_name,), ())
+                        usages.append((field.model, _Usage(*usage)))
+                    else:
+                        entry = terms.setdefault(field.model, ([], []))
+                        entry[kind].append(field.column_name)
+            for side in (node.lhs, node.rhs):
+                if isinstance(side, (SelectBase, NodeList, Negated)):
+                    self._visit_predicate(side, {}, usages)
+
+    def advise(self, min_count=1):
+        """
+        Propose indexes for recorded queries and report declared indexes
+        that no recorded query could use.
+
+        :param int min_count: only propose indexes for column combinations
+            seen at least this many times.
+        :return: an :class:`IndexAdvice`.
+        """
+        with self._lock:
+            usage = dict((model, Counter(counter))
+                         for model, counter in self.usage.items())
+
+        add_indexes, unused_indexes = [], []
+        for model in sorted(usage, key=lambda m: m._meta.table_name):
+            declared = _declared_indexes(model)
+            existing = [cols for cols, _, _ in declared]
+            existing.append(tuple(f.column_name for f in
+                                  model._meta.get_primary_keys()))
+
+            candidates = []
+            for item, count in usage[model].items():
+                # Equality columns, then sort columns, then a range column.
+                columns = item.equality + item.ordering + item.range[:1]
+                if not columns or count < min_count:
+                    continue
+                columns = tuple(dict.fromkeys(columns))
+                if not any(_covers(index, item.equality, columns)
+                           for index in existing):
+                    candidates.append((item.equality, columns))
+
+            # Drop candidates satisfied by a longer candidate.
+            proposals = []
+            for equality, columns in sorted(candidates,
+                                            key=lambda c: -len(c[1])):
+                if not any(_covers(other, equality, columns)
+                           for other in proposals):
+                    proposals.append(columns)
+            table = model._meta.table_name
+            add_indexes.extend(IndexDiff(table, None, columns, False)
+                               for columns in sorted(proposals))
+
+            # Unique indexes enforce a constraint, so are always kept.
+            for columns, unique, name in declared:
+                if not unique and not any(_uses(columns, item)
+                                          for item in usage[model]):
+                    unused_indexes.append(IndexDiff(table, name, columns,
+                                                    unique))
+
+        return IndexAdvice(add_indexes, unused_indexes)
+
+
+def _declared_indexes(model):
+    accum = []
+    for index in model._meta.fields_to_index():
+        if isinstance(index, Index) and index._where is None and \
+           all(isinstance(p, Field) for p in index._expressions):
+            accum.append((tuple(p.column_name for p in index._expressions),
+                          bool(index._unique), index._name))
+    return accum
+
+
+def _covers(index, equality, columns):
+    # The index's leading columns are the equality columns (in any order),
+    # followed by the remaining columns in order.
+    n = len(equality)
+    return (set(index[:n]) == set(equality) and
+            tuple(index[n:len(columns)]) == columns[n:] and
+            len(index) >= len(columns))
+
+
+def _uses(columns, usage):
+    # Whether a lookup could use the leading column of an index.
+    leading = columns[0]
+    if leading in usage.equality:
+        return True
+    first = (usage.ordering + usage.range)[:1]
+    return not usage.equality and first == (leading,)
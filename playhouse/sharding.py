@@ -0,0 +1,703 @@
+"""
+Route queries across horizontally-partitioned databases by a shard key.
+
+Example::
+
+    db = ShardedDatabase({
+        'a': PooledPostgresqlDatabase('app', host='shard-a'),
+        'b': PooledPostgresqlDatabase('app', host='shard-b')},
+        key_func=lambda user_id: 'ab'[user_id % 2])
+
+    class Tweet(ShardedModel):
+        user_id = IntegerField()
+        content = TextField()
+
+        class Meta:
+            database = db
+            shard_key = 'user_id'
+
+    # Runs on shard "b" only.
+    Tweet.select().where(Tweet.user_id == 3)
+
+    # Runs on every shard and merges the results.
+    Tweet.select().order_by(Tweet.id.desc()).limit(10)
+"""
+import heapq
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from peewee import Alias
+from peewee import Case
+from peewee import CompoundSelectQuery
+from peewee import Database
+from peewee import DatabaseProxy
+from peewee import Expression
+from peewee import Field
+from peewee import Function
+from peewee import Insert
+from peewee import Model
+from peewee import NodeList
+from peewee import OP
+from peewee import Ordering
+from peewee import PostgresqlDatabase
+from peewee import SQL
+from peewee import Select
+from peewee import SelectBase
+from peewee import Value
+from peewee import WrappedNode
+from playhouse.cockroachdb import CockroachDatabase
+
+
+__all__ = [
+    'ShardedDatabase',
+    'ShardedModel',
+]
+
+
+# Aggregates whose per-shard results can be combined, and how.
+_COMBINE = {
+    'COUNT': sum,
+    'SUM': sum,
+    'MIN': min,
+    'MAX': max,
+}
+
+# Aggregates whose per-shard results cannot be combined.
+_AGGREGATES = frozenset((
+    'ARRAY_AGG', 'AVG', 'BIT_AND', 'BIT_OR', 'BIT_XOR', 'BOOL_AND', 'BOOL_OR',
+    'EVERY', 'GROUP_CONCAT', 'JSON_AGG', 'JSON_ARRAYAGG', 'JSON_GROUP_ARRAY',
+    'JSON_GROUP_OBJECT', 'JSON_OBJECTAGG', 'JSONB_AGG', 'PERCENTILE_CONT',
+    'PERCENTILE_DISC', 'STDDEV', 'STDDEV_POP', 'STDDEV_SAMP', 'STRING_AGG',
+    'TOTAL', 'VAR_POP', 'VAR_SAMP', 'VARIANCE')) | frozenset(_COMBINE)
+
+
+def _is_aggregate(node):
+    if not isinstance(node, Function) or not node.name:
+        return False
+    name = node.name.upper()
+    if name in ('MIN', 'MAX'):
+        return len(node.arguments) == 1  # Otherwise a scalar, in SQLite.
+    return name in _AGGREGATES
+
+
+def _is_distinct(func):
+    # fn.COUNT(Field.distinct()), i.e. COUNT(DISTINCT ...).
+    for arg in func.arguments:
+        if isinstance(arg, NodeList) and arg.nodes and \
+           isinstance(arg.nodes[0], SQL) and \
+           arg.nodes[0].sql.upper() == 'DISTINCT':
+            return True
+    return False
+
+
+def _find_aggregate(node):
+    # Return the first aggregate within the expression, if any.
+    if isinstance(node, NodeList):
+        for child in node.nodes:
+            if isinstance(child, SQL) and child.sql.upper() == 'OVER':
+                raise ValueError('Window functions cannot be combined '
+                                 'across shards.')
+        children = node.nodes
+    elif isinstance(node, Function):
+        if _is_aggregate(node):
+            return node
+        children = node.arguments
+    elif isinstance(node, WrappedNode):
+        children = (node.node,)
+    elif isinstance(node, Expression):
+        children = (node.lhs, node.rhs)
+    elif isinstance(node, Case):
+        children = [node.predicate, node.default]
+        for pair in node.expression_tuples:
+            children.extend(pair)
+    elif isinstance(node, (list, tuple)):
+        children = node
+    else:
+        return
+    for child in children:
+        found = _find_aggregate(child)
+        if found is not None:
+            return found
+
+
+class _ShardSession(threading.local):
+    def __init__(self):
+        self.pinned = []  # Stack of shard names selected by using().
+
+
+class _ShardCursor(object):
+    # Cursor over the combined rows of a scatter-gather query.
+    def __init__(self, rows, description=None, rowcount=-1):
+        self._rows = iter(rows)
+        self.description = description
+        self.rowcount = rowcount
+        self.lastrowid = None
+
+    def fetchone(self):
+        return next(self._rows, None)
+
+    def fetchmany(self, size=100):
+        return list(itertools.islice(self._rows, size))
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def __iter__(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+class _SortKey(object):
+    # Sorts a row by several columns, each ascending or descending, with
+    # NULLs placed first or last, the way the shards ordered them.
+    __slots__ = ('values', 'desc', 'nulls_first')
+
+    def __init__(self, values, desc, nulls_first):
+        self.values = values
+        self.desc = desc
+        self.nulls_first = nulls_first
+
+    def __lt__(self, other):
+        for lhs, rhs, desc, nulls_first in zip(self.values, other.values,
+                                               self.desc, self.nulls_first):
+            if lhs == rhs:
+                continue
+            if lhs is None or rhs is None:
+                return (lhs is None) == nulls_first
+            return (lhs < rhs) != desc
+        return False
+
+
+class ShardedDatabase(DatabaseProxy):
+    """
+    Database which routes each query to the shard(s) holding its rows.
+
+    :param dict shards: mapping of shard name to :class:`Database`.
+    :param key_func: callable mapping a shard-key value to a shard name.
+    :param str shard_key: name of the shard-key field, for models that do not
+        specify a ``shard_key`` in their ``Meta``.
+    :param int max_workers: threads used to query shards concurrently,
+        defaults to the number of shards.
+
+    A query is sent to a single shard when its WHERE clause compares the
+    shard key to a value (``==`` or ``IN``), or when inserting rows whose
+    shard key maps to one shard. Other queries run on every shard: SELECT
+    results are merged, and the row counts of UPDATE and DELETE are summed.
+    Queries whose results cannot be merged correctly raise ``ValueError``.
+    """
+    __slots__ = ('obj', '_callbacks', '_Model', 'shards', 'key_func',
+                 'shard_key', 'max_workers', '_executor', '_session', '_lock')
+
+    def __init__(self, shards, key_func, shard_key=None, max_workers=None):
+        super(ShardedDatabase, self).__init__()
+        if not shards:
+            raise ValueError('At least one shard is required.')
+        self.shards = dict(shards)
+        self.key_func = key_func
+        self.shard_key = shard_key
+        self.max_workers = max_workers or len(self.shards)
+        self._executor = None
+        self._session = _ShardSession()
+        self._lock = threading.Lock()
+        # Queries are generated using the first shard's dialect.
+        self.initialize(next(iter(self.shards.values())))
+
+    def get_shard(self, value):
+        """
+        Return the name of the shard holding rows with the given shard key.
+        """
+        if isinstance(value, Model):
+            value = value.get_id()
+        name = self.key_func(value)
+        if name not in self.shards:
+            raise ValueError('Shard key %r maps to unknown shard "%s".' %
+                             (value, name))
+        return name
+
+    def instance_shard(self, instance):
+        """
+        Return the name of the shard holding the given model instance.
+        """
+        field = self._key_field(type(instance))
+        if field is None:
+            raise ValueError('%s does not have a shard key.' %
+                             type(instance).__name__)
+        return self.get_shard(instance.__data__.get(field.name))
+
+    @contextmanager
+    def using(self, name):
+        """
+        Context manager sending every query in the block to the named shard.
+        """
+        if name not in self.shards:
+            raise ValueError('Unrecognized shard "%s".' % name)
+        self._session.pinned.append(name)
+        try:
+            yield self.shards[name]
+        finally:
+            self._session.pinned.pop()
+
+    def current(self):
+        """
+        Return the shard selected by :meth:`using`.
+        """
+        if not self._session.pinned:
+            raise ValueError('No shard selected, use ShardedDatabase.using() '
+                             'to select one.')
+        return self.shards[self._session.pinned[-1]]
+
+    def execute(self, query, **context_options):
+        if self._session.pinned:
+            return self.current().execute(query, **context_options)
+
+        names = self._route(query)
+        if not names:
+            names = self.shards
+        if len(names) == 1:
+            shard = self.shards[next(iter(names))]
+            return shard.execute(query, **context_options)
+
+        if isinstance(query, Insert):
+            raise ValueError('Cannot determine the shard to insert into, '
+                             'rows must include a single shard key.')
+        names = sorted(names)
+        if isinstance(query, SelectBase):
+            return self._select(query, names, context_options)
+
+        results = self._scatter(query, names, context_options)
+        rowcount = sum(max(rowcount, 0) for _, _, rowcount in results)
+        return _ShardCursor((), rowcount=rowcount)
+
+    def execute_sql(self, sql, params=None):
+        return self.current().execute_sql(sql, params)
+
+    # Routing.
+
+    def _key_field(self, model):
+        name = getattr(model._meta, 'shard_key', None) or self.shard_key
+        if name is not None:
+            return model._meta.fields.get(name) or \
+                model._meta.combined.get(name)
+
+    def _route(self, query):
+        # Return the set of shard names the query must run on, or None if it
+        # must run on all of them.
+        model = getattr(query, 'model', None)
+        if model is None:
+            # Look inside wrapped sub-queries, e.g. the one used by count().
+            for source in getattr(query, '_from_list', None) or ():
+                if isinstance(source, SelectBase):
+                    return self._route(source)
+            return
+
+        field = self._key_field(model)
+        if field is None:
+            return
+        if isinstance(query, Insert):
+            return self._route_insert(query, field)
+        where = getattr(query, '_where', None)
+        if where is not None:
+            return self._route_where(where, field)
+
+    def _route_insert(self, query, field):
+        rows = query._insert
+        if isinstance(rows, dict):
+            rows = [rows]
+        elif not isinstance(rows, (list, tuple)):
+            return  # INSERT ... SELECT.
+
+        names = set()
+        for row in rows:
+            if isinstance(row, dict):
+                if field in row:
+                    value = row[field]
+                elif field.name in row:
+                    value = row[field.name]
+                else:
+                    return
+            elif query._columns and field in query._columns:
+                value = row[list(query._columns).index(field)]
+            else:
+                return
+            names.add(self.get_shard(value))
+        return names
+
+    def _route_where(self, node, field):
+        if not isinstance(node, Expression):
+            return
+        if node.op == OP.AND:
+            lhs = self._route_where(node.lhs, field)
+            rhs = self._route_where(node.rhs, field)
+            if lhs is None or rhs is None:
+                return rhs if lhs is None else lhs
+            return lhs & rhs
+        elif node.op == OP.OR:
+            lhs = self._route_where(node.lhs, field)
+            rhs = self._route_where(node.rhs, field)
+            if lhs is not None and rhs is not None:
+                return lhs | rhs
+        elif node.lhs is field or (isinstance(node.lhs, Field) and
+                                   node.lhs.model is field.model and
+                                   node.lhs.name == field.name):
+            rhs = node.rhs
+            if isinstance(rhs, Value):
+                rhs = rhs.value
+            if node.op == OP.EQ and not isinstance(rhs, (list, tuple, set)):
+                return set((self.get_shard(rhs),))
+            elif node.op == OP.IN and isinstance(rhs, (list, tuple, set)):
+                return set(self.get_shard(value) for value in rhs)
+
+    # Scatter-gather.
+
+    def _scatter(self, query, names, context_options):
+        def run(name):
+            # Runs in a worker thread, which does not keep its connection.
+            shard = self.shards[name]
+            try:
+                cursor = shard.execute(query, **context_options)
+                rows = cursor.fetchall() if cursor.description else []
+                return (cursor.description, rows, shard.rows_affected(cursor))
+            finally:
+                if not shard.is_closed():
+                    shard.close()
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers)
+            futures = [self._executor.submit(run, name) for name in names]
+        return [future.result() for future in futures]
+
+    def _select(self, query, names, context_options):
+        returning = getattr(query, '_returning', None)
+        if returning and getattr(returning[-1], '_alias', None) == '_pw_total':
+            return self._select_with_total(query, names, context_options)
+
+        ordering = [self._unwrap_ordering(node)
+                    for node in (getattr(query, '_order_by', None) or ())]
+        limit = getattr(query, '_limit', None)
+        offset = getattr(query, '_offset', None) or 0
+
+        if isinstance(query, CompoundSelectQuery):
+            aggregates = None
+            self._check_compound(query)
+        else:
+            aggregates = self._aggregates(query)
+            for source in getattr(query, '_from_list', None) or ():
+                if isinstance(source, SelectBase) and \
+                   not self._partitioned(source):
+                    if self._is_count(query, aggregates):
+                        return self._count(query, source, names,
+                                           context_options)
+                    raise ValueError('Queries over a DISTINCT, GROUP BY, '
+                                     'LIMIT or aggregate sub-query cannot be '
+                                     'merged across shards.')
+
+        shard_query = query
+        if aggregates is not None:
+            if getattr(query, '_having', None) is not None:
+                raise ValueError('HAVING cannot be applied to aggregates '
+                                 'combined across shards.')
+            if limit is not None or offset:
+                # Groups are only complete once combined.
+                shard_query = query.clone()
+                shard_query._limit = shard_query._offset = None
+        elif offset and limit is not None:
+            # Each shard returns enough rows to cover the merged page.
+            shard_query = query.clone()
+            shard_query._limit = limit + offset
+            shard_query._offset = None
+        elif offset:
+            shard_query = query.clone()
+            shard_query._offset = None
+
+        results = [r for r in self._scatter(shard_query, names,
+                                            context_options) if r[0]]
+        if not results:
+            return _ShardCursor(())
+        description = results[0][0]
+        columns = [column[0] for column in description]
+        sort = self._sort_func(ordering, columns)
+        unique = self._unique_func(query, aggregates, columns)
+
+        if aggregates is not None:
+            group = self._group_func(query, columns)
+            rows = self._combine(aggregates, group, [r[1] for r in results])
+            if sort is not None:
+                rows.sort(key=sort)
+        elif sort is not None:
+            # Each shard's rows are already ordered, so k-way merge them.
+            rows = heapq.merge(*[r[1] for r in results], key=sort)
+        else:
+            rows = itertools.chain.from_iterable(r[1] for r in results)
+
+        if unique is not None:
+            # The same distinct row or group may be found on several shards.
+            rows = self._dedupe(rows, unique)
+        if limit is not None or offset:
+            stop = None if limit is None else offset + limit
+            rows = itertools.islice(rows, offset, stop)
+        return _ShardCursor(rows, description)
+
+    def _select_with_total(self, query, names, context_options):
+        # Select.paginate_with_total() selects the total as a trailing
+        # column, which would only count each shard's rows. The page and the
+        # total are merged separately instead.
+        page = query.clone()
+        page._returning = page._returning[:-1]
+        count_query = page._count_query(clear_limit=True)
+        total = self._select(count_query, names, context_options).fetchone()
+        cursor = self._select(page, names, context_options)
+        if cursor.description is None:
+            return cursor
+        description = list(cursor.description)
+        description.append(('_pw_total',) + (None,) * 6)
+        return _ShardCursor((tuple(row) + (total[0],) for row in cursor),
+                            description)
+
+    def _partitioned(self, query, distinct=False):
+        # Whether a query's rows on each shard are disjoint, so the results
+        # can be concatenated.
+        if not isinstance(query, Select):
+            return False
+        if query._limit is not None or query._offset or query._group_by:
+            return False
+        if not distinct and (query._distinct is not None or
+                             query._simple_distinct):
+            return False
+        return self._aggregates(query) is None
+
+    def _check_compound(self, query):
+        op = query.op.upper()
+        if op not in ('UNION', 'UNION ALL'):
+            raise ValueError('%s cannot be applied across shards.' % op)
+        for member in (query.lhs, query.rhs):
+            if isinstance(member, CompoundSelectQuery):
+                if member.op.upper() != op:
+                    raise ValueError('Compound queries mixing %s and %s '
+                                     'cannot be merged across shards.' %
+                                     (op, member.op.upper()))
+                self._check_compound(member)
+            elif not self._partitioned(member, op == 'UNION'):
+                raise ValueError('%s of GROUP BY, LIMIT or aggregate queries '
+                                 'cannot be merged across shards.' % op)
+
+    def _is_count(self, query, aggregates):
+        # SELECT COUNT(...) FROM (sub-query), e.g. as generated by count().
+        if aggregates is None or len(aggregates) != 1:
+            return False
+        node = query._returning[0]
+        if isinstance(node, Alias):
+            node = node.node
+        return (node.name.upper() == 'COUNT' and
+                len(query._from_list) == 1 and
+                query._where is None and
+                query._having is None and
+                not query._group_by)
+
+    def _count(self, query, source, names, context_options):
+        # The sub-query's rows are merged, then counted.
+        cursor = self._select(source, names, context_options)
+        count = sum(1 for _ in cursor)
+        name = self._column_name(query._returning[0]) or 'count'
+        rows = [(count,)][query._offset or 0:][:query._limit]
+        return _ShardCursor(rows, [(name,) + (None,) * 6])
+
+    def _unique_func(self, query, aggregates, columns):
+        # Return a function giving the key rows are deduplicated by, if the
+        # merged rows must be made unique.
+        if isinstance(query, CompoundSelectQuery):
+            nodes = None if query.op.upper() == 'UNION' else ()
+        elif query._distinct:
+            nodes = query._distinct  # DISTINCT ON.
+        elif query._distinct is not None or query._simple_distinct:
+            nodes = None
+        elif query._group_by and aggregates is None:
+            nodes = query._group_by
+        else:
+            nodes = ()
+
+        if nodes is None:
+            return tuple
+        elif nodes:
+            return self._group_func(query, columns, nodes)
+
+    def _group_func(self, query, columns, nodes=None):
+        # Return a function giving the key of the group (or distinct row) a
+        # row belongs to. Every expression the shards group by must be
+        # selected, or rows of different groups cannot be told apart.
+        if nodes is None:
+            nodes = query._group_by or ()
+        indexes = []
+        for node in nodes:
+            name = self._column_name(node)
+            if name not in columns:
+                raise ValueError('DISTINCT ON and GROUP BY expressions must '
+                                 'be selected to merge results across '
+                                 'shards.')
+            indexes.append(columns.index(name))
+        return lambda row: tuple([row[i] for i in indexes])
+
+    def _dedupe(self, rows, key):
+        seen = set()
+        for row in rows:
+            value = key(row)
+            if value not in seen:
+                seen.add(value)
+                yield row
+
+    def _unwrap_ordering(self, node):
+        if isinstance(node, Ordering):
+            return node.node, node.direction.upper() == 'DESC', node.nulls
+        return node, False, None
+
+    def _column_name(self, node):
+        if isinstance(node, Alias):
+            return node._alias
+        elif isinstance(node, Field):
+            return node.column_name
+        elif isinstance(node, SQL):
+            return node.sql
+        return getattr(node, 'name', None)
+
+    def _nulls_first(self, desc, nulls):
+        if nulls:
+            return nulls.lower() == 'first'
+        # Postgres sorts NULLs after all other values, SQLite, MySQL and
+        # CockroachDB before them.
+        nulls_large = (isinstance(self.obj, PostgresqlDatabase) and
+                       not isinstance(self.obj, CockroachDatabase))
+        return nulls_large == desc
+
+    def _sort_func(self, ordering, columns):
+        if not ordering:
+            return
+        indexes, desc, nulls_first = [], [], []
+        for node, is_desc, nulls in ordering:
+            name = self._column_name(node)
+            if name not in columns:
+                raise ValueError('ORDER BY expressions must be selected to '
+                                 'merge results across shards.')
+            indexes.append(columns.index(name))
+            desc.append(is_desc)
+            nulls_first.append(self._nulls_first(is_desc, nulls))
+        return lambda row: _SortKey([row[i] for i in indexes], desc,
+                                    nulls_first)
+
+    def _aggregates(self, query):
+        # Return a list containing the combine function for each selected
+        # aggregate (and None for each GROUP BY column), or None if the query
+        # does not select aggregates.
+        returning = getattr(query, '_returning', None) or ()
+        combine, found = [], False
+        for node in returning:
+            if isinstance(node, Alias):
+                node = node.node
+            name = node.name.upper() if _is_aggregate(node) else None
+            if name in _COMBINE:
+                if name in ('COUNT', 'SUM') and _is_distinct(node):
+                    raise ValueError('%s(DISTINCT) cannot be combined across '
+                                     'shards.' % name)
+                combine.append(_COMBINE[name])
+                found = True
+                continue
+
+            aggregate = _find_aggregate(node)
+            if aggregate is node:
+                raise ValueError('%s cannot be combined across shards.' %
+                                 name)
+            elif aggregate is not None:
+                raise ValueError('%s cannot be combined across shards when '
+                                 'used within an expression.' %
+                                 aggregate.name.upper())
+            combine.append(None)
+        if found:
+            return combine
+
+    def _combine(self, combine, group, results):
+        groups = {}
+        for row in itertools.chain.from_iterable(results):
+            groups.setdefault(group(row), []).append(row)
+
+        rows = []
+        for partials in groups.values():
+            row = []
+            for values, func in zip(zip(*partials), combine):
+                if func is None:
+                    row.append(values[0])
+                else:
+                    values = [value for value in values if value is not None]
+                    row.append(func(values) if values else None)
+            rows.append(tuple(row))
+        return rows
+
+    # Connections and transactions.
+
+    def connect(self, reuse_if_open=False):
+        # Shards are connected on demand, when first queried.
+        return True
+
+    def close(self):
+        closed = False
+        for shard in self.shards.values():
+            if not shard.is_closed():
+                closed = shard.close() or closed
+
+        # Worker threads are started again by the next scatter-gather query.
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+        return closed
+
+    def is_closed(self):
+        return all(shard.is_closed() for shard in self.shards.values())
+
+    def in_transaction(self):
+        if self._session.pinned:
+            return self.current().in_transaction()
+        return False
+
+    def atomic(self, *args, **kwargs):
+        return self.current().atomic(*args, **kwargs)
+
+    def manual_commit(self):
+        return self.current().manual_commit()
+
+    def transaction(self, *args, **kwargs):
+        return self.current().transaction(*args, **kwargs)
+
+    def savepoint(self):
+        return self.current().savepoint()
+
+    # Bind models to this database rather than the first shard.
+    bind = Database.bind
+    bind_ctx = Database.bind_ctx
+
+
+class ShardedModel(Model):
+    """
+    Model whose :meth:`save` and :meth:`delete_instance` run on the shard
+    holding the instance, as determined by its shard key.
+    """
+    def _shard(self):
+        database = self._meta.database
+        if isinstance(database, ShardedDatabase):
+            return database.using(database.instance_shard(self))
+
+    def save(self, *args, **kwargs):
+        shard = self._shard()
+        if shard is None:
+            return super(ShardedModel, self).save(*args, **kwargs)
+        with shard:
+            return super(ShardedModel, self).save(*args, **kwargs)
+
+    def delete_instance(self, *args, **kwargs):
+        shard = self._shard()
+        if shard is None:
+            return super(ShardedModel, self).delete_instance(*args, **kwargs)
+        with shard:
+            return super(ShardedModel, self).delete_instance(*args, **kwargs)
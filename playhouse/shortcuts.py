@@ -4,6 +4,7 @@ from peewee import *
 from peewee import Alias
 from peewee import CompoundSelectQuery
 from peewee import Metadata
+from peewee import _resolve_lazy
 from peewee import callable_
 
 
@@ -75,7 +76,7 @@ def model_to_dict(model, recurse=True, backrefs=False, only=None,
         if should_skip(field):
             continue
 
-        field_data = model.__data__.get(field.name)
+        field_data = _resolve_lazy(model.__data__, field.name)
         if isinstance(field, ForeignKeyField) and recurse and field.lazy_load:
             # rel_obj may be None despite a fk value: a cached outer-join miss.
             rel_obj = getattr(model, field.name) \
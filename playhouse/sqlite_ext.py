@@ -1,4 +1,3 @@
-import json
 import re
 
 from peewee import *
@@ -6,9 +5,11 @@ from peewee import ColumnBase
 from peewee import EnclosedNodeList
 from peewee import Entity
 from peewee import Expression
+from peewee import FieldDatabaseHook
 from peewee import Node
 from peewee import NodeList
 from peewee import OP
+from peewee import get_json_codec
 from peewee import merge_dict
 from peewee import sqlite3
 from playhouse import fts_parser as _fts_parser
@@ -156,15 +157,24 @@ class JSONBPath(JSONPath):
                        if self._path else self._field)
 
 
-class JSONField(TextField):
+class JSONField(FieldDatabaseHook, TextField):
     field_type = 'TEXT'
     Path = JSONPath
 
-    def __init__(self, json_dumps=None, json_loads=None, **kwargs):
-        self._json_dumps = json_dumps or json.dumps
-        self._json_loads = json_loads or json.loads
+    def __init__(self, json_dumps=None, json_loads=None, codec=None,
+                 **kwargs):
+        self._custom_dumps = json_dumps
+        self._custom_loads = json_loads
+        self._codec = get_json_codec(codec) if codec is not None else None
+        self._db_hook(None)
         super(JSONField, self).__init__(**kwargs)
 
+    def _db_hook(self, database):
+        codec = self._codec or get_json_codec(
+            getattr(database, 'json_codec', None))
+        self._json_dumps = self._custom_dumps or codec.dumps
+        self._json_loads = self._custom_loads or codec.loads
+
     def python_value(self, value):
         if value is not None:
             try:
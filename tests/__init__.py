@@ -60,6 +60,8 @@ except OperationalError:
           'the postgres_ext tests.')
 from .pwiz_integration import *
 from .reflection import *
+from .replication import *
+from .sharding import *
 from .shortcuts import *
 from .signals import *
 try:
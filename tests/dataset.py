@@ -1,14 +1,17 @@
 import csv
 import datetime
+import gzip
 import json
 import operator
 import os
 import tempfile
+from io import BytesIO
 from io import StringIO
 
 from peewee import *
 from playhouse.dataset import DataSet
 from playhouse.dataset import Table
+from playhouse.dataset import export
 
 from .base import IS_SQLITE_OLD
 from .base import ModelTestCase
@@ -39,6 +42,10 @@ class Bin(TestModel):
     data = BlobField()
     ts = DateTimeField()
 
+class Event(TestModel):
+    name = TextField()
+    ts = TimestampField()
+
 
 class TestDataSet(ModelTestCase):
     database = db
@@ -590,6 +597,129 @@ class TestDataSet(ModelTestCase):
             'data': b'\xff\x00\xcc',
             'ts': ts}])
 
+    @requires_models(Bin)
+    def test_freeze_thaw_jsonl(self):
+        Bin = self.dataset['bin']
+        ts = datetime.datetime(2026, 1, 2, 3, 4, 5)
+        Bin.insert(data=b'\xff\x00\xcc', ts=ts)
+        Bin.insert(data=b'\x01', ts=ts)
+
+        buf = StringIO()
+        self.dataset.freeze(Bin.all(), 'jsonl', file_obj=buf)
+        lines = buf.getvalue().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [
+            {'id': 1, 'data': 'ff00cc', 'ts': '2026-01-02 03:04:05'},
+            {'id': 2, 'data': '01', 'ts': '2026-01-02 03:04:05'}])
+
+        Bin.delete()
+        buf.seek(0)
+        self.assertEqual(Bin.thaw(format='jsonl', file_obj=buf), 2)
+        self.assertEqual(list(Bin.all()), [
+            {'id': 1, 'data': b'\xff\x00\xcc', 'ts': ts},
+            {'id': 2, 'data': b'\x01', 'ts': ts}])
+
+    def test_freeze_gzip(self):
+        self.create_users()
+        user = self.dataset['user']
+
+        buf = BytesIO()
+        self.dataset.freeze(user.all(), 'csv', file_obj=buf, compress='gzip')
+        self.assertEqual(gzip.decompress(buf.getvalue()).decode('utf8')
+                         .splitlines(), ['username', 'charlie', 'huey'])
+
+        with tempfile.NamedTemporaryFile(suffix='.jsonl.gz') as tmp:
+            self.dataset.freeze(user.all(), 'jsonl', filename=tmp.name,
+                                compress='gzip')
+            with gzip.open(tmp.name, 'rt') as fh:
+                self.assertEqual([json.loads(line) for line in fh], [
+                    {'username': 'charlie'},
+                    {'username': 'huey'}])
+
+        with self.assertRaises(ValueError):
+            self.dataset.freeze(user.all(), 'csv', file_obj=BytesIO(),
+                                compress='bz2')
+
+    @requires_models(User, Note)
+    def test_export_streaming(self):
+        for i in range(5):
+            User.create(username='u%s' % i)
+
+        # Rows are read from the cursor in batches, formatters are applied to
+        # the non-scalar columns.
+        query = (User
+                 .select(User.username,
+                         fn.LENGTH(User.username).coerce(False).alias('n'),
+                         Value(datetime.date(2026, 1, 2)).alias('dt'))
+                 .order_by(User.username))
+        buf = StringIO()
+        with self.assertQueryCount(1):
+            export(query, buf, batch_size=2)
+        self.assertEqual(buf.getvalue().splitlines(), [
+            'username,n,dt',
+            'u0,2,2026-01-02',
+            'u1,2,2026-01-02',
+            'u2,2,2026-01-02',
+            'u3,2,2026-01-02',
+            'u4,2,2026-01-02'])
+
+        buf = StringIO()
+        export(query.limit(2), buf, 'tsv', batch_size=1)
+        self.assertEqual(buf.getvalue().splitlines(), [
+            'username\tn\tdt',
+            'u0\t2\t2026-01-02',
+            'u1\t2\t2026-01-02'])
+
+        buf = StringIO()
+        export(query.limit(2), buf, 'jsonl', sort_keys=True)
+        self.assertEqual(buf.getvalue().splitlines(), [
+            '{"dt": "2026-01-02", "n": 2, "username": "u0"}',
+            '{"dt": "2026-01-02", "n": 2, "username": "u1"}'])
+
+        # Empty result-sets still write a header.
+        buf = StringIO()
+        export(query.where(User.username == 'x'), buf)
+        self.assertEqual(buf.getvalue(), 'username,n,dt\r\n')
+
+        self.assertRaises(ValueError, export, query, buf, 'xml')
+
+    @requires_models(User)
+    def test_export_json_streaming(self):
+        for i in range(5):
+            User.create(username='u%s' % i)
+
+        query = User.select().order_by(User.username)
+        for kwargs in ({}, {'indent': 2}, {'separators': (',', ':')}):
+            buf = StringIO()
+            with self.assertQueryCount(1):
+                export(query, buf, 'json', batch_size=2, **kwargs)
+            self.assertEqual(buf.getvalue(), json.dumps(
+                [{'username': 'u%s' % i} for i in range(5)], **kwargs))
+
+        buf = StringIO()
+        export(query.limit(2).tuples(), buf, 'json', batch_size=1)
+        self.assertEqual(json.loads(buf.getvalue()), [['u0'], ['u1']])
+
+        buf = StringIO()
+        export(query.where(User.username == 'x'), buf, 'json', indent=2)
+        self.assertEqual(buf.getvalue(), '[]')
+
+    @requires_models(Event)
+    def test_export_converted_fields(self):
+        # TimestampField stores integers but reads datetimes.
+        ts = datetime.datetime(2020, 1, 2, 3, 4, 5)
+        Event.create(name='e1', ts=ts)
+        query = Event.select(Event.name, Event.ts)
+
+        buf = StringIO()
+        export(query, buf, iso8601_datetimes=True)
+        self.assertEqual(buf.getvalue().splitlines(),
+                         ['name,ts', 'e1,2020-01-02T03:04:05'])
+
+        buf = StringIO()
+        export(query, buf, 'jsonl')
+        self.assertEqual(json.loads(buf.getvalue()),
+                         {'name': 'e1', 'ts': '2020-01-02 03:04:05'})
+
     def test_table_column_creation(self):
         table = self.dataset['people']
         table.insert(name='charlie')
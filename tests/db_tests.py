@@ -14,6 +14,9 @@ Test case ordering:
 """
 from itertools import permutations
 from queue import Queue
+from unittest import mock
+import json
+import os
 import platform
 import re
 import threading
@@ -393,6 +396,165 @@ class TestSessionTransactions(DatabaseTestCase):
         db.close()
 
 
+class TestExplain(ModelTestCase):
+    requires = [User, Tweet]
+
+    def test_explain(self):
+        query = User.select().where(User.username == 'huey')
+        plan = query.explain()
+        self.assertTrue(len(plan.nodes) > 0)
+        self.assertEqual(list(plan)[0], plan.nodes[0])
+        self.assertTrue(str(plan))
+
+        # Explaining a SQL string.
+        sql, params = query.sql()
+        plan = self.database.explain(sql, params)
+        self.assertTrue(len(plan.nodes) > 0)
+
+    @requires_sqlite
+    def test_explain_sqlite(self):
+        plan = User.select().where(User.username == 'huey').explain()
+        self.assertEqual(plan.full_scans, ['t1'])
+        self.assertFalse(plan.filesort or plan.temporary)
+        self.assertEqual(plan.warnings, ['full scan of t1'])
+
+        query = (Tweet
+                 .select(Tweet.content)
+                 .where(Tweet.user == 1)
+                 .order_by(Tweet.content))
+        plan = query.explain()
+        self.assertEqual(plan.full_scans, [])
+        self.assertEqual([node.index for node in plan if node.table],
+                         ['tweet_user_id'])
+        self.assertTrue(plan.filesort and plan.temporary)
+
+        # Subqueries are nested beneath their parent node.
+        subq = Tweet.select(Tweet.user).where(Tweet.content == 'meow')
+        plan = User.select().where(User.id.in_(subq)).explain()
+        parent, = [node for node in plan if node.children]
+        self.assertEqual([node.full_scan for node in parent.children],
+                         [True])
+
+    def test_explain_postgresql_format(self):
+        db = PostgresqlDatabase(None)
+        raw = [{'Plan': {
+            'Node Type': 'Sort', 'Plan Rows': 10,
+            'Plans': [{
+                'Node Type': 'Seq Scan', 'Relation Name': 'users',
+                'Plan Rows': 10}, {
+                'Node Type': 'Index Scan', 'Relation Name': 'tweet',
+                'Index Name': 'tweet_user_id', 'Plan Rows': 2,
+                'Actual Rows': 3}]}}]
+        cursor = mock.Mock(fetchone=mock.Mock(return_value=(raw,)))
+        with mock.patch.object(db, 'execute_sql',
+                               return_value=cursor) as execute:
+            plan = db.explain('SELECT 1', analyze=True)
+        execute.assert_called_once_with(
+            'EXPLAIN (ANALYZE, FORMAT JSON) SELECT 1', ())
+
+        self.assertEqual([node.detail for node in plan], [
+            'Sort',
+            'Seq Scan on users',
+            'Index Scan on tweet using tweet_user_id'])
+        self.assertEqual([node.rows for node in plan], [10, 10, 3])
+        self.assertEqual(plan.full_scans, ['users'])
+        self.assertTrue(plan.filesort)
+        self.assertFalse(plan.temporary)
+
+    def test_explain_mysql_format(self):
+        db = MySQLDatabase(None)
+        raw = {'query_block': {
+            'select_id': 1,
+            'cost_info': {'query_cost': '1.20'},
+            'ordering_operation': {
+                'using_temporary_table': True,
+                'using_filesort': True,
+                'nested_loop': [
+                    {'table': {'table_name': 'users', 'access_type': 'ALL',
+                               'rows_examined_per_scan': 10,
+                               'used_columns': ['id', 'username']}},
+                    {'table': {'table_name': 'tweet', 'access_type': 'ref',
+                               'key': 'tweet_user_id',
+                               'rows_examined_per_scan': 1}}]}}}
+        cursor = mock.Mock(fetchone=mock.Mock(
+            return_value=(json.dumps(raw),)))
+        with mock.patch.object(db, 'execute_sql',
+                               return_value=cursor) as execute:
+            plan = db.explain('SELECT 1')
+        execute.assert_called_once_with('EXPLAIN FORMAT=JSON SELECT 1', ())
+
+        self.assertEqual([node.detail for node in plan], [
+            'query_block',
+            'ordering_operation',
+            'ALL on users',
+            'ref on tweet'])
+        self.assertEqual(plan.full_scans, ['users'])
+        self.assertEqual([node.index for node in plan],
+                         [None, None, None, 'tweet_user_id'])
+        self.assertTrue(plan.filesort and plan.temporary)
+        self.assertEqual(plan.raw, raw)
+
+
+class TestSlowQueryLog(ModelTestCase):
+    requires = [User]
+
+    def tearDown(self):
+        self.database.slow_query_log(None)
+        super(TestSlowQueryLog, self).tearDown()
+
+    def test_slow_query_log(self):
+        calls = []
+        def callback(sql, params, ms, plan):
+            calls.append((sql, params, plan))
+
+        self.database.slow_query_log(0, callback=callback)
+        User.create(username='huey')
+        list(User.select().where(User.username == 'huey'))
+        list(User.select().where(User.username == 'mickey'))
+
+        # The same statement is only reported once per interval.
+        self.assertEqual(len(calls), 2)
+        (insert_sql, _, insert_plan), (sql, params, plan) = calls
+        self.assertTrue(insert_sql.startswith('INSERT'))
+        self.assertEqual(params, ['huey'])
+        self.assertTrue(len(plan.nodes) > 0)
+
+        # Literal values are ignored when grouping statements.
+        self.database.execute_sql('SELECT 1 FROM users WHERE id = 1')
+        self.database.execute_sql('SELECT 1 FROM users WHERE id = 2')
+        self.database.execute_sql("SELECT 'a', 'b''s'")
+        self.database.execute_sql("SELECT 'c', 'd'")
+        self.assertEqual(len(calls), 4)
+
+        # Statements below the threshold are ignored.
+        self.database.slow_query_log(60000, callback=callback)
+        list(User.select().where(User.id > 0))
+        self.assertEqual(len(calls), 4)
+
+        self.database.slow_query_log(None)
+        list(User.select().where(User.id > 0))
+        self.assertEqual(len(calls), 4)
+
+    def test_slow_query_logger(self):
+        self.database.slow_query_log(0, interval=0, explain=False)
+        with self.assertLogs('peewee.slow_query', level='WARNING') as cm:
+            User.select().count()
+            User.select().count()
+        self.assertEqual(len(cm.output), 2)
+        self.assertTrue('Slow query' in cm.output[0])
+
+        self.database.slow_query_log(0, logger='peewee.test', level=20)
+        with self.assertLogs('peewee.test', level='INFO') as cm:
+            User.select().count()
+        self.assertTrue('\n' in cm.output[0])  # Plan is logged.
+
+        # Plans are captured inside a transaction.
+        with self.database.atomic():
+            with self.assertLogs('peewee.test', level='INFO') as cm:
+                User.select().where(User.id == 0).count()
+        self.assertTrue('\n' in cm.output[0])
+
+
 # ===========================================================================
 # Introspection.
 # ===========================================================================
@@ -845,6 +1007,56 @@ class TestThreadSafeMetaRegression(ModelTestCase):
 # Deferred database, proxy, and schema namespace
 # ===========================================================================
 
+class TestForkSafety(BaseTestCase):
+    def test_reset_after_fork(self):
+        from peewee import _fork_orphans
+        db = get_in_memory_db()
+        conn = db.connection()
+        lock = db._lock
+        db._reset_after_fork()
+        self.assertTrue(db.is_closed())
+        self.assertTrue(db._lock is not lock)
+        self.assertTrue(_fork_orphans[-1] is conn)
+        _fork_orphans.remove(conn)
+
+        # The inherited connection was not closed.
+        self.assertEqual(conn.execute('select 1').fetchone(), (1,))
+        self.assertTrue(db.connection() is not conn)
+        db.close()
+        conn.close()
+
+    @skip_if(not hasattr(os, 'fork'), 'requires os.fork()')
+    def test_fork(self):
+        db = get_in_memory_db()
+        conn = db.connection()
+        db.execute_sql('create table k (key text)')
+        db.execute_sql("insert into k (key) values ('parent')")
+
+        r, w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                # Child has a fresh (empty) in-memory database.
+                closed = db.is_closed()
+                fresh = db.connection() is not conn
+                tables = db.get_tables()
+                os.write(w, json.dumps([closed, fresh, tables]).encode())
+            finally:
+                os._exit(0)
+
+        os.close(w)
+        with os.fdopen(r) as fh:
+            result = json.loads(fh.read())
+        os.waitpid(pid, 0)
+        self.assertEqual(result, [True, True, []])
+
+        # Parent connection is unaffected.
+        self.assertTrue(db.connection() is conn)
+        curs = db.execute_sql('select key from k')
+        self.assertEqual(curs.fetchall(), [('parent',)])
+        db.close()
+
+
 class TestDeferredDatabase(BaseTestCase):
     def test_deferred_database(self):
         deferred_db = SqliteDatabase(None)
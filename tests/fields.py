@@ -20,6 +20,7 @@ Test case ordering:
 import calendar
 import datetime
 import json
+import pickle
 import sqlite3
 import time
 import uuid
@@ -462,6 +463,48 @@ class TestDateFields(ModelTestCase):
 
         self.assertEqual(format_date_time('not a date', []), 'not a date')
 
+    def test_date_time_last_format(self):
+        field = DateTimeField(formats=['%d/%m/%Y', '%m/%d/%Y %I:%M %p'])
+        self.assertTrue(field._last_format is None)
+        self.assertEqual(field.adapt('01/02/2003 01:37 PM'),
+                         datetime.datetime(2003, 1, 2, 13, 37))
+        self.assertEqual(field._last_format, '%m/%d/%Y %I:%M %p')
+
+        # Remembered format does not match, remaining formats are tried.
+        self.assertEqual(field.adapt('31/01/2003'),
+                         datetime.datetime(2003, 1, 31))
+        self.assertEqual(field._last_format, '%d/%m/%Y')
+
+        # ISO values are always parsed ahead of the remembered format.
+        self.assertEqual(field.adapt('2003-01-02 03:04:05'),
+                         datetime.datetime(2003, 1, 2, 3, 4, 5))
+        self.assertEqual(field._last_format, '%d/%m/%Y')
+        self.assertEqual(field.adapt('not a date'), 'not a date')
+
+        # A remembered format that also matches ISO strings does not change
+        # how they are parsed.
+        field = DateField(formats=['%Y-%d-%m'])
+        self.assertEqual(field.adapt('2003-31-01'), datetime.date(2003, 1, 31))
+        self.assertEqual(field._last_format, '%Y-%d-%m')
+        self.assertEqual(field.adapt('2003-01-02'), datetime.date(2003, 1, 2))
+
+        # Memory is per-field.
+        self.assertTrue(DateTimeField._last_format is None)
+
+    def test_time_iso_fast_path(self):
+        field = TimeField()
+        self.assertEqual(field.adapt('11:12:13'), datetime.time(11, 12, 13))
+        self.assertEqual(field.adapt('11:12:13.5'),
+                         datetime.time(11, 12, 13, 500000))
+        self.assertEqual(field.adapt('11:12'), datetime.time(11, 12))
+        self.assertEqual(field.adapt('2019-01-02 11:12:13'),
+                         datetime.time(11, 12, 13))
+        self.assertTrue(field._last_format is None)
+
+        # Non-ISO values fall back to the format list.
+        self.assertEqual(field.adapt('1:02:03'), datetime.time(1, 2, 3))
+        self.assertEqual(field._last_format, '%H:%M:%S')
+
     def test_to_timestamp(self):
         dt = datetime.datetime(2019, 1, 2, 3, 4, 5)
         ts = calendar.timegm(dt.utctimetuple())
@@ -847,6 +890,27 @@ class TestBlobField(ModelTestCase):
             data = bytes(data)
         self.assertEqual(data, b'\xff\x01\x02')
 
+    def test_blob_field_as_memoryview(self):
+        class MVBlob(TestModel):
+            data = BlobField(as_memoryview=True, null=True)
+
+        with self.database.bind_ctx([MVBlob]):
+            self.database.create_tables([MVBlob])
+            try:
+                MVBlob.create(data=b'\xff\x01\x02')
+                MVBlob.create(data=None)
+                b1, b2 = MVBlob.select().order_by(MVBlob.id)
+                self.assertTrue(isinstance(b1.data, memoryview))
+                self.assertEqual(b1.data[1:].tobytes(), b'\x01\x02')
+                self.assertTrue(b2.data is None)
+            finally:
+                self.database.drop_tables([MVBlob])
+
+        # Positional arguments keep their meaning.
+        field = BlobField(True)
+        self.assertTrue(field.null)
+        self.assertFalse(field.as_memoryview)
+
     def test_blob_on_proxy(self):
         db = Proxy()
         class NewBlobModel(Model):
@@ -1526,6 +1590,96 @@ class TestCustomField(ModelTestCase):
         self.assertEqual(t2_db.id, t2.id)
 
 
+class CountingListField(ListField):
+    decoded = 0
+
+    def python_value(self, value):
+        CountingListField.decoded += 1
+        return super(CountingListField, self).python_value(value)
+
+
+class LazyTodo(TestModel):
+    content = TextField()
+    tags = CountingListField(lazy=True)
+    labels = CountingListField()
+
+
+class LazyTodoNote(TestModel):
+    todo = ForeignKeyField(LazyTodo, backref='notes')
+    note = TextField()
+
+
+class TestLazyField(ModelTestCase):
+    requires = [LazyTodo, LazyTodoNote]
+
+    def setUp(self):
+        super(TestLazyField, self).setUp()
+        LazyTodo.create(content='t1', tags=['a', 'b'], labels=['x'])
+        LazyTodo.create(content='t2', tags=['c'], labels=[])
+        CountingListField.decoded = 0
+
+    def test_lazy_field(self):
+        t1, t2 = LazyTodo.select().order_by(LazyTodo.id)
+        self.assertEqual(CountingListField.decoded, 2)  # Only "labels".
+
+        # Raw value is held until the attribute is accessed.
+        self.assertEqual(t1.__data__['tags'].raw, 'a,b')
+        self.assertEqual(t1.tags, ['a', 'b'])
+        self.assertEqual(t1.tags, ['a', 'b'])
+        self.assertEqual(t1.__data__['tags'], ['a', 'b'])
+        self.assertEqual(CountingListField.decoded, 3)
+        self.assertFalse(t1.is_dirty())
+
+        # Undecoded values are pickled as their decoded value.
+        t2_copy = pickle.loads(pickle.dumps(t2))
+        self.assertEqual(t2_copy.__data__['tags'], ['c'])
+
+        # Dicts and tuples are decoded eagerly.
+        row = LazyTodo.select(LazyTodo.tags).order_by(LazyTodo.id).tuples()
+        self.assertEqual(list(row), [(['a', 'b'],), (['c'],)])
+
+        # Saving an instance with an undecoded value round-trips.
+        t2.content = 't2-x'
+        t2.save()
+        t2_db = LazyTodo.get(LazyTodo.content == 't2-x')
+        self.assertEqual(t2_db.tags, ['c'])
+
+    def test_lazy_decode_query(self):
+        query = (LazyTodo
+                 .select()
+                 .order_by(LazyTodo.id)
+                 .lazy_decode(LazyTodo.labels))
+        t1, t2 = list(query)
+        self.assertEqual(CountingListField.decoded, 0)
+        self.assertEqual(t1.labels, ['x'])
+        self.assertEqual(CountingListField.decoded, 1)
+        self.assertEqual(t2.labels, [])
+        self.assertEqual(CountingListField.decoded, 2)
+
+        self.assertRaises(ValueError, LazyTodo.select().lazy_decode,
+                          LazyTodo.id)
+        self.assertRaises(ValueError, LazyTodoNote.select().lazy_decode,
+                          LazyTodoNote.todo)
+
+    def test_lazy_join(self):
+        t1 = LazyTodo.get(LazyTodo.content == 't1')
+        LazyTodoNote.create(todo=t1, note='n1')
+        CountingListField.decoded = 0
+
+        note = (LazyTodoNote
+                .select(LazyTodoNote, LazyTodo)
+                .join(LazyTodo)
+                .get())
+        self.assertEqual(CountingListField.decoded, 1)
+        self.assertEqual(note.todo.tags, ['a', 'b'])
+        self.assertEqual(CountingListField.decoded, 2)
+
+    def test_lazy_invalid(self):
+        self.assertRaises(ValueError, IntegerField, primary_key=True,
+                          lazy=True)
+        self.assertRaises(ValueError, ForeignKeyField, LazyTodo, lazy=True)
+
+
 class UpperField(TextField):
     def db_value(self, value):
         return fn.UPPER(value)
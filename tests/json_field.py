@@ -1,6 +1,8 @@
 import json
 
 from peewee import *
+from peewee import _json_codecs
+from peewee import get_json_codec
 from peewee import sqlite3
 
 from .base import IS_CRDB
@@ -13,6 +15,7 @@ from .base import BaseTestCase
 from .base import ModelTestCase
 from .base import TestModel
 from .base import db
+from .base import get_in_memory_db
 from .base import skip_if
 from .base import skip_unless
 
@@ -438,6 +441,81 @@ class TestCustomLoads(ModelTestCase):
             ML.drop_table()
 
 
+class TestJSONCodec(ModelTestCase):
+    requires = []
+
+    def setUp(self):
+        super(TestJSONCodec, self).setUp()
+        self.calls = []
+        def dumps(obj):
+            self.calls.append('dumps')
+            return json.dumps(obj).encode('utf8')
+        def loads(s):
+            self.calls.append('loads')
+            return json.loads(s)
+        self.codec = register_json_codec('test', dumps, loads, binary=True)
+
+    def tearDown(self):
+        _json_codecs.pop('test')
+        super(TestJSONCodec, self).tearDown()
+
+    def test_codec(self):
+        self.assertTrue(get_json_codec('test') is self.codec)
+        self.assertTrue(get_json_codec(self.codec) is self.codec)
+        self.assertEqual(get_json_codec().name, 'json')
+        self.assertEqual(self.codec.dumps([1]), '[1]')
+        self.assertEqual(self.codec.encode([1]), b'[1]')
+        self.assertEqual(get_json_codec('json').encode([1]), b'[1]')
+        self.assertRaises(ValueError, get_json_codec, 'unknown')
+        self.assertRaises(ValueError, JSONField, codec='unknown')
+
+    def test_field_codec(self):
+        class MC(TestModel):
+            data = JSONField(null=True, codec='test')
+
+        MC._meta.database = db
+        MC.create_table()
+        try:
+            MC.create(data={'k': [1, 2]})
+            self.assertEqual(MC.get().data, {'k': [1, 2]})
+            if IS_PG_JSON:
+                self.assertEqual(self.calls, ['dumps'])
+            else:
+                self.assertEqual(self.calls, ['dumps', 'loads'])
+        finally:
+            MC.drop_table()
+
+    def test_database_codec(self):
+        mdb = get_in_memory_db(json_codec='test')
+        self.assertTrue(mdb.json_codec is self.codec)
+
+        class MD(TestModel):
+            data = JSONField(null=True)
+            custom = JSONField(null=True, dumps=json.dumps)
+
+        with mdb.bind_ctx([MD]):
+            mdb.create_tables([MD])
+            MD.create(data=[1], custom=[2])
+            obj = MD.get()
+            self.assertEqual((obj.data, obj.custom), ([1], [2]))
+            self.assertEqual(self.calls, ['dumps', 'loads', 'loads'])
+
+        # Unbound, the field reverts to the module default.
+        self.assertTrue(MD.data._dumps is json.dumps)
+
+    def test_set_default(self):
+        set_json_codec('test')
+        try:
+            class MS(TestModel):
+                data = JSONField(null=True)
+            self.assertTrue(MS.data._loads is self.codec.loads)
+        finally:
+            set_json_codec('json')
+
+        self.assertRaises(ValueError, set_json_codec, 'unknown')
+        self.assertEqual(get_json_codec().name, 'json')
+
+
 class TestDeferredDatabase(ModelTestCase):
     requires = []
 
@@ -8075,3 +8075,454 @@ class TestAnalyticalQueries(ModelTestCase):
             (datetime.date(2026, 3, 1), 152, 352, -48),
             (datetime.date(2026, 4, 1), 1021, 1373, 869),
         ])
+
+
+class SeekItem(TestModel):
+    created = DateTimeField()
+    title = TextField(null=True)
+
+
+class TestSeekPagination(ModelTestCase):
+    requires = [SeekItem]
+
+    def setUp(self):
+        super(TestSeekPagination, self).setUp()
+        base = datetime.datetime(2026, 1, 1)
+        titles = ['c', None, 'a', 'b', None, 'a', 'c', 'b', None, 'a']
+        for i, title in enumerate(titles):
+            SeekItem.create(created=base + datetime.timedelta(hours=i % 4),
+                            title=title)
+
+    def walk(self, order_by, limit=3):
+        # Walk forwards through all pages, then backwards from the last one.
+        forward, token = [], None
+        while True:
+            page = SeekItem.select().seek(after=token, order_by=order_by,
+                                          limit=limit)
+            forward.extend(item.id for item in page)
+            if not page.has_next:
+                break
+            token = page.next_cursor
+
+        backward, token = [item.id for item in page], page.prev_cursor
+        while token:
+            page = SeekItem.select().seek(before=token, order_by=order_by,
+                                          limit=limit)
+            backward = [item.id for item in page] + backward
+            token = page.prev_cursor
+        self.assertFalse(page.has_prev)
+        self.assertEqual(forward, backward)
+        return forward
+
+    def test_seek(self):
+        self.assertEqual(self.walk((SeekItem.created, SeekItem.id)),
+                         [1, 5, 9, 2, 6, 10, 3, 7, 4, 8])
+        # The primary key is added to make the ordering unique.
+        self.assertEqual(self.walk((SeekItem.created.desc(),)),
+                         [8, 4, 7, 3, 10, 6, 2, 9, 5, 1])
+        self.assertEqual(self.walk((SeekItem.created, SeekItem.id.desc())),
+                         [9, 5, 1, 10, 6, 2, 7, 3, 8, 4])
+
+        # Without an ordering the primary key is used.
+        self.assertEqual(self.walk(None, limit=4), list(range(1, 11)))
+
+    def test_seek_nulls(self):
+        # NULLs sort first ascending and last descending by default.
+        self.assertEqual(self.walk((SeekItem.title,)),
+                         [2, 5, 9, 3, 6, 10, 4, 8, 1, 7])
+        self.assertEqual(self.walk((SeekItem.title.desc(),
+                                    SeekItem.created.desc())),
+                         [7, 1, 8, 4, 3, 10, 6, 2, 9, 5])
+        self.assertEqual(self.walk((SeekItem.title.asc(nulls='last'),),
+                                   limit=4),
+                         [3, 6, 10, 4, 8, 1, 7, 2, 5, 9])
+        self.assertEqual(self.walk((SeekItem.title.desc(nulls='first'),
+                                    SeekItem.created)),
+                         [5, 9, 2, 1, 7, 4, 8, 6, 10, 3])
+
+    def test_seek_page(self):
+        query = SeekItem.select().where(SeekItem.title == 'a')
+        page = query.seek(order_by=(SeekItem.created,), limit=2)
+        self.assertEqual([item.id for item in page], [6, 10])
+        self.assertEqual(len(page), 2)
+        self.assertTrue(page.has_next)
+        self.assertFalse(page.has_prev)
+
+        with self.assertQueryCount(1):
+            page = query.seek(after=page.next_cursor,
+                              order_by=(SeekItem.created,), limit=2)
+        self.assertEqual([item.id for item in page], [3])
+        self.assertFalse(page.has_next)
+        self.assertTrue(page.has_prev)
+        self.assertTrue(page.next_cursor is None)
+
+        page = query.seek(before=page.prev_cursor,
+                          order_by=(SeekItem.created,), limit=2)
+        self.assertEqual([item.id for item in page], [6, 10])
+        self.assertFalse(page.has_prev)
+        self.assertTrue(page.has_next)
+
+    def test_seek_sql(self):
+        token = SeekItem.select().seek(
+            order_by=(SeekItem.created, SeekItem.id.desc()),
+            limit=1).next_cursor
+        self.reset_sql_history()
+        SeekItem.select().seek(after=token, limit=2, order_by=(
+            SeekItem.created, SeekItem.id.desc()))
+        self.assertHistory(1, [(
+            'SELECT "t1"."id", "t1"."created", "t1"."title" '
+            'FROM "seek_item" AS "t1" '
+            'WHERE (("t1"."created" > ?) OR '
+            '(("t1"."created" = ?) AND ("t1"."id" < ?))) '
+            'ORDER BY "t1"."created" ASC, "t1"."id" DESC LIMIT ?',
+            [datetime.datetime(2026, 1, 1), datetime.datetime(2026, 1, 1),
+             9, 3])])
+
+        if not self.database.row_values:
+            return
+        token = SeekItem.select().seek(limit=1, order_by=(
+            SeekItem.created.desc(), SeekItem.id.desc())).next_cursor
+        self.reset_sql_history()
+        SeekItem.select().seek(after=token, limit=2, order_by=(
+            SeekItem.created.desc(), SeekItem.id.desc()))
+        self.assertHistory(1, [(
+            'SELECT "t1"."id", "t1"."created", "t1"."title" '
+            'FROM "seek_item" AS "t1" '
+            'WHERE (("t1"."created", "t1"."id") < (?, ?)) '
+            'ORDER BY "t1"."created" DESC, "t1"."id" DESC LIMIT ?',
+            [datetime.datetime(2026, 1, 1, 3), 8, 3])])
+
+    def test_seek_errors(self):
+        query = SeekItem.select()
+        self.assertRaises(ValueError, query.seek, after='x', before='y')
+        self.assertRaises(ValueError, query.seek, after='not a token')
+        token = query.seek(limit=1).next_cursor
+        self.assertRaises(ValueError, query.seek, after=token,
+                          order_by=(SeekItem.title, SeekItem.created))
+        self.assertRaises(ValueError, query.dicts().seek)
+        self.assertRaises(ValueError, query.seek, order_by=(User.username,))
+
+
+class TestChunks(ModelTestCase):
+    requires = [User]
+
+    def setUp(self):
+        super(TestChunks, self).setUp()
+        with self.database.atomic():
+            for i in range(10):
+                User.create(username='u%02d' % i)
+
+    def test_chunks(self):
+        with self.assertQueryCount(4):
+            chunks = [[u.username for u in chunk]
+                      for chunk in User.select().chunks(3)]
+        self.assertEqual(chunks, [
+            ['u00', 'u01', 'u02'],
+            ['u03', 'u04', 'u05'],
+            ['u06', 'u07', 'u08'],
+            ['u09']])
+
+        # Filters and alternate orderings are respected.
+        query = User.select().where(User.username != 'u05')
+        chunks = [[u.username for u in chunk] for chunk in
+                  query.chunks(4, by=User.username.desc())]
+        self.assertEqual(chunks, [
+            ['u09', 'u08', 'u07', 'u06'],
+            ['u04', 'u03', 'u02', 'u01'],
+            ['u00']])
+
+        # Evenly-divided tables do not produce an empty chunk.
+        self.assertEqual([len(c) for c in User.select().chunks(5)], [5, 5])
+        self.assertEqual(list(User.select().where(User.id < 0).chunks()), [])
+
+    def test_chunks_resume(self):
+        it = User.select().chunks(4)
+        chunk = next(it)
+        it.close()
+
+        # Resume from the cursor of the last chunk processed.
+        chunks = [[u.username for u in chunk] for chunk in
+                  User.select().chunks(4, after=chunk.next_cursor)]
+        self.assertEqual(chunks, [
+            ['u04', 'u05', 'u06', 'u07'],
+            ['u08', 'u09']])
+
+    def test_chunks_atomic(self):
+        for chunk in User.select().chunks(4, atomic=True):
+            self.assertTrue(self.database.in_transaction())
+            (User
+             .update(username=User.username.concat('-x'))
+             .where(User.id.in_([u.id for u in chunk]))
+             .execute())
+            if chunk[0].username == 'u04':
+                # Stopping early rolls back the work done on this chunk.
+                break
+
+        self.assertFalse(self.database.in_transaction())
+        self.assertEqual(
+            [u.username for u in User.select().order_by(User.id)],
+            ['u00-x', 'u01-x', 'u02-x', 'u03-x', 'u04', 'u05', 'u06', 'u07',
+             'u08', 'u09'])
+
+    def test_chunks_sleep(self):
+        with mock.patch('peewee.time.sleep') as mock_sleep:
+            self.assertEqual(len(list(User.select().chunks(4, sleep=0.5))), 3)
+        self.assertEqual(mock_sleep.call_args_list, [mock.call(0.5)] * 2)
+
+
+class TestPaginateWithTotal(ModelTestCase):
+    requires = [User, Tweet]
+
+    def setUp(self):
+        super(TestPaginateWithTotal, self).setUp()
+        with self.database.atomic():
+            for i in range(7):
+                user = User.create(username='u%s' % i)
+                Tweet.create(user=user, content='t%s' % (i % 3))
+
+    def test_paginate_with_total(self):
+        query = User.select().where(User.id > 1).order_by(User.id)
+        with self.assertQueryCount(1):
+            users, total = query.paginate_with_total(2, 4)
+        self.assertEqual([u.username for u in users], ['u5', 'u6'])
+        self.assertEqual(total, 6)
+        self.assertFalse(hasattr(users[0], '_pw_total'))
+
+        # Other row types are supported.
+        rows, total = query.tuples().paginate_with_total(1, 2)
+        self.assertEqual(rows, [(2, 'u1'), (3, 'u2')])
+        self.assertEqual(total, 6)
+
+        # Any limit or offset on the original query is ignored.
+        rows, total = query.limit(1).dicts().paginate_with_total(3, 2)
+        self.assertEqual(rows, [{'id': 6, 'username': 'u5'},
+                                {'id': 7, 'username': 'u6'}])
+        self.assertEqual(total, 6)
+
+    def test_distinct_and_grouped(self):
+        query = (Tweet
+                 .select(Tweet.content)
+                 .distinct()
+                 .order_by(Tweet.content)
+                 .tuples())
+        with self.assertQueryCount(1):
+            rows, total = query.paginate_with_total(1, 2)
+        self.assertEqual(rows, [('t0',), ('t1',)])
+        self.assertEqual(total, 3)
+
+        query = (Tweet
+                 .select(Tweet.content, fn.COUNT(Tweet.id).alias('n'))
+                 .group_by(Tweet.content)
+                 .order_by(Tweet.content)
+                 .tuples())
+        with self.assertQueryCount(1):
+            rows, total = query.paginate_with_total(2, 2)
+        self.assertEqual(rows, [('t2', 2)])
+        self.assertEqual(total, 3)
+
+    def test_past_the_end(self):
+        query = User.select().order_by(User.id)
+        with self.assertQueryCount(2):
+            self.assertEqual(query.paginate_with_total(5, 3), ([], 7))
+        with self.assertQueryCount(1):
+            self.assertEqual(query.where(User.id < 0).paginate_with_total(1),
+                             ([], 0))
+
+    def test_without_window_functions(self):
+        window_functions = self.database.window_functions
+        self.database.window_functions = False
+        try:
+            query = User.select(User.username).order_by(User.id)
+            with self.assertQueryCount(1):
+                users, total = query.paginate_with_total(3, 3)
+        finally:
+            self.database.window_functions = window_functions
+        self.assertEqual([u.username for u in users], ['u6'])
+        self.assertEqual(total, 7)
+        self.assertEqual(users[0].__data__, {'username': 'u6'})
+
+    def test_server_version_read_before_query(self):
+        # MySQL < 8 has no window functions, which is only known once the
+        # first connection has been opened.
+        class OldMySQLDatabase(MySQLDatabase):
+            def _connect(self):
+                return mock.Mock(server_version='5.7.30')
+            def execute_sql(self, sql, params=None):
+                queries.append(sql)
+                cursor = mock.Mock(description=[('username',), ('t',)])
+                cursor.fetchone.return_value = None
+                return cursor
+
+        queries = []
+        old_db = OldMySQLDatabase('peewee_test')
+        self.assertTrue(old_db.window_functions)
+        query = User.select(User.username).order_by(User.id)
+        self.assertEqual(query.paginate_with_total(1, database=old_db),
+                         ([], 0))
+        self.assertEqual(old_db.server_version, (5, 7, 30))
+        self.assertFalse(old_db.window_functions)
+        self.assertEqual(len(queries), 1)
+        self.assertFalse('OVER' in queries[0])
+        old_db.close()
+
+
+class TestApproximateCount(ModelTestCase):
+    requires = [User, Tweet]
+
+    def setUp(self):
+        super(TestApproximateCount, self).setUp()
+        with self.database.atomic():
+            for i in range(5):
+                user = User.create(username='u%s' % i)
+                Tweet.create(user=user, content='t%s' % i)
+        self.database.clear_count_cache()
+
+    def test_fallback_to_exact(self):
+        # Filtered or joined queries cannot use catalog statistics, so unless
+        # the database can estimate them, an exact count is performed.
+        with mock.patch.object(self.database, 'estimate_row_count',
+                               return_value=None):
+            self.assertEqual(User.approximate_count(), 5)
+            query = User.select().where(User.id > 2)
+            self.assertEqual(query.count(approximate=True), 3)
+
+    def test_estimate_source(self):
+        calls = []
+        def estimate(table, schema=None):
+            calls.append((table, schema))
+            return 100
+
+        with mock.patch.object(self.database, 'estimate_row_count',
+                               side_effect=estimate):
+            self.assertEqual(User.approximate_count(), 100)
+            self.assertEqual(User.select(User.id).count(approximate=True),
+                             100)
+            self.assertEqual(User.select().limit(2).count(
+                approximate=True, clear_limit=True), 100)
+            self.assertEqual(calls, [('users', None)] * 3)
+
+            if not IS_POSTGRESQL:
+                self.assertEqual(User.select().limit(2).count(
+                    approximate=True), 2)
+                self.assertEqual(User.select().where(User.id > 3).count(
+                    approximate=True), 2)
+                self.assertEqual(User.select().join(Tweet).count(
+                    approximate=True), 5)
+                self.assertEqual(len(calls), 3)
+
+    @requires_sqlite
+    def test_sqlite_stat1(self):
+        self.assertTrue(self.database.estimate_row_count('users') is None)
+        self.database.execute_sql('ANALYZE users')
+        User.insert_many([('u5',), ('u6',)], fields=[User.username]).execute()
+
+        # Statistics are not updated until ANALYZE is run again.
+        self.assertEqual(self.database.estimate_row_count('users'), 5)
+        self.assertEqual(User.approximate_count(), 5)
+        self.assertEqual(User.select().count(), 7)
+
+        self.database.execute_sql('ANALYZE users')
+        self.assertEqual(User.approximate_count(), 7)
+        self.assertTrue(self.database.estimate_row_count('nuggets') is None)
+
+        # A partial index's entry counts fewer rows than the table has.
+        self.database.execute_sql('DELETE FROM sqlite_stat1')
+        self.database.execute_sql(
+            'INSERT INTO sqlite_stat1 (tbl, idx, stat) VALUES '
+            '(?, ?, ?), (?, ?, ?)',
+            ('users', 'users_partial', '2 1', 'users', 'users_full', '7 1'))
+        self.assertEqual(self.database.estimate_row_count('users'), 7)
+        self.database.execute_sql('DROP TABLE sqlite_stat1')
+
+    def test_approximate_count_model(self):
+        with mock.patch.object(self.database, 'estimate_row_count',
+                               return_value=None):
+            count = self.database.approximate_count(User)
+        if IS_POSTGRESQL:
+            # The planner's estimate is used for models, as for queries.
+            self.assertTrue(isinstance(count, int))
+        elif not IS_CRDB:
+            self.assertTrue(count is None)
+
+    def test_count_cache(self):
+        query = User.select().where(User.username != 'u0')
+        with self.assertQueryCount(1):
+            self.assertEqual(query.count(cache=60), 4)
+            self.assertEqual(query.count(cache=60), 4)
+
+            # Equivalent queries share the cache entry.
+            q2 = User.select().where(User.username != 'u0')
+            self.assertEqual(q2.count(cache=60), 4)
+
+        # Different parameters are counted separately.
+        with self.assertQueryCount(1):
+            q3 = User.select().where(User.username != 'u1')
+            self.assertEqual(q3.count(cache=60), 4)
+            self.assertEqual(q3.count(cache=60), 4)
+
+        # Stale counts are returned until the entry expires.
+        User.delete().where(User.username == 'u4').execute()
+        self.assertEqual(query.count(cache=60), 4)
+        self.assertEqual(query.count(), 3)
+
+        self.database.clear_count_cache()
+        self.assertEqual(query.count(cache=60), 3)
+
+    def test_count_cache_expiry(self):
+        query = User.select()
+        with mock.patch('peewee.time.monotonic', return_value=100.):
+            self.assertEqual(query.count(cache=10), 5)
+            User.delete().where(User.username == 'u4').execute()
+            self.assertEqual(query.count(cache=10), 5)
+
+        with mock.patch('peewee.time.monotonic', return_value=110.):
+            self.assertEqual(query.count(cache=10), 4)
+
+    def test_count_cache_size(self):
+        self.database.count_cache_size = 2
+        try:
+            for i in range(4):
+                query = User.select().where(User.id > i)
+                self.assertEqual(query.count(cache=60), 5 - i)
+            self.assertEqual(len(self.database._count_cache), 2)
+
+            # The oldest entries were evicted.
+            with self.assertQueryCount(1):
+                User.select().where(User.id > 0).count(cache=60)
+                User.select().where(User.id > 3).count(cache=60)
+        finally:
+            del self.database.count_cache_size
+
+
+class TestIndexHints(ModelTestCase):
+    requires = [User, Tweet]
+
+    def test_index_hints(self):
+        huey = User.create(username='huey')
+        mickey = User.create(username='mickey')
+        for user in (huey, mickey, huey):
+            Tweet.create(user=user, content='meow')
+
+        index = Tweet._meta.fields_to_index()[0]
+        query = (Tweet
+                 .select(Tweet.id, User.username)
+                 .join(User)
+                 .where(Tweet.user == huey)
+                 .force_index(index)
+                 .ignore_index(source=User)
+                 .order_by(Tweet.id)
+                 .tuples())
+        self.assertEqual(list(query), [(1, 'huey'), (3, 'huey')])
+        self.assertEqual(query.count(), 2)
+
+        UA = User.alias()
+        query = (UA
+                 .select(UA.username)
+                 .use_index('users_username', source=UA)
+                 .order_by(UA.username)
+                 .tuples())
+        if IS_SQLITE or IS_MYSQL:
+            # Hints naming an index that does not exist are an error.
+            self.assertRaises(DatabaseError, list, query)
+        else:
+            self.assertEqual(list(query), [('huey',), ('mickey',)])
@@ -2,12 +2,17 @@ import heapq
 import os
 import threading
 import time
+from unittest import mock
 
 from peewee import *
 from peewee import _savepoint
+from peewee import _fork_orphans
 from peewee import _transaction
 from playhouse.cockroachdb import PooledCockroachDatabase
 from playhouse.pool import *
+from playhouse.postgres_ext import FetchManyCursor
+from playhouse.postgres_ext import PooledPostgresqlExtDatabase
+from playhouse.postgres_ext import PostgresqlExtDatabase
 
 from .base import BACKEND
 from .base import BaseTestCase
@@ -722,6 +727,809 @@ class TestPooledDatabase(BaseTestCase):
         db.init('testing', timeout=0)
         self.assertEqual(db._wait_timeout, float('inf'))
 
+    def wait_for(self, predicate, timeout=2):
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() > deadline:
+                self.fail('Timed out waiting for condition.')
+            time.sleep(0.001)
+
+    def test_waiters_served_in_order(self):
+        # Waiting threads receive connections in the order they arrived, and
+        # the returned connection is handed over without re-entering the heap.
+        db = FakePooledDatabase('testing', max_connections=1, timeout=5)
+        self.assertEqual(db.connection(), 1)
+
+        order = []
+        def try_connect(i):
+            db.connect()
+            order.append((i, db.connection()))
+            db.close()
+
+        threads = []
+        for i in range(5):
+            t = threading.Thread(target=try_connect, args=(i,))
+            t.start()
+            threads.append(t)
+            self.wait_for(lambda: len(db._waiters) == i + 1)
+
+        db.close()
+        for t in threads: t.join(timeout=2)
+
+        self.assertEqual(order, [(i, 1) for i in range(5)])
+        self.assertEqual(db.counter, 1)
+        self.assertEqual(db._wait_count, 5)
+        self.assertEqual(db._reserved, 0)
+        self.assertEqual([conn for _, _, conn in db._connections], [1])
+
+    def test_handed_off_connection_not_stolen(self):
+        # A connection handed to a waiter is reserved: a new thread cannot
+        # take it or open another connection in its place.
+        db = FakePooledDatabase('testing', max_connections=1, timeout=5)
+        self.assertEqual(db.connection(), 1)
+
+        got = threading.Event()
+        release = threading.Event()
+        def waiter():
+            db.connect()
+            got.set()
+            release.wait(timeout=2)
+            db.close()
+
+        t = threading.Thread(target=waiter)
+        t.start()
+        self.wait_for(lambda: len(db._waiters) == 1)
+
+        errors = []
+        def barge():
+            try:
+                db._connect()
+            except MaxConnectionsExceeded:
+                errors.append(True)
+
+        # Holding the database lock keeps the waiter from checking out.
+        with db._lock:
+            db._close(db._state.conn)
+            db._state.reset()
+            self.assertEqual(db._reserved, 1)
+            self.assertEqual(db._connections, [])
+
+            bt = threading.Thread(target=barge)
+            bt.start(); bt.join(timeout=2)
+            self.assertEqual(errors, [True])
+
+        self.assertTrue(got.wait(timeout=2))
+        release.set()
+        t.join(timeout=2)
+        self.assertEqual(db.counter, 1)
+        self.assertEqual(db._reserved, 0)
+
+    def test_wait_timeout_accounting(self):
+        db = FakePooledDatabase('testing', max_connections=1, timeout=0.05)
+        self.assertEqual(db.connection(), 1)
+
+        errors = []
+        def try_connect():
+            try:
+                db.connect()
+            except MaxConnectionsExceeded:
+                errors.append(True)
+
+        t = threading.Thread(target=try_connect)
+        t.start(); t.join(timeout=2)
+        self.assertEqual(errors, [True])
+        self.assertEqual(db._wait_count, 1)
+        self.assertEqual(db._wait_timeouts, 1)
+        self.assertGreaterEqual(db._wait_time, 0.04)
+        self.assertEqual(len(db._waiters), 0)
+        self.assertEqual(db._reserved, 0)
+
+        # The pool is still usable.
+        db.close()
+        t = threading.Thread(target=try_connect)
+        t.start(); t.join(timeout=2)
+        self.assertEqual(errors, [True])
+
+    def test_contention_checkout_latency(self):
+        # 200 threads sharing 20 connections. With FIFO hand-off every thread
+        # is served, and none waits much longer than its place in the queue.
+        db = FakePooledDatabase('testing', max_connections=20, timeout=10)
+        barrier = threading.Barrier(200)
+        waits = []
+        errors = []
+
+        def worker():
+            barrier.wait(timeout=5)
+            for _ in range(5):
+                start = time.monotonic()
+                try:
+                    db.connect()
+                except MaxConnectionsExceeded:
+                    errors.append(True)
+                    return
+                waits.append(time.monotonic() - start)
+                time.sleep(0.001)
+                db.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(200)]
+        for t in threads: t.start()
+        for t in threads: t.join(timeout=30)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(waits), 1000)
+        self.assertTrue(db.counter <= 20)
+        self.assertEqual(db._in_use, {})
+        self.assertEqual(db._reserved, 0)
+        self.assertEqual(len(db._waiters), 0)
+
+        waits.sort()
+        p99 = waits[int(len(waits) * 0.99)]
+        self.assertTrue(p99 < 5, 'p99 checkout latency %.3fs' % p99)
+
+
+class TestPoolStats(BaseTestCase):
+    def test_stats(self):
+        db = FakePooledDatabase('testing', max_connections=2, stale_timeout=10)
+        stats = db.stats()
+        self.assertEqual((stats.idle, stats.in_use, stats.created,
+                          stats.checkouts), (0, 0, 0, 0))
+        self.assertEqual(stats.avg_age, 0.)
+        self.assertEqual(stats.avg_hold_time, 0.)
+
+        self.assertEqual(db.connection(), 1)
+        def other():
+            db.connect()
+            db.close()
+        t = threading.Thread(target=other)
+        t.start(); t.join()
+
+        stats = db.stats()
+        self.assertEqual(stats.idle, 1)
+        self.assertEqual(stats.in_use, 1)
+        self.assertEqual(stats.max_in_use, 2)
+        self.assertEqual(stats.created, 2)
+        self.assertEqual(stats.checkouts, 2)
+        self.assertTrue(stats.avg_age >= 0)
+
+        # Exceeding the limit with no timeout is counted.
+        def exhausted():
+            db.connect()
+            t = threading.Thread(target=lambda: self.assertRaises(
+                MaxConnectionsExceeded, db.connect))
+            t.start(); t.join()
+            db.close()
+        t = threading.Thread(target=exhausted)
+        t.start(); t.join()
+        self.assertEqual(db.stats().timeouts, 1)
+
+        # Stale connection discarded on check-in.
+        key = db.connection()
+        db._in_use[key] = db._in_use[key]._replace(timestamp=time.time() - 60)
+        db.close()
+        stats = db.stats()
+        self.assertEqual(stats.discarded, {
+            'stale': 1,
+            'expired': 0,
+            'idle': 0,
+            'not_reusable': 0,
+            'closed': 0,
+            'invalid': 0})
+        self.assertEqual(stats.closed, 1)
+        self.assertEqual(stats.in_use, 0)
+        self.assertTrue(stats.avg_hold_time > 0)
+
+    def test_wait_histogram(self):
+        db = FakePooledDatabase('testing', max_connections=1, timeout=0.01)
+        self.assertEqual(db.connection(), 1)
+
+        def try_connect():
+            try:
+                db.connect()
+            except MaxConnectionsExceeded:
+                pass
+        t = threading.Thread(target=try_connect)
+        t.start(); t.join()
+
+        stats = db.stats()
+        self.assertEqual(stats.waiting, 0)
+        self.assertEqual(stats.waits, 1)
+        self.assertEqual(stats.timeouts, 1)
+        self.assertTrue(stats.wait_time >= 0.01)
+        self.assertEqual(sum(n for _, n in stats.wait_histogram), 1)
+        bounds = [bound for bound, _ in stats.wait_histogram]
+        self.assertEqual(bounds, list(WAIT_BUCKETS))
+        self.assertEqual(dict(stats.wait_histogram)[0.001], 0)
+
+    def test_callbacks(self):
+        db = FakePooledDatabase('testing')
+        events = []
+
+        @db.on_create
+        def on_create(conn):
+            events.append(('create', conn))
+
+        db.on_checkout(lambda conn: events.append(('checkout', conn)))
+        db.on_checkin(lambda conn: events.append(('checkin', conn)))
+        db.on_discard(lambda conn, reason: events.append((reason, conn)))
+
+        db.connect()
+        db.close()
+        db.connect()
+        db._can_reuse = lambda conn: False
+        db.close()
+        self.assertEqual(events, [
+            ('create', 1), ('checkout', 1), ('checkin', 1),
+            ('checkout', 1), ('checkin', 1), ('not_reusable', 1)])
+
+        # Connection closed while idle is discarded on check-out.
+        del events[:]
+        db._can_reuse = lambda conn: True
+        db.connect()
+        db.close()
+        db._is_closed = lambda conn: conn == 2
+        db.connect()
+        self.assertEqual(events, [
+            ('create', 2), ('checkout', 2), ('checkin', 2),
+            ('closed', 2), ('create', 3), ('checkout', 3)])
+        self.assertEqual(db.stats().discarded['closed'], 1)
+
+    def test_callback_errors_logged(self):
+        db = FakePooledDatabase('testing')
+
+        @db.on_checkout
+        def bad(conn):
+            raise ValueError('oops')
+
+        with self.assertLogs('peewee.pool', 'ERROR') as cm:
+            db.connect()
+        self.assertEqual(db.connection(), 1)
+        self.assertTrue('checkout callback' in cm.output[0])
+
+
+class TestPoolMaintenance(BaseTestCase):
+    def test_warm_on_first_use(self):
+        db = FakePooledDatabase('testing', min_connections=3)
+        self.assertEqual(db.counter, 0)
+
+        self.assertEqual(db.connection(), 1)
+        self.assertEqual(db.counter, 3)
+        stats = db.stats()
+        self.assertEqual((stats.idle, stats.in_use), (2, 1))
+
+        # Only warmed once.
+        db.close()
+        db.connect()
+        self.assertEqual(db.counter, 3)
+
+    def test_maintain_idle_timeout(self):
+        db = FakePooledDatabase('testing', min_connections=2, idle_timeout=10)
+        conns = []
+        for i in range(4):
+            db._state.closed = True
+            db.connect()
+            conns.append(db.connection())
+        self.assertEqual(conns, [1, 2, 3, 4])
+        for conn in conns:
+            db._close(conn)
+        self.assertEqual(db.stats().idle, 4)
+
+        # Nothing has been idle long enough.
+        db.maintain()
+        self.assertEqual(db.stats().idle, 4)
+
+        # Trimmed back to the minimum, oldest first.
+        for conn in (1, 2, 3):
+            db._idle_since[conn] -= 60
+        db.maintain()
+        self.assertEqual(sorted(c for _, _, c in db._connections), [3, 4])
+        self.assertEqual(db.stats().discarded['idle'], 2)
+        self.assertEqual(db.closed_counter, 2)
+
+        # Replenished up to the minimum.
+        db.close_idle()
+        db.maintain()
+        self.assertEqual(sorted(c for _, _, c in db._connections), [5, 6])
+
+    def test_max_lifetime(self):
+        db = FakePooledDatabase('testing', max_lifetime=100)
+        now = time.time()
+        self.assertEqual(db.connection(), 1)
+        expires = db._expires[1]
+        self.assertTrue(now + 89 < expires <= time.time() + 100)
+
+        db.close()
+        db._expires[1] = now - 1
+        self.assertEqual(db.connection(), 2)
+        self.assertEqual(db.stats().discarded['expired'], 1)
+        self.assertEqual(list(db._expires), [2])
+
+        # Expired on check-in, and by maintain() while idle.
+        db._expires[2] = now - 1
+        db.close()
+        self.assertEqual(db._connections, [])
+        self.assertEqual(db.connection(), 3)
+        db.close()
+        db._expires[3] = now - 1
+        db.maintain()
+        self.assertEqual(db._connections, [])
+        self.assertEqual(db.stats().discarded['expired'], 3)
+        self.assertEqual(db._expires, {})
+
+    def test_maintenance_thread(self):
+        db = FakePooledDatabase('testing', min_connections=2,
+                                maintenance_interval=0.01)
+        self.assertTrue(db._maintenance_thread is None)
+        db.connect()
+        try:
+            self.assertTrue(db._maintenance_thread.is_alive())
+            db.close()
+            db.close_idle()
+
+            deadline = time.monotonic() + 2
+            while len(db._connections) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(len(db._connections), 2)
+        finally:
+            db.stop_maintenance()
+        self.assertTrue(db._maintenance_thread is None)
+
+    def test_init_maintenance_parameters(self):
+        db = FakePooledDatabase(None)
+        db.init('testing', min_connections='2', idle_timeout=30,
+                max_lifetime=3600)
+        self.assertEqual(db._min_connections, 2)
+        self.assertEqual(db._idle_timeout, 30)
+        self.assertEqual(db._max_lifetime, 3600)
+        db.connect()
+        self.assertEqual(db.counter, 2)
+
+
+class TestPoolAffinity(BaseTestCase):
+    def run_in_thread(self, fn, *args):
+        result = []
+        t = threading.Thread(target=lambda: result.append(fn(*args)))
+        t.start(); t.join()
+        return result[0]
+
+    def test_affinity(self):
+        db = FakePooledDatabase('testing', affinity=True)
+        a_ready, b_ready = threading.Event(), threading.Event()
+        results = {}
+
+        def worker(name, ready, other):
+            conns = []
+            for _ in range(3):
+                db.connect()
+                conns.append(db.connection())
+                ready.set()
+                other.wait(timeout=2)
+                db.close()
+            results[name] = conns
+
+        ta = threading.Thread(target=worker, args=('a', a_ready, b_ready))
+        tb = threading.Thread(target=worker, args=('b', b_ready, a_ready))
+        ta.start(); tb.start()
+        ta.join(); tb.join()
+
+        # Each thread keeps reclaiming its own connection.
+        self.assertEqual(results['a'], [results['a'][0]] * 3)
+        self.assertEqual(results['b'], [results['b'][0]] * 3)
+        self.assertEqual(db.counter, 2)
+        self.assertEqual(db._connections, [])
+        self.assertEqual(sorted(db._parked), [1, 2])
+        self.assertEqual(db.stats().idle, 2)
+
+    def test_parked_connection_shared(self):
+        db = FakePooledDatabase('testing', affinity=True, max_connections=1)
+        self.assertEqual(db.connection(), 1)
+        db.close()
+        self.assertEqual(list(db._parked), [1])
+
+        # Another thread takes the parked connection rather than exceed the
+        # pool size.
+        def other():
+            db.connect()
+            conn = db.connection()
+            db.close()
+            return conn
+        self.assertEqual(self.run_in_thread(other), 1)
+
+        # Now parked for the other thread, but still available here.
+        self.assertEqual(db.connection(), 1)
+        self.assertEqual(db.counter, 1)
+        db.close()
+
+        db.close_idle()
+        self.assertEqual(db._parked, {})
+        self.assertEqual(db.closed_counter, 1)
+
+    def test_waiters_take_priority(self):
+        db = FakePooledDatabase('testing', affinity=True, max_connections=1,
+                                timeout=5)
+        self.assertEqual(db.connection(), 1)
+
+        def other():
+            db.connect()
+            conn = db.connection()
+            db.close()
+            return conn
+
+        result = []
+        t = threading.Thread(target=lambda: result.append(other()))
+        t.start()
+        deadline = time.monotonic() + 2
+        while not db._waiters and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+        # Connection is handed to the waiter instead of being parked.
+        db.close()
+        t.join()
+        self.assertEqual(result, [1])
+        self.assertEqual(list(db._parked), [1])
+
+    def test_lock_free_reclaim(self):
+        class CountingLock(object):
+            def __init__(self, lock):
+                self.lock, self.count = lock, 0
+            def __enter__(self):
+                self.count += 1
+                return self.lock.__enter__()
+            def __exit__(self, *args):
+                return self.lock.__exit__(*args)
+
+        db = FakePooledDatabase('testing', affinity=True)
+        db.connect()
+        db.close()
+        db._pool_lock = lock = CountingLock(db._pool_lock)
+
+        # The parked connection is reclaimed and parked again without the
+        # pool lock, and a new PoolConnection records each check-out.
+        records = []
+        for _ in range(3):
+            db.connect()
+            self.assertEqual(list(db._in_use), [1])
+            self.assertEqual(db._parked, {})
+            records.append(db._in_use[1])
+            db.close()
+            self.assertEqual(list(db._parked), [1])
+        self.assertEqual(lock.count, 0)
+        self.assertEqual(db.counter, 1)
+        self.assertEqual(len(set(map(id, records))), 3)
+
+        # Counts of the lock-free check-outs are included in stats(), also
+        # once the thread has exited. The other thread takes the connection
+        # parked for this one.
+        def other():
+            for _ in range(2):
+                db.connect()
+                db.close()
+        self.run_in_thread(other)
+        stats = db.stats()
+        self.assertEqual((stats.checkouts, stats.validations), (6, 5))
+        self.assertEqual((stats.in_use, stats.idle), (0, 1))
+        self.assertEqual(db.counter, 1)
+
+        # A waiter is woken by a connection parked without the lock.
+        db = FakePooledDatabase('testing', affinity=True, max_connections=1,
+                                timeout=5)
+        db.connect()
+        result = []
+        t = threading.Thread(target=lambda: result.append(
+            self.run_in_thread(lambda: (db.connect(), db.connection(),
+                                        db.close())[1])))
+        t.start()
+        deadline = time.monotonic() + 2
+        while not db._waiters and time.monotonic() < deadline:
+            time.sleep(0.001)
+        db.close()
+        t.join()
+        self.assertEqual(result, [1])
+
+    def test_maintain_unparks(self):
+        db = FakePooledDatabase('testing', affinity=True, idle_timeout=10)
+        db.connect()
+        db.close()
+        db._idle_since[1] -= 60
+        db.maintain()
+        self.assertEqual(db._parked, {})
+        self.assertEqual(db._connections, [])
+        self.assertEqual(db.stats().discarded['idle'], 1)
+
+        # Parked key is stale, falls back to the shared pool.
+        self.assertEqual(db.connection(), 2)
+
+
+class TestPoolFork(BaseTestCase):
+    def test_reset_after_fork(self):
+        db = FakePooledDatabase('testing', min_connections=2,
+                                maintenance_interval=60)
+        self.addCleanup(db.stop_maintenance)
+        self.assertEqual(db.connection(), 1)
+        thread, stop = db._maintenance_thread, db._maintenance_stop
+        n = len(_fork_orphans)
+
+        db._reset_after_fork()
+        self.assertEqual(sorted(_fork_orphans[n:]), [1, 1, 2])
+        del _fork_orphans[n:]
+        self.assertEqual(db.closed_counter, 0)  # Nothing was closed.
+        self.assertTrue(db.is_closed())
+        self.assertEqual(db._connections, [])
+        self.assertEqual(db._in_use, {})
+        self.assertTrue(db._maintenance_thread is None)
+
+        # Pool is warmed again, and the maintenance thread restarted, on
+        # first use.
+        self.assertEqual(db.connection(), 3)
+        self.assertEqual(db.counter, 4)
+        self.assertTrue(db._maintenance_thread is not thread)
+
+        # Stop the thread left over from before the "fork".
+        stop.set()
+        thread.join()
+
+    def test_warm_after_fork(self):
+        class WarmPool(FakePooledDatabase):
+            warm_after_fork = True
+
+        db = WarmPool('testing', min_connections=2)
+        self.assertEqual(db.connection(), 1)
+        n = len(_fork_orphans)
+        db._reset_after_fork()
+        del _fork_orphans[n:]
+        self.assertEqual(db.counter, 4)
+        self.assertEqual(sorted(c for _, _, c in db._connections), [3, 4])
+
+        # Deferred pools are not warmed.
+        db = WarmPool(None, min_connections=2)
+        db._reset_after_fork()
+        self.assertEqual(db.counter, 0)
+
+
+class TestPoolValidation(BaseTestCase):
+    def test_validate(self):
+        checked = []
+        class ValidatingPool(FakePooledDatabase):
+            def _is_closed(self, conn):
+                checked.append(conn)
+                return False
+
+        db = ValidatingPool('testing')
+        db.connect(); db.close()
+        db.connect(); db.close()
+        self.assertEqual(checked, [1])  # New connections are not validated.
+
+        db = ValidatingPool('testing', validate='never')
+        del checked[:]
+        db.connect(); db.close()
+        db.connect(); db.close()
+        self.assertEqual(checked, [])
+        self.assertEqual(db.stats().validations, 0)
+
+        db = ValidatingPool('testing', validate='if_idle_longer_than:5s')
+        db.connect(); db.close()
+        db.connect(); db.close()
+        self.assertEqual(checked, [])
+        db._idle_since[1] -= 10
+        db.connect(); db.close()
+        self.assertEqual(checked, [1])
+        self.assertEqual(db.stats().validations, 1)
+
+        db.init('testing', validate='always')
+        db.connect(); db.close()
+        self.assertEqual(checked, [1, 1])
+
+        for value in ('sometimes', 'if_idle_longer_than:xs'):
+            self.assertRaises(ValueError, ValidatingPool, 'testing',
+                              validate=value)
+
+    def test_validation_query(self):
+        db = PooledTestDatabase(':memory:', validation_query='select 1')
+        conn = db.connection()
+        db.close()
+        self.assertTrue(db.connection() is conn)
+        db.close()
+
+        db.init(':memory:', validation_query='select * from missing')
+        self.assertFalse(db.connection() is conn)
+        db.close()
+        stats = db.stats()
+        self.assertEqual(stats.discarded['invalid'], 1)
+        self.assertEqual(stats.validations, 2)
+        db.close_all()
+
+    def test_backoff(self):
+        attempts = []
+        class FlakyDatabase(FakeDatabase):
+            down = 0  # Number of attempts to fail.
+            def _connect(self):
+                attempts.append(time.monotonic())
+                if self.down:
+                    self.down -= 1
+                    raise OperationalError('unreachable')
+                return super(FlakyDatabase, self)._connect()
+
+        class FlakyPool(FakePooledDatabase, FlakyDatabase):
+            pass
+
+        db = FlakyPool('testing', backoff=0.05, max_backoff=0.08)
+        db.down = 3
+        self.assertRaises(OperationalError, db.connect)
+
+        # Further attempts fail fast until the backoff has elapsed.
+        self.assertRaises(ConnectBackoff, db.connect)
+        self.assertEqual(len(attempts), 1)
+        self.assertTrue(0.02 <= db._backoff_remaining() <= 0.05)
+
+        time.sleep(db._backoff_remaining())
+        self.assertRaises(OperationalError, db.connect)
+        self.assertTrue(0.03 <= db._backoff_remaining() <= 0.08)
+        self.assertEqual(db.stats().connect_failures, 2)
+
+        # Retries wait out the backoff, which is capped at max_backoff.
+        db.init('testing', connect_retries=2)
+        self.assertEqual(db.connection(), 1)
+        self.assertEqual(len(attempts), 4)
+        self.assertTrue(attempts[3] - attempts[2] >= 0.04)
+        self.assertEqual(db._retry_after, 0.)
+        db.close()
+
+        # Errors unrelated to opening a connection are not retried.
+        db.connect()
+        self.assertRaises(OperationalError, db.connect)
+        self.assertEqual(len(attempts), 4)
+
+    def test_retries_without_backoff(self):
+        class FlakyDatabase(FakeDatabase):
+            down = 1
+            def _connect(self):
+                if self.down:
+                    self.down -= 1
+                    raise OperationalError('unreachable')
+                return super(FlakyDatabase, self)._connect()
+
+        class FlakyPool(FakePooledDatabase, FlakyDatabase):
+            pass
+
+        db = FlakyPool('testing', connect_retries=1)
+        self.assertEqual(db.connection(), 1)
+        self.assertEqual(db._retry_after, 0.)
+
+
+class PreparingSqliteDatabase(PooledSqliteDatabase):
+    # Stand-in for a driver that prepares statements server-side.
+    def _prepares_statements(self):
+        return True
+
+
+class TestPreparedStatements(BaseTestCase):
+    def test_execute_prepared(self):
+        db = PreparingSqliteDatabase(':memory:', prepared_statements=True)
+        self.addCleanup(db.close_all)
+        for i in range(3):
+            curs = db.execute_prepared('select ?', (i,))
+            self.assertEqual(curs.fetchone(), (i,))
+        db.execute_prepared('select 1')
+        key = db.conn_key(db.connection())
+        db.close()
+
+        # Another connection has its own registry.
+        def other():
+            db.execute_prepared('select ?', (1,))
+            db.close()
+        db.connect()  # Hold the first connection.
+        t = threading.Thread(target=other)
+        t.start(); t.join()
+
+        stats = db.statement_stats()
+        self.assertEqual(len(stats), 2)
+        self.assertEqual(stats[key], StatementStats(
+            statements=2, hits=2, misses=2, hit_rate=0.5))
+        other_key, = [k for k in stats if k != key]
+        self.assertEqual(stats[other_key].misses, 1)
+        db.close()
+
+        # Registry is discarded along with the connection.
+        db.close_all()
+        self.assertEqual(db.statement_stats(), {})
+
+    def test_eviction(self):
+        evicted = []
+        class TestPool(PreparingSqliteDatabase):
+            def _prepare(self, conn, sql):
+                return sql.upper()
+            def _deallocate(self, conn, handle):
+                evicted.append(handle)
+
+        db = TestPool(':memory:', prepared_statements=True,
+                      max_prepared_statements=2)
+        self.addCleanup(db.close_all)
+        for sql in ('select 1', 'select 2', 'select 1', 'select 3'):
+            db.execute_prepared(sql)
+        self.assertEqual(evicted, ['SELECT 2'])
+        stats, = db.statement_stats().values()
+        self.assertEqual((stats.statements, stats.hits, stats.misses),
+                         (2, 1, 3))
+
+    def test_prepared_queries(self):
+        db = PreparingSqliteDatabase(':memory:', prepared_statements=True)
+        self.addCleanup(db.close_all)
+
+        class Item(Model):
+            value = IntegerField()
+            class Meta:
+                database = db
+
+        db.create_tables([Item])
+        for i in range(3):
+            Item.create(value=i)
+        self.assertEqual(Item.get(Item.value == 2).value, 2)
+        self.assertEqual(Item.select().count(), 3)
+
+        stats, = db.statement_stats().values()
+        self.assertEqual(stats.hits, 2)  # Two of the INSERTs.
+
+        # Queries are executed normally when disabled.
+        db.init(':memory:', prepared_statements=False)
+        self.assertEqual(Item.select().count(), 3)
+        key = db.conn_key(db.connection())
+        self.assertEqual(db.statement_stats(), {key: stats})
+
+    def test_unsupported_driver(self):
+        # sqlite does not prepare statements, so nothing is tracked.
+        db = PooledSqliteDatabase(':memory:', prepared_statements=True)
+        self.addCleanup(db.close_all)
+        for i in range(3):
+            self.assertEqual(db.execute_sql('select ?', (i,)).fetchone(),
+                             (i,))
+        self.assertEqual(db.statement_stats(), {})
+
+    def test_execute_sql_overrides(self):
+        executed = []
+        class TestPool(PreparingSqliteDatabase):
+            def execute_sql(self, sql, params=None, **kwargs):
+                executed.append(sql)
+                return super(TestPool, self).execute_sql(sql, params,
+                                                         **kwargs)
+
+        db = TestPool(':memory:', prepared_statements=True)
+        self.addCleanup(db.close_all)
+        slow = []
+        db.slow_query_log(threshold_ms=0, explain=False,
+                          callback=lambda sql, *_: slow.append(sql))
+
+        for _ in range(2):
+            self.assertEqual(list(db.execute(SQL('select ?', (1,)))), [(1,)])
+
+        sql = 'select ?'
+        self.assertEqual(executed, [sql, sql])
+        self.assertEqual(slow, [sql])  # Once per interval.
+        stats, = db.statement_stats().values()
+        self.assertEqual((stats.hits, stats.misses), (1, 1))
+
+    def test_server_side_cursors(self):
+        db = PooledPostgresqlExtDatabase('peewee_test',
+                                         prepared_statements=True)
+        query = Register.select().bind(db)
+        with mock.patch.object(db, '_prepares_statements',
+                               return_value=True), \
+             mock.patch.object(PostgresqlExtDatabase,
+                               'execute_sql') as execute_sql, \
+             mock.patch.object(db, 'execute_prepared') as execute_prepared:
+            cursor = db.execute(query, named_cursor=True, array_size=10)
+            self.assertTrue(isinstance(cursor, FetchManyCursor))
+            self.assertEqual(cursor.array_size, 10)
+            self.assertTrue(execute_sql.call_args[1]['named_cursor'])
+
+            db._server_side_cursors = True
+            db.execute(query)
+            self.assertEqual(execute_sql.call_count, 2)
+            self.assertFalse(execute_prepared.called)
+
+            # Other statements are still prepared.
+            db.execute(Register.delete().bind(db))
+            self.assertEqual(execute_prepared.call_count, 1)
+            self.assertEqual(execute_sql.call_count, 2)
+
 
 class TestLivePooledDatabase(ModelTestCase):
     database = PooledTestDatabase('test_pooled.db')
@@ -795,6 +795,229 @@ class TestQueryAexecuteErrors(unittest.IsolatedAsyncioTestCase):
         await adb.close_pool()
 
 
+class TestAsyncSqlitePool(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            self.db_path = f.name
+        self.addCleanup(os.unlink, self.db_path)
+
+    async def get_pool(self, **kwargs):
+        pool = await AsyncSqlitePool(self.db_path, **kwargs).initialize()
+        self.addAsyncCleanup(pool.close)
+        return pool
+
+    async def test_min_size(self):
+        pool = await self.get_pool(pool_size=4, min_size=1)
+        self.assertEqual((pool.created, pool.info()['idle']), (1, 1))
+        c1 = await pool.acquire()
+        c2 = await pool.acquire()
+        self.assertEqual(pool.created, 2)
+        await pool.release(c2)
+        await pool.release(c1)
+        self.assertEqual(pool.info()['idle'], 2)
+
+        # Most-recently used connection is handed out first.
+        conn = await pool.acquire()
+        self.assertIs(conn, c1)
+        await pool.release(conn)
+
+    async def test_overflow(self):
+        pool = await self.get_pool(pool_size=1, min_size=1, overflow=1)
+        c1 = await pool.acquire()
+        c2 = await pool.acquire()
+        with self.assertRaises(asyncio.TimeoutError):
+            await pool.acquire(timeout=0.01)
+        self.assertEqual(pool.info()['waiting'], 0)
+
+        # Without an idle timeout, overflow connections close on release.
+        await pool.release(c2)
+        await pool.release(c1)
+        await asyncio.gather(*list(pool._tasks))
+        info = pool.info()
+        self.assertEqual((info['idle'], info['closed']), (1, 1))
+        self.assertEqual(info['discarded']['idle'], 1)
+        self.assertIsNone(c2.conn)
+
+    async def test_idle_timeout(self):
+        pool = await self.get_pool(pool_size=1, min_size=1, overflow=2,
+                                   idle_timeout=0.05)
+        conns = [await pool.acquire() for _ in range(3)]
+        for conn in conns:
+            await pool.release(conn)
+        self.assertEqual(pool.info()['idle'], 3)
+
+        # Expired by the maintenance task, down to min_size.
+        await asyncio.sleep(0.12)
+        await asyncio.sleep(0)
+        info = pool.info()
+        self.assertEqual((info['idle'], info['closed']), (1, 2))
+        conn = await pool.acquire()
+        self.assertIs(conn, conns[2])
+        await pool.release(conn)
+
+    async def test_waiters_fifo(self):
+        pool = await self.get_pool(pool_size=1)
+        conn = await pool.acquire()
+        order = []
+        async def waiter(i):
+            c = await pool.acquire(timeout=1)
+            order.append(i)
+            await pool.release(c)
+
+        tasks = [asyncio.ensure_future(waiter(i)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        self.assertEqual(pool.info()['waiting'], 3)
+        await pool.release(conn)
+        await asyncio.gather(*tasks)
+        self.assertEqual(order, [0, 1, 2])
+
+    async def test_replace_in_background(self):
+        pool = await self.get_pool(pool_size=2, min_size=1)
+        conn = await pool.acquire()
+        await conn.conn.close()
+        self.assertTrue(conn.stale())
+
+        # Release does not wait for the replacement to open.
+        await pool.release(conn)
+        self.assertEqual(pool.info()['idle'], 0)
+        await asyncio.gather(*list(pool._tasks))
+        info = pool.info()
+        self.assertEqual((info['idle'], info['created']), (1, 2))
+        self.assertEqual(info['discarded']['closed'], 1)
+
+        # A waiter is given the replacement.
+        pool = await self.get_pool(pool_size=1)
+        conn = await pool.acquire()
+        task = asyncio.ensure_future(pool.acquire(timeout=1))
+        await asyncio.sleep(0)
+        await conn.conn.close()
+        await pool.release(conn)
+        new_conn = await task
+        self.assertIsNot(new_conn, conn)
+        self.assertFalse(new_conn.stale())
+        await pool.release(new_conn)
+
+    async def test_close_wakes_waiters(self):
+        pool = await self.get_pool(pool_size=1)
+        conn = await pool.acquire()
+        task = asyncio.ensure_future(pool.acquire(timeout=1))
+        await asyncio.sleep(0)
+        await pool.close()
+        with self.assertRaises(InterfaceError):
+            await task
+        await pool.release(conn)  # Closed, as the pool is closed.
+        self.assertIsNone(conn.conn)
+
+    async def test_abandoned_open(self):
+        pool = await self.get_pool(pool_size=1, min_size=0)
+        opening = asyncio.Event()
+        create = pool._create_connection
+        async def slow_create():
+            opening.set()
+            await asyncio.sleep(0.05)
+            return await create()
+        pool._create_connection = slow_create
+
+        # The caller gives up while the connection is being opened.
+        task = asyncio.ensure_future(pool.acquire())
+        await opening.wait()
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        with self.assertRaises(asyncio.TimeoutError):
+            await pool.acquire(timeout=0.01)
+
+        # Once opened, the connection is kept by the pool.
+        await asyncio.gather(*list(pool._tasks))
+        self.assertEqual((pool._size, pool.info()['idle']), (1, 1))
+        pool._create_connection = create
+        conn = await pool.acquire()
+        self.assertEqual(pool.created, 1)
+        await pool.release(conn)
+
+        # A failed open gives up its slot.
+        pool = await self.get_pool(pool_size=1, min_size=0)
+        async def failing_create():
+            raise OperationalError('cannot connect')
+        pool._create_connection = failing_create
+        with self.assertRaises(OperationalError):
+            await pool.acquire()
+        self.assertEqual(pool._size, 0)
+
+    async def test_abandoned_open_after_close(self):
+        pool = await self.get_pool(pool_size=1, min_size=0)
+        conns = []
+        create = pool._create_connection
+        async def slow_create():
+            await asyncio.sleep(0.02)
+            conns.append(await create())
+            return conns[-1]
+        pool._create_connection = slow_create
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await pool.acquire(timeout=0.01)
+        await pool.close()
+        self.assertEqual((pool._size, pool.closed), (0, 1))
+        self.assertIsNone(conns[0].conn)
+
+    async def test_database_wait_stats(self):
+        db = AsyncSqliteDatabase(self.db_path, pool_size=2, pool_min_size=0,
+                                 acquire_timeout=1)
+        self.addAsyncCleanup(db.close_pool)
+
+        # Opening new connections as the pool grows is not a wait.
+        finish = asyncio.Event()
+        async def hold():
+            async with db:
+                await finish.wait()
+        holders = [asyncio.ensure_future(hold()) for _ in range(2)]
+        while len(db._checked_out) < 2:
+            await asyncio.sleep(0.001)
+        stats = db.stats()
+        self.assertEqual((stats.checkouts, stats.created, stats.waits),
+                         (2, 2, 0))
+
+        # A check-out queued behind a full pool is.
+        async def work():
+            await db.aexecute_sql('SELECT 1')
+            await db.aclose()
+        task = asyncio.ensure_future(work())
+        await asyncio.sleep(0.01)
+        finish.set()
+        await asyncio.gather(task, *holders)
+        stats = db.stats()
+        self.assertEqual((stats.checkouts, stats.waits), (3, 1))
+        self.assertTrue(stats.wait_time > 0)
+
+    async def test_database_stats(self):
+        db = AsyncSqliteDatabase(self.db_path, pool_size=1, pool_min_size=1,
+                                 acquire_timeout=0.05)
+        self.addAsyncCleanup(db.close_pool)
+        self.assertEqual(db.stats().checkouts, 0)
+
+        await db.aexecute_sql('SELECT 1')
+        async def other():
+            await db.aexecute_sql('SELECT 1')
+        with self.assertRaises(OperationalError):
+            await asyncio.ensure_future(other())
+
+        stats = db.stats()
+        self.assertEqual((stats.in_use, stats.idle, stats.checkouts),
+                         (1, 0, 1))
+        self.assertEqual((stats.waits, stats.timeouts), (0, 1))
+        self.assertEqual(stats.created, 1)
+
+        async def work():
+            await db.aexecute_sql('SELECT 1')
+            await db.aclose()
+        await db.aclose()
+        await asyncio.ensure_future(work())
+        stats = db.stats()
+        self.assertEqual((stats.in_use, stats.idle, stats.checkouts),
+                         (0, 1, 2))
+        self.assertTrue(stats.avg_hold_time > 0)
+
+
 class IntegrationTests(object):
     db_path = None
     models = [TestModel, User, Tweet, UniqueModel, AUser, ATweet, ANoLazy,
@@ -0,0 +1,192 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from peewee import *
+from playhouse.replication import ReplicatedDatabase
+
+from .base import BaseTestCase
+
+
+class RegisterDatabase(SqliteDatabase):
+    # Records the SQL executed on each database.
+    def __init__(self, *args, **kwargs):
+        self.queries = []
+        super(RegisterDatabase, self).__init__(*args, **kwargs)
+
+    def execute_sql(self, sql, params=None):
+        self.queries.append(sql)
+        return super(RegisterDatabase, self).execute_sql(sql, params)
+
+
+class Note(Model):
+    content = TextField()
+
+
+class TestReplicatedDatabase(BaseTestCase):
+    def setUp(self):
+        super(TestReplicatedDatabase, self).setUp()
+        self.tempdir = tempfile.mkdtemp()
+        filename = lambda i: os.path.join(self.tempdir, 'db-%s.db' % i)
+        self.primary = RegisterDatabase(filename(0))
+        self.replicas = [RegisterDatabase(filename(i)) for i in (1, 2)]
+        for i, database in enumerate([self.primary] + self.replicas):
+            with database.bind_ctx([Note]):
+                Note.create_table()
+                Note.create(content='db-%s' % i)
+            del database.queries[:]
+
+    def tearDown(self):
+        for database in [self.primary] + self.replicas:
+            database.close()
+        shutil.rmtree(self.tempdir)
+        super(TestReplicatedDatabase, self).tearDown()
+
+    def contents(self, db):
+        with db.bind_ctx([Note]):
+            return [n.content for n in Note.select().order_by(Note.id)]
+
+    def test_routing(self):
+        db = ReplicatedDatabase(self.primary, self.replicas)
+        self.assertTrue(db.primary is self.primary)
+        self.assertEqual(self.contents(db), ['db-1'])
+
+        with db.bind_ctx([Note]):
+            Note.create(content='new')
+            Note.update(content='new-1').where(Note.content == 'new').execute()
+
+            # Thread continues to use the same replica until closed.
+            self.assertEqual(Note.select().count(), 1)
+            self.assertEqual(Note.get().content, 'db-1')
+
+            with db.atomic():
+                # Reads inside a transaction use the primary.
+                self.assertEqual(Note.select().count(), 2)
+
+        self.assertEqual(self.contents(self.primary), ['db-0', 'new-1'])
+        self.assertEqual(len(self.replicas[1].queries), 0)
+
+        # Replica is chosen round-robin after the thread closes.
+        db.close()
+        self.assertTrue(self.replicas[0].is_closed())
+        self.assertEqual(self.contents(db), ['db-2'])
+
+        # Raw SQL always uses the primary.
+        curs = db.execute_sql('select count(*) from note')
+        self.assertEqual(curs.fetchone(), (2,))
+
+    def test_sticky_window(self):
+        db = ReplicatedDatabase(self.primary, self.replicas,
+                                sticky_window=0.05)
+        self.assertEqual(self.contents(db), ['db-1'])
+
+        with db.bind_ctx([Note]):
+            Note.create(content='new')
+        self.assertEqual(self.contents(db), ['db-0', 'new'])
+
+        # Other threads are not affected.
+        result = []
+        def read():
+            result.append(self.contents(db))
+            db.close()
+        t = threading.Thread(target=read)
+        t.start(); t.join()
+        self.assertEqual(result, [['db-2']])
+
+        time.sleep(0.06)
+        self.assertEqual(self.contents(db), ['db-1'])
+
+    def test_track_position(self):
+        state = {'primary': 1, 'replica': 0}
+
+        class TestReplicated(ReplicatedDatabase):
+            def primary_position(self):
+                return state['primary']
+            def replica_has_position(self, replica, position):
+                return state['replica'] >= position
+
+        db = TestReplicated(self.primary, self.replicas, track_position=True)
+        self.assertEqual(self.contents(db), ['db-1'])
+
+        with db.bind_ctx([Note]):
+            Note.create(content='new')
+
+        # Reads stay on the primary until the replica catches up.
+        self.assertEqual(self.contents(db), ['db-0', 'new'])
+        self.assertEqual(self.contents(db), ['db-0', 'new'])
+        state['replica'] = 1
+        self.assertEqual(self.contents(db), ['db-1'])
+
+        # Combined with a window, the window bounds how long reads stick.
+        db = TestReplicated(self.primary, self.replicas, track_position=True,
+                            sticky_window=0)
+        with db.bind_ctx([Note]):
+            Note.create(content='new2')
+        state['primary'] = 2
+        time.sleep(0.001)
+        self.assertEqual(self.contents(db), ['db-1'])
+
+    def test_track_position_unsupported(self):
+        db = ReplicatedDatabase(self.primary, self.replicas,
+                                track_position=True)
+        with db.bind_ctx([Note]):
+            Note.create(content='new')
+            self.assertRaises(NotImplementedError, Note.select().count)
+
+    def test_least_loaded(self):
+        db = ReplicatedDatabase(self.primary, self.replicas,
+                                strategy='least_loaded')
+        self.assertTrue(db.replica() is self.replicas[0])
+
+        chosen = []
+        barrier = threading.Barrier(2)
+        def worker():
+            chosen.append(db.replica())
+            barrier.wait(timeout=2)
+            db.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+        self.assertEqual(sorted(self.replicas.index(r) for r in chosen),
+                         [0, 1])
+        self.assertEqual(db._open, [1, 0])
+        db.close()
+        self.assertEqual(db._open, [0, 0])
+
+        self.assertRaises(ValueError, ReplicatedDatabase, self.primary,
+                          self.replicas, strategy='random')
+
+    def test_context_manager(self):
+        db = ReplicatedDatabase(self.primary, self.replicas)
+        with db.connection_context():
+            self.assertEqual(self.contents(db), ['db-1'])
+            self.assertFalse(self.replicas[0].is_closed())
+        self.assertTrue(self.replicas[0].is_closed())
+        self.assertTrue(self.primary.is_closed())
+
+        with db:
+            self.assertTrue(db.in_transaction())
+            self.assertEqual(self.contents(db), ['db-0'])
+        self.assertTrue(self.primary.is_closed())
+
+    def test_model(self):
+        db = ReplicatedDatabase(self.primary, self.replicas)
+
+        class Base(Model):
+            class Meta:
+                database = db
+
+        class Note(Base):
+            content = TextField()
+
+        note = Note.create(content='new')
+        self.assertEqual([n.content for n in Note.select()], ['db-1'])
+        note.content = 'changed'
+        note.save()
+        note.delete_instance()
+        self.assertEqual(len(self.replicas[0].queries), 1)
+        self.assertEqual(len(self.primary.queries), 3)
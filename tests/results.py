@@ -11,6 +11,7 @@ Test case ordering:
 import datetime
 
 from peewee import *
+from peewee import Expression
 
 from .base import get_in_memory_db
 from .base import DatabaseTestCase
@@ -54,6 +55,78 @@ class TestCursorWrapper(ModelTestCase):
         for i in range(2):
             self.assertEqual(names(cursor), lange(10))
 
+    def test_row_cache_window(self):
+        for i in range(10):
+            User.create(username=str(i))
+        names = lambda i: [int(obj.username) for obj in i]
+
+        query = User.select().order_by(User.id).row_cache('window:3')
+        self.assertEqual(names(query), lange(10))
+        self.assertEqual(len(query), 10)
+        self.assertEqual(names(query[7:]), [7, 8, 9])
+        self.assertEqual(query[-1].username, '9')
+        self.assertRaises(ValueError, lambda: query[2])
+        self.assertRaises(IndexError, lambda: query[10])
+
+        cursor = query.clone().execute()
+        self.assertEqual(cursor[1].username, '1')
+        self.assertEqual(cursor.row_cache.rows.maxlen, 3)
+
+        # No cache retains only the current row, rows are read once.
+        query = User.select().order_by(User.id).row_cache('none')
+        self.assertEqual(names(query), lange(10))
+        self.assertRaises(ValueError, list, query)
+
+        self.assertRaises(ValueError, User.select().row_cache, 'window')
+        self.assertRaises(ValueError, User.select().row_cache, 'foo')
+
+    def test_row_cache_spill(self):
+        for i in range(10):
+            User.create(username=str(i))
+        names = lambda i: [int(obj.username) for obj in i]
+
+        query = User.select().order_by(User.id).row_cache('spill', 4)
+        with self.assertQueryCount(1):
+            self.assertEqual(names(query), lange(10))
+            self.assertEqual(names(query), lange(10))
+            self.assertEqual(len(query), 10)
+            self.assertEqual(query[8].username, '8')
+            self.assertEqual(names(query[2:7]), lange(2, 7))
+            self.assertEqual(query[-1].username, '9')
+
+        cache = query._cursor_wrapper.row_cache
+        self.assertEqual(len(cache.rows), 4)
+        self.assertEqual(len(cache.offsets), 6)
+
+        # Dicts and tuples spill as well.
+        query = (User.select(User.username).order_by(User.id).tuples()
+                 .row_cache('spill:2'))
+        self.assertEqual(list(query)[-2:], [('8',), ('9',)])
+        self.assertEqual(query[5], ('5',))
+
+        query = (User.select(User.username).order_by(User.id).namedtuples()
+                 .row_cache('spill:2'))
+        self.assertEqual([row.username for row in query], [str(i) for i in
+                                                           range(10)])
+        self.assertEqual(query[5].username, '5')
+
+        # Rows are built once when first fetched, and built again from the
+        # spilled cursor row when read back.
+        query = User.select().order_by(User.id).row_cache('spill:2')
+        cache = query.execute().row_cache
+        rebuilt = []
+        process_row = cache.process_row
+        cache.process_row = lambda row: rebuilt.append(row) or process_row(row)
+        users = [user for user in query]
+        self.assertEqual(rebuilt, [])
+        self.assertEqual(users[5].username, '5')
+        users[5].username = 'changed'
+        self.assertEqual(query[5].username, '5')
+        self.assertEqual(query[5], users[5])
+        self.assertIsNot(query[5], users[5])
+        self.assertIs(query[1], users[1])
+        self.assertEqual(len(rebuilt), 3)
+
     def test_count(self):
         for i in range(5): User.create(username=str(i))
         with self.assertQueryCount(1):
@@ -869,3 +942,209 @@ class TestModelCursorEdgeCases(ModelTestCase):
     def test_model_raw_get_does_not_exist(self):
         query = User.raw('SELECT * FROM users WHERE username = ?', 'nobody')
         self.assertRaises(User.DoesNotExist, query.get)
+
+
+class TestIdentityMap(ModelTestCase):
+    database = get_in_memory_db()
+    requires = [User, Tweet]
+
+    def setUp(self):
+        super(TestIdentityMap, self).setUp()
+        for username in ('huey', 'mickey'):
+            user = User.create(username=username)
+            for i in range(3):
+                Tweet.create(user=user, content='%s-%s' % (username, i))
+
+    def test_join_shares_instances(self):
+        query = (Tweet
+                 .select(Tweet, User)
+                 .join(User)
+                 .order_by(Tweet.id)
+                 .identity_map())
+        tweets = list(query)
+        self.assertEqual(len(tweets), 6)
+        huey = tweets[0].user
+        self.assertTrue(all(t.user is huey for t in tweets[:3]))
+        self.assertFalse(tweets[3].user is huey)
+        self.assertTrue(all(t.user is tweets[3].user for t in tweets[3:]))
+
+        # Without an identity map each row gets its own instance.
+        tweets = list(query.identity_map(False))
+        self.assertFalse(tweets[0].user is tweets[1].user)
+
+    def test_shared_map(self):
+        id_map = {}
+        huey = User.select().where(User.username == 'huey').identity_map(
+            id_map).get()
+        huey.username = 'huey-x'
+
+        tweets = (Tweet
+                  .select(Tweet, User)
+                  .join(User)
+                  .where(User.username == 'huey')
+                  .identity_map(id_map))
+        for tweet in tweets:
+            self.assertTrue(tweet.user is huey)
+
+        # In-memory changes and dirty state are kept on the shared instance.
+        self.assertEqual(huey.username, 'huey-x')
+        self.assertEqual(huey.dirty_field_names, ['username'])
+        self.assertTrue(id_map[(User, huey.id)] is huey)
+
+    def test_with_related(self):
+        id_map = {}
+        users = list(User.select().order_by(User.id).identity_map(id_map))
+        tweets = (Tweet
+                  .select()
+                  .order_by(Tweet.id)
+                  .with_related(Tweet.user)
+                  .identity_map(id_map))
+        for tweet in tweets:
+            self.assertTrue(tweet.user in users)
+            self.assertTrue(any(tweet.user is user for user in users))
+
+    def test_prefetch(self):
+        id_map = {}
+        tweet = (Tweet.select().where(Tweet.content == 'huey-1')
+                 .identity_map(id_map).get())
+        users = (User
+                 .select()
+                 .order_by(User.id)
+                 .identity_map(id_map)
+                 .prefetch(Tweet))
+        self.assertEqual([len(u.tweets) for u in users], [3, 3])
+        self.assertTrue(users[0].tweets[1] is tweet)
+
+
+# ===========================================================================
+# In-memory evaluation of query expressions
+# ===========================================================================
+
+class Reading(TestModel):
+    value = IntegerField(null=True)
+    valid = BooleanField(null=True)
+
+
+class TestFilterObjects(ModelTestCase):
+    database = get_in_memory_db()
+    requires = [User, Tweet, Reading]
+
+    def setUp(self):
+        super(TestFilterObjects, self).setUp()
+        data = (('huey', ['meow', 'hiss', 'purr']),
+                ('mickey', ['woof', 'Whine']),
+                ('zaizee', []),
+                ('Mr_Foo', ['meow']))
+        for username, tweets in data:
+            user = User.create(username=username)
+            for content in tweets:
+                Tweet.create(user=user, content=content)
+
+    def assertMatchesQuery(self, model, objects, expr, *ordering):
+        query = model.select().where(expr).order_by(*ordering)
+        with self.assertQueryCount(1):
+            expected = [obj.id for obj in query]
+        with self.assertQueryCount(0):
+            accum = filter_objects(objects, expr).order_by(*ordering)
+        self.assertEqual([obj.id for obj in accum], expected)
+
+    def test_filter_objects(self):
+        users = list(User.select())
+        tweets = list(Tweet.select())
+        huey = users[0]
+
+        for expr in ((User.username == 'huey'),
+                     (User.username != 'huey'),
+                     (User.username < 'mickey') & (User.id > 1),
+                     (User.username == 'huey') | (User.username == 'zaizee'),
+                     User.username.in_(['huey', 'zaizee', 'nugget']),
+                     User.username.not_in(['huey', 'zaizee']),
+                     User.id.between(2, 3),
+                     ~(User.id.between(2, 3)),
+                     fn.LOWER(User.username) == 'mr_foo',
+                     fn.LENGTH(User.username) > 4,
+                     fn.SUBSTR(User.username, 2, 3) == 'uey',
+                     User.username.startswith('mr_'),
+                     User.username.contains('_'),
+                     User.username.endswith('EY'),
+                     (User.id * 2) - 1 >= 5):
+            self.assertMatchesQuery(User, users, expr, User.username)
+
+        for expr in ((Tweet.user == huey),
+                     (Tweet.user != huey.id),
+                     (Tweet.user.in_([1, 2]) & (Tweet.content.startswith('w'))),
+                     Case(Tweet.content, (('meow', 1), ('purr', 1)), 0) == 1):
+            self.assertMatchesQuery(Tweet, tweets, expr, Tweet.id.desc())
+
+    def test_null_logic(self):
+        for value in (40, 20, None):
+            for valid in (True, False, None):
+                Reading.create(value=value, valid=valid)
+        Reading.create(value=-7, valid=True)
+        readings = list(Reading.select())
+
+        # AND and OR follow SQL three-valued logic, which is only visible
+        # once the result is negated.
+        V = Reading
+        for expr in ((V.value > 30) & V.valid,
+                     ~((V.value > 30) & V.valid),
+                     (V.value > 30) | V.valid,
+                     ~((V.value > 30) | V.valid),
+                     ~(~V.valid & (V.value < 30)),
+                     ~((V.value > 30) | (V.valid & (V.value < 30))),
+                     ~(V.valid | V.value.is_null()) & (V.value != 20)):
+            self.assertMatchesQuery(V, readings, expr, V.id)
+
+        # Integer division and modulo truncate towards zero.
+        for expr in ((V.value / 3) == 13,
+                     (V.value / 3) == -2,
+                     Expression(V.value, OP.MOD, 3) == -1):
+            self.assertMatchesQuery(V, readings, expr, V.id)
+
+    def test_order_by(self):
+        tweets = list(Tweet.select())
+        ordering = (Tweet.content, Tweet.user.desc())
+        query = Tweet.select().order_by(*ordering)
+        with self.assertQueryCount(0):
+            accum = filter_objects(tweets).order_by(*ordering)
+        self.assertEqual([(t.content, t.user_id) for t in accum],
+                         [(t.content, t.user_id) for t in query])
+
+        # NULLs sort first ascending, last descending, unless specified.
+        users = [User(id=1, username='a'), User(id=2, username=None),
+                 User(id=3, username='b')]
+        accum = filter_objects(users)
+        self.assertEqual([u.id for u in accum.order_by(User.username)],
+                         [2, 1, 3])
+        self.assertEqual([u.id for u in accum.order_by(User.username.desc())],
+                         [3, 1, 2])
+        self.assertEqual([u.id for u in accum.order_by(
+            User.username.asc(nulls='last'))], [1, 3, 2])
+        self.assertEqual([u.id for u in accum.order_by(
+            User.username.desc(nulls='first'))], [2, 3, 1])
+
+        # Comparisons against NULL are never true.
+        self.assertEqual(filter_objects(users, User.username < 'z'),
+                         [users[0], users[2]])
+        self.assertEqual(filter_objects(users, ~(User.username < 'z')), [])
+        self.assertEqual(filter_objects(users, User.username.is_null()),
+                         [users[1]])
+
+    def test_reuse(self):
+        users = filter_objects(User.select(), User.id > 1)
+        self.assertEqual(sorted(u.username for u in users),
+                         ['Mr_Foo', 'mickey', 'zaizee'])
+
+        # Filters can be chained and the source list is unmodified.
+        self.assertEqual([u.username for u in users
+                          .where(User.username != 'zaizee')
+                          .order_by(User.username.desc())],
+                         ['mickey', 'Mr_Foo'])
+        self.assertEqual(len(users), 3)
+
+    def test_unsupported(self):
+        subq = User.select(User.id).where(User.username == 'huey')
+        for expr in (Tweet.user.in_(subq),
+                     fn.GROUP_CONCAT(Tweet.content) == 'x',
+                     Tweet.content.cast('blob') == 'x'):
+            self.assertRaises(ValueError, filter_objects, [], expr)
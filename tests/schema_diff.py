@@ -10,6 +10,7 @@ from peewee import *
 from playhouse.migrations import Runner
 from playhouse.migrations import template
 from playhouse.schema_diff import IndexDiff
+from playhouse.schema_diff import IndexRecorder
 from playhouse.schema_diff import diff_models
 
 from .base import IS_CRDB
@@ -837,3 +838,71 @@ class TestTemplateRoundTrip(ModelTestCase):
         body = template(diff_models(self.database, models))
         self.apply(body, 'kv')
         self.assertFalse(diff_models(self.database, models))
+
+
+class TestIndexRecorder(ModelTestCase):
+    requires = [SdUser, SdTweet]
+
+    def test_advise(self):
+        with IndexRecorder(self.database) as recorder:
+            huey = SdUser.create(username='huey', email='huey@example.com')
+            list(SdTweet.select().where(
+                (SdTweet.user == huey) & (SdTweet.flags == 0)))
+            for i in range(2):
+                list(SdTweet
+                     .select()
+                     .where(SdTweet.content == 'meow')
+                     .order_by(SdTweet.flags))
+            list(SdTweet
+                 .select(SdTweet, SdUser)
+                 .join(SdUser)
+                 .where(SdUser.username.startswith('h')))
+
+        # Not recorded after the recorder is uninstalled.
+        list(SdUser.select().where(SdUser.email == 'huey@example.com'))
+        self.assertFalse('execute' in self.database.__dict__)
+
+        advice = recorder.advise()
+        self.assertEqual(advice.add_indexes, [
+            IndexDiff('sd_tweet', None, ('content', 'flags'), False)])
+        self.assertEqual(advice.unused_indexes, [
+            IndexDiff('sd_user', 'sd_user_email', ('email',), False)])
+        self.assertEqual(str(advice), (
+            'add index sd_tweet (content, flags)\n'
+            'unused index sd_user.sd_user_email (email)'))
+
+        self.assertFalse(recorder.advise(min_count=3).add_indexes)
+
+        body = template(advice.as_diff())
+        self.assertTrue("migrator.add_index('sd_tweet', ('content', "
+                        "'flags'))" in body)
+        self.assertFalse('drop_index' in body.split('def down')[0])
+        body = template(advice.as_diff(drop_unused=True))
+        self.assertTrue("migrator.drop_index('sd_user', 'sd_user_email')"
+                        in body)
+
+    def test_predicates(self):
+        recorder = IndexRecorder(self.database)
+        T = SdTweet
+        # Equality columns come first, then ordering, then a range.
+        recorder.record(T.select().where(
+            (T.content == 'x') & (T.flags > 1)))
+        recorder.record(T.select().where(
+            (T.flags == 1) | T.content.contains('x')))
+        recorder.record(T.select().where(~(T.content == 'x')))
+        recorder.record(SdUser.select().where(SdUser.id.in_(
+            T.select(T.user).where(T.flags.between(1, 3)))))
+        recorder.record(T.update(content='y').where(T.id == 1))
+
+        advice = recorder.advise()
+        self.assertEqual([idx.columns for idx in advice.add_indexes], [
+            ('content', 'flags'),
+            ('flags',)])
+        self.assertEqual([idx.name for idx in advice.unused_indexes], [
+            'sd_tweet_user_id',
+            'sd_tweet_user_id_flags',
+            'sd_user_email'])
+
+        recorder.reset()
+        self.assertFalse(recorder.advise())
+
@@ -0,0 +1,273 @@
+import os
+import shutil
+import tempfile
+
+from peewee import *
+from playhouse.sharding import ShardedDatabase
+from playhouse.sharding import ShardedModel
+
+from .base import BaseTestCase
+
+
+class RegisterDatabase(SqliteDatabase):
+    # Records the SQL executed on each database.
+    def __init__(self, *args, **kwargs):
+        self.queries = []
+        super(RegisterDatabase, self).__init__(*args, **kwargs)
+
+    def execute_sql(self, sql, params=None):
+        self.queries.append(sql)
+        return super(RegisterDatabase, self).execute_sql(sql, params)
+
+
+class TestShardedDatabase(BaseTestCase):
+    def setUp(self):
+        super(TestShardedDatabase, self).setUp()
+        self.tempdir = tempfile.mkdtemp()
+        self.shards = dict(
+            (name, RegisterDatabase(os.path.join(self.tempdir, name + '.db')))
+            for name in ('even', 'odd'))
+        self.db = ShardedDatabase(
+            self.shards,
+            key_func=lambda user: 'odd' if user % 2 else 'even')
+
+        class Tweet(ShardedModel):
+            user = IntegerField()
+            content = TextField()
+            likes = IntegerField(null=True)
+
+            class Meta:
+                database = self.db
+                shard_key = 'user'
+
+        self.Tweet = Tweet
+        self.db.create_tables([Tweet])
+        for i in range(6):
+            Tweet.create(user=i % 3, content='t%s' % i, likes=i)
+        self.reset()
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tempdir)
+        super(TestShardedDatabase, self).tearDown()
+
+    def reset(self):
+        for shard in self.shards.values():
+            del shard.queries[:]
+
+    def counts(self):
+        return dict((name, len(shard.queries))
+                    for name, shard in self.shards.items())
+
+    def test_insert_routing(self):
+        # Users 0 and 2 are on the even shard, user 1 on the odd shard.
+        with self.db.using('even'):
+            self.assertEqual(sorted(t.user for t in self.Tweet.select()),
+                             [0, 0, 2, 2])
+        with self.db.using('odd'):
+            self.assertEqual([t.user for t in self.Tweet.select()], [1, 1])
+        self.reset()
+
+        self.Tweet.insert_many([(3, 'a'), (5, 'b')],
+                               [self.Tweet.user, self.Tweet.content]).execute()
+        self.assertEqual(self.counts(), {'even': 0, 'odd': 1})
+
+        rows = [{'user': 1, 'content': 'a'}, {'user': 2, 'content': 'b'}]
+        self.assertRaises(ValueError, self.Tweet.insert_many(rows).execute)
+
+    def test_single_shard(self):
+        Tweet = self.Tweet
+        query = Tweet.select().where(Tweet.user == 1).order_by(Tweet.id)
+        self.assertEqual([t.content for t in query], ['t1', 't4'])
+        self.assertEqual(self.counts(), {'even': 0, 'odd': 1})
+
+        self.reset()
+        query = Tweet.select().where(
+            (Tweet.user << [0, 2]) & (Tweet.likes > 0))
+        self.assertEqual(sorted(t.content for t in query),
+                         ['t2', 't3', 't5'])
+        self.assertEqual(self.counts(), {'even': 1, 'odd': 0})
+
+        self.reset()
+        self.assertEqual(Tweet.select().where(Tweet.user == 2).count(), 2)
+        self.assertEqual(self.counts(), {'even': 1, 'odd': 0})
+
+    def test_model_instance(self):
+        Tweet = self.Tweet
+        tweet = Tweet.get(Tweet.content == 't4')
+        self.assertEqual(self.counts(), {'even': 1, 'odd': 1})
+
+        self.reset()
+        tweet.content = 't4-x'
+        tweet.save()
+        self.assertEqual(self.counts(), {'even': 0, 'odd': 1})
+        tweet.delete_instance()
+        self.assertEqual(self.counts(), {'even': 0, 'odd': 2})
+        with self.db.using('odd'):
+            self.assertEqual([t.content for t in Tweet.select()], ['t1'])
+
+    def test_scatter_gather(self):
+        Tweet = self.Tweet
+        query = Tweet.select().order_by(Tweet.likes.desc())
+        self.assertEqual([t.likes for t in query], [5, 4, 3, 2, 1, 0])
+        self.assertEqual(self.counts(), {'even': 1, 'odd': 1})
+
+        # Mixed directions, with LIMIT and OFFSET applied after merging.
+        query = (Tweet
+                 .select(Tweet.user, Tweet.likes)
+                 .order_by(Tweet.user, Tweet.likes.desc())
+                 .limit(3)
+                 .offset(1)
+                 .tuples())
+        self.assertEqual(list(query), [(0, 0), (1, 4), (1, 1)])
+
+        query = Tweet.select().where(Tweet.likes > 3).order_by(Tweet.id)
+        self.assertEqual([t.content for t in query], ['t4', 't5'])
+        self.assertEqual(Tweet.select().count(), 6)
+        self.assertTrue(Tweet.select().where(Tweet.likes == 1).exists())
+
+        # Ordering must be on a selected column.
+        query = Tweet.select(Tweet.content).order_by(Tweet.likes)
+        self.assertRaises(ValueError, list, query)
+
+    def test_aggregates(self):
+        Tweet = self.Tweet
+        query = Tweet.select(fn.COUNT(Tweet.id), fn.SUM(Tweet.likes),
+                             fn.MIN(Tweet.likes), fn.MAX(Tweet.likes))
+        self.assertEqual(query.tuples()[0], (6, 15, 0, 5))
+
+        query = (Tweet
+                 .select(Tweet.user, fn.SUM(Tweet.likes).alias('total'))
+                 .group_by(Tweet.user)
+                 .order_by(SQL('total').desc())
+                 .limit(2)
+                 .tuples())
+        self.assertEqual(list(query), [(2, 7), (1, 5)])
+
+        # Groups are combined by the GROUP BY columns, which must be
+        # selected.
+        query = (Tweet
+                 .select(Tweet.user, Tweet.content, fn.COUNT(Tweet.id))
+                 .group_by(Tweet.user, Tweet.content)
+                 .order_by(Tweet.content)
+                 .tuples())
+        self.assertEqual([c for _, _, c in query], [1] * 6)
+        query = (Tweet
+                 .select(Tweet.user, fn.MAX(Tweet.content), fn.COUNT(Tweet.id))
+                 .group_by(Tweet.user)
+                 .order_by(Tweet.user)
+                 .tuples())
+        self.assertEqual(list(query), [(0, 't3', 2), (1, 't4', 2),
+                                       (2, 't5', 2)])
+        self.assertRaises(ValueError, list, Tweet
+                          .select(fn.COUNT(Tweet.id))
+                          .group_by(Tweet.user))
+        self.assertRaises(ValueError, list, Tweet
+                          .select(Tweet.user, fn.COUNT(Tweet.id))
+                          .group_by(Tweet.user, Tweet.content))
+
+        # Aggregates whose partial results cannot be combined, including
+        # when they are used within another expression.
+        for node in (fn.AVG(Tweet.likes),
+                     fn.COUNT(Tweet.likes.distinct()),
+                     fn.COALESCE(fn.SUM(Tweet.likes), 0),
+                     fn.SUM(Tweet.likes) / fn.COUNT(Tweet.id),
+                     fn.COUNT(Tweet.id).over()):
+            self.assertRaises(ValueError, list, Tweet.select(node))
+
+        # MIN and MAX of several arguments are scalar functions in SQLite.
+        query = (Tweet
+                 .select(Tweet.likes, fn.MAX(Tweet.likes, 3).alias('m'))
+                 .order_by(Tweet.likes)
+                 .tuples())
+        self.assertEqual([m for _, m in query], [3, 3, 3, 3, 4, 5])
+
+    def test_distinct(self):
+        Tweet = self.Tweet
+        # Even shard has likes 0, 2, 3, 5, odd shard has likes 1, 4.
+        parity = Tweet.likes.bin_and(1).alias('parity')
+        query = Tweet.select(parity).distinct().order_by(SQL('parity'))
+        self.assertEqual(list(query.tuples()), [(0,), (1,)])
+        self.assertEqual(list(query.offset(1).limit(1).tuples()), [(1,)])
+        self.assertEqual(query.count(), 2)
+
+        query = Tweet.select(parity).group_by(SQL('parity'))
+        self.assertEqual(sorted(query.tuples()), [(0,), (1,)])
+        self.assertEqual(query.count(), 2)
+
+        # Counts of queries with a LIMIT are taken from the merged rows.
+        self.assertEqual(Tweet.select().limit(4).count(), 4)
+
+        lhs = Tweet.select(parity).where(Tweet.user == 0)
+        rhs = Tweet.select(parity).where(Tweet.user == 1)
+        self.assertEqual(sorted((lhs | rhs).tuples()), [(0,), (1,)])
+        self.assertEqual(sorted((lhs + rhs).tuples()),
+                         [(0,), (0,), (1,), (1,)])
+        self.assertRaises(ValueError, list, lhs & rhs)
+
+    def test_paginate_with_total(self):
+        Tweet = self.Tweet
+        query = Tweet.select(Tweet.likes).order_by(Tweet.likes).tuples()
+        self.assertEqual(query.paginate_with_total(2, 4), ([(4,), (5,)], 6))
+
+        parity = Tweet.likes.bin_and(1).alias('parity')
+        query = (Tweet.select(parity).distinct().order_by(SQL('parity'))
+                 .tuples())
+        self.assertEqual(query.paginate_with_total(2, 1), ([(1,)], 2))
+
+    def test_null_ordering(self):
+        Tweet = self.Tweet
+        Tweet.update(likes=None).where(Tweet.likes << [1, 2]).execute()
+        query = Tweet.select(Tweet.likes).order_by(Tweet.likes).tuples()
+        self.assertEqual([l for l, in query], [None, None, 0, 3, 4, 5])
+        query = query.order_by(Tweet.likes.desc(nulls='first'))
+        self.assertEqual([l for l, in query], [None, None, 5, 4, 3, 0])
+
+        # Postgres sorts NULLs as larger than any other value.
+        pg = ShardedDatabase({'a': PostgresqlDatabase('a'),
+                              'b': PostgresqlDatabase('b')}, lambda k: 'a')
+        rows = [(1,), (None,), (0,)]
+        for ordering, expected in (
+                (Tweet.likes.asc(), [0, 1, None]),
+                (Tweet.likes.desc(), [None, 1, 0]),
+                (Tweet.likes.asc(nulls='first'), [None, 0, 1])):
+            sort = pg._sort_func([pg._unwrap_ordering(ordering)], ['likes'])
+            self.assertEqual([l for l, in sorted(rows, key=sort)], expected)
+
+    def test_close_executor(self):
+        self.assertEqual(self.Tweet.select().count(), 6)
+        self.assertTrue(self.db._executor is not None)
+        self.db.close()
+        self.assertTrue(self.db._executor is None)
+        self.assertEqual(self.Tweet.select().count(), 6)
+
+    def test_update_delete(self):
+        Tweet = self.Tweet
+        self.assertEqual(Tweet.update(likes=0).execute(), 6)
+        self.assertEqual(self.counts(), {'even': 1, 'odd': 1})
+
+        self.reset()
+        query = Tweet.delete().where(Tweet.user == 2)
+        self.assertEqual(query.execute(), 2)
+        self.assertEqual(self.counts(), {'even': 1, 'odd': 0})
+        self.assertEqual(Tweet.select().count(), 4)
+
+    def test_transactions(self):
+        Tweet = self.Tweet
+        self.assertRaises(ValueError, self.db.atomic)
+        self.assertRaises(ValueError, self.db.execute_sql, 'select 1')
+
+        with self.db.using('odd'):
+            with self.db.atomic():
+                self.assertTrue(self.db.in_transaction())
+                Tweet.create(user=3, content='t6')
+                self.assertEqual(Tweet.select().count(), 3)
+        self.assertFalse(self.db.in_transaction())
+        with self.assertRaises(ValueError):
+            with self.db.using('other'):
+                pass
+
+        with self.db.connection_context():
+            self.assertEqual(Tweet.select().count(), 7)
+            self.assertFalse(self.shards['odd'].is_closed())
+        self.assertTrue(self.db.is_closed())
@@ -3600,6 +3600,87 @@ class TestIndex(BaseTestCase):
 # Utilities and edge cases
 # ===========================================================================
 
+class TestIndexHints(BaseTestCase):
+    def assertHints(self, database, query, sql):
+        self.assertSQL(query, sql, index_hint=database.index_hint,
+                       index_hint_comment=database.index_hint_comment)
+
+    def test_mysql(self):
+        db = MySQLDatabase(None)
+        query = (User
+                 .select(User.c.id)
+                 .join(Tweet, on=(Tweet.c.user_id == User.c.id))
+                 .force_index('users_username')
+                 .ignore_index('tweets_user_id', 'tweets_ts', source=Tweet))
+        self.assertHints(db, query, (
+            'SELECT "t1"."id" FROM "users" AS "t1" '
+            'FORCE INDEX ("users_username") '
+            'INNER JOIN "tweets" AS "t2" '
+            'IGNORE INDEX ("tweets_user_id", "tweets_ts") '
+            'ON ("t2"."user_id" = "t1"."id")'))
+
+        # The most recent hint for a source is used. Hints are carried into
+        # subqueries, and an empty USE INDEX () is permitted.
+        subq = Tweet.select(Tweet.c.user_id).use_index()
+        query = (User
+                 .select(User.c.id)
+                 .where(User.c.id.in_(subq))
+                 .use_index('a')
+                 .use_index('b'))
+        self.assertHints(db, query, (
+            'SELECT "t1"."id" FROM "users" AS "t1" USE INDEX ("b") '
+            'WHERE ("t1"."id" IN ('
+            'SELECT "t2"."user_id" FROM "tweets" AS "t2" USE INDEX ()))'))
+
+        # FORCE and IGNORE require at least one index.
+        query = User.select(User.c.id).ignore_index()
+        self.assertHints(db, query, 'SELECT "t1"."id" FROM "users" AS "t1"')
+
+    def test_sqlite(self):
+        db = SqliteDatabase(None)
+        idx = Index('users_username', User, (User.c.username,))
+        query = (User
+                 .select(User.c.id)
+                 .join(Tweet, on=(Tweet.c.user_id == User.c.id))
+                 .use_index(idx)
+                 .ignore_index(source=Tweet))
+        self.assertHints(db, query, (
+            'SELECT "t1"."id" FROM "users" AS "t1" '
+            'INDEXED BY "users_username" '
+            'INNER JOIN "tweets" AS "t2" NOT INDEXED '
+            'ON ("t2"."user_id" = "t1"."id")'))
+
+        # Hints SQLite cannot express are dropped.
+        for query in (User.select().force_index('a', 'b'),
+                      User.select().ignore_index('a')):
+            self.assertHints(db, query, 'SELECT * FROM "users" AS "t1"')
+
+    def test_postgresql(self):
+        db = PostgresqlDatabase(None)
+        TA = Tweet.alias('ta')
+        query = (User
+                 .select(User.c.id)
+                 .join(TA, on=(TA.c.user_id == User.c.id))
+                 .use_index('users_username')
+                 .ignore_index(source=TA))
+        self.assertHints(db, query, (
+            '/*+ IndexScan("t1" "users_username") NoIndexScan("ta") */ '
+            'SELECT "t1"."id" FROM "users" AS "t1" '
+            'INNER JOIN "tweets" AS "ta" ON ("ta"."user_id" = "t1"."id")'))
+
+        # Only hints on the outer-most query can be applied.
+        subq = Tweet.select(Tweet.c.user_id).force_index('tweets_user_id')
+        query = User.select(User.c.id).where(User.c.id.in_(subq))
+        self.assertHints(db, query, (
+            'SELECT "t1"."id" FROM "users" AS "t1" WHERE ("t1"."id" IN ('
+            'SELECT "t2"."user_id" FROM "tweets" AS "t2"))'))
+
+    def test_unsupported(self):
+        query = User.select(User.c.id).force_index('users_username')
+        self.assertSQL(query, 'SELECT "t1"."id" FROM "users" AS "t1"')
+        self.assertRaises(ValueError, Select().use_index, 'idx')
+
+
 class TestSqlToString(BaseTestCase):
     def _test_sql_to_string(self, _param):
         class FakeDB(SqliteDatabase):
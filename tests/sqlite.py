@@ -1,9 +1,11 @@
 from decimal import Decimal as D
 import datetime
+import json
 import os
 import sys
 
 from peewee import *
+from peewee import JSONCodec
 from peewee import sqlite3
 from playhouse.sqlite_ext import *
 
@@ -380,6 +382,25 @@ class TestJSONField(ModelTestCase):
               .get())
         self.assertEqual(kd.d0, 2)
 
+    def test_json_codec(self):
+        calls = []
+        def loads(s):
+            calls.append(s)
+            return json.loads(s)
+        codec = JSONCodec('sqlite-test', json.dumps, loads)
+        mdb = get_in_memory_db(json_codec=codec)
+
+        class KJ(TestModel):
+            data = JSONField()
+            bdata = JSONField(codec='json')
+
+        with mdb.bind_ctx([KJ]):
+            mdb.create_tables([KJ])
+            KJ.create(data={'k': 1}, bdata={'k': 2})
+            obj = KJ.get()
+            self.assertEqual((obj.data, obj.bdata), ({'k': 1}, {'k': 2}))
+            self.assertEqual(calls, ['{"k":1}'])
+
 
 @skip_unless(json_installed(), 'requires sqlite json1')
 class TestJSONFieldFunctions(ModelTestCase):
@@ -2301,6 +2322,59 @@ class TestISODateTimeField(ModelTestCase):
         query = DT.select().where(DT.iso >= '2026-01-01')
         self.assertEqual([d.key for d in query], ['k2'])
 
+
+class BlobIO(TestModel):
+    data = BlobField()
+
+
+class KeyedBlobIO(TestModel):
+    key = TextField(primary_key=True)
+    data = BlobField()
+
+
+@skip_unless(sys.version_info >= (3, 11, 0), 'blobopen() requires 3.11+')
+class TestBlobIO(ModelTestCase):
+    database = database
+    requires = [BlobIO, KeyedBlobIO]
+
+    def test_open_blob(self):
+        b = BlobIO.create(data=b'0123456789')
+        with BlobIO.open_blob(BlobIO.data, b.id) as blob:
+            self.assertEqual(blob.read(4), b'0123')
+            blob.seek(8)
+            self.assertEqual(blob.read(), b'89')
+            self.assertEqual(blob.tell(), 10)
+
+        with BlobIO.open_blob('data', b.id, 'w') as blob:
+            blob.seek(2)
+            blob.write(b'ab')
+
+        self.assertEqual(bytes(BlobIO[b.id].data), b'01ab456789')
+
+        # Blobs opened for reading cannot be written.
+        with BlobIO.open_blob('data', b.id) as blob:
+            self.assertRaises(Exception, blob.write, b'x')
+
+        # Space for writing can be reserved using zeroblob().
+        b2 = BlobIO.create(data=fn.zeroblob(4))
+        with BlobIO.open_blob('data', b2.id, 'w') as blob:
+            for chunk in (b'ab', b'cd'):
+                blob.write(chunk)
+        self.assertEqual(bytes(BlobIO[b2.id].data), b'abcd')
+
+        self.assertRaises(OperationalError, BlobIO.open_blob, 'data', 0)
+        self.assertRaises(ValueError, BlobIO.open_blob, 'data', b.id, 'x')
+
+    def test_open_blob_rowid_lookup(self):
+        KeyedBlobIO.create(key='k1', data=b'k1-data')
+        KeyedBlobIO.create(key='k2', data=b'k2-data')
+        with self.assertQueryCount(1):
+            with KeyedBlobIO.open_blob('data', 'k2') as blob:
+                self.assertEqual(blob.read(), b'k2-data')
+
+        self.assertRaises(KeyedBlobIO.DoesNotExist, KeyedBlobIO.open_blob,
+                          'data', 'kx')
+
 #
 # If we have cysqlite, let's run tests on it.
 #
@@ -2333,6 +2407,7 @@ else:
         TestSqliteReturning,
         TestDeterministicFunction,
         TestISODateTimeField,
+        TestBlobIO,
         # For various reasons these do not work.
         #TestJsonContains,
         #TestTDecimalField,